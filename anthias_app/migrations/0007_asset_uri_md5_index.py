@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anthias_app', '0006_scheduleslotitem_volume_mute'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='asset',
+            name='uri',
+            field=models.TextField(blank=True, null=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='asset',
+            name='md5',
+            field=models.TextField(blank=True, null=True, db_index=True),
+        ),
+    ]
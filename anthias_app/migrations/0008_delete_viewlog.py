@@ -0,0 +1,14 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anthias_app', '0007_asset_uri_md5_index'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ViewLog',
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-19 04:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anthias_app', '0008_delete_viewlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaInfo',
+            fields=[
+                ('uri', models.TextField(primary_key=True, serialize=False)),
+                ('format_name', models.TextField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('bit_rate', models.BigIntegerField(blank=True, null=True)),
+                ('video_codec', models.TextField(blank=True, null=True)),
+                ('width', models.IntegerField(blank=True, null=True)),
+                ('height', models.IntegerField(blank=True, null=True)),
+                ('frame_rate', models.FloatField(blank=True, null=True)),
+                ('audio_codec', models.TextField(blank=True, null=True)),
+                ('probed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'media_info',
+            },
+        ),
+    ]
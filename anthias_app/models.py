@@ -25,8 +25,8 @@ class Asset(models.Model):
         primary_key=True, default=generate_asset_id, editable=False
     )
     name = models.TextField(blank=True, null=True)
-    uri = models.TextField(blank=True, null=True)
-    md5 = models.TextField(blank=True, null=True)
+    uri = models.TextField(blank=True, null=True, db_index=True)
+    md5 = models.TextField(blank=True, null=True, db_index=True)
     start_date = models.DateTimeField(blank=True, null=True)
     end_date = models.DateTimeField(blank=True, null=True)
     duration = models.BigIntegerField(blank=True, null=True)
@@ -43,28 +43,45 @@ class Asset(models.Model):
     def __str__(self):
         return self.name
 
-    def is_active(self):
+    def is_active(self, now=None):
         if self.is_enabled and self.start_date and self.end_date:
-            current_time = timezone.now()
+            current_time = now or timezone.now()
             return self.start_date < current_time < self.end_date
 
         return False
 
 
-class ViewLog(models.Model):
-    """Log of actual asset playback — written by viewer each time an asset is displayed."""
-    id = models.AutoField(primary_key=True)
-    asset_id = models.TextField()
-    asset_name = models.TextField(blank=True, default='')
-    mimetype = models.TextField(blank=True, default='')
-    started_at = models.DateTimeField(default=timezone.now)
+class MediaInfo(models.Model):
+    """What ffprobe found out about the media at `uri`.
+
+    Keyed by URI rather than by asset, since assets with the same content
+    share their file. Fields are null when ffprobe did not report them.
+    """
+
+    uri = models.TextField(primary_key=True)
+    format_name = models.TextField(blank=True, null=True)
+    duration = models.FloatField(blank=True, null=True)
+    bit_rate = models.BigIntegerField(blank=True, null=True)
+    video_codec = models.TextField(blank=True, null=True)
+    width = models.IntegerField(blank=True, null=True)
+    height = models.IntegerField(blank=True, null=True)
+    frame_rate = models.FloatField(blank=True, null=True)
+    audio_codec = models.TextField(blank=True, null=True)
+    probed_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        db_table = 'viewlog'
-        ordering = ['-started_at']
+        db_table = 'media_info'
 
     def __str__(self):
-        return f'{self.asset_name} @ {self.started_at}'
+        return self.uri
+
+    @property
+    def has_video(self):
+        return self.video_codec is not None
+
+    @property
+    def has_audio(self):
+        return self.audio_codec is not None
 
 
 class ScheduleSlot(models.Model):
@@ -133,13 +150,16 @@ class ScheduleSlot(models.Model):
         """True when the slot wraps past midnight (e.g. 22:00→06:00)."""
         return self.time_from > self.time_to
 
-    def is_currently_active(self):
-        """Return True if this slot covers the current local time."""
+    def is_currently_active(self, now=None):
+        """Return True if this slot covers the current local time.
+
+        ``now`` lets callers checking many slots take the time only once.
+        """
         if self.is_default:
             # Default slot is only used as fallback — never "actively" matched.
             return False
 
-        now = timezone.localtime()
+        now = timezone.localtime(now)
         current_time = now.time()
         current_weekday = now.isoweekday()  # 1=Mon … 7=Sun
 
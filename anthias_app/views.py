@@ -31,9 +31,9 @@ def login(request):
         password = request.POST.get('password')
 
         if settings.auth._check(username, password):
-            # Store credentials in session
-            request.session['auth_username'] = username
-            request.session['auth_password'] = password
+            # The session is a signed cookie, keep the password out of it.
+            token, _ = settings.auth.create_token()
+            request.session['auth_token'] = token
 
             return redirect(reverse('anthias_app:react'))
         else:
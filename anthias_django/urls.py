@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView
 
+from api.views.metrics import MetricsView
 from lib.auth import authorized
 
 
@@ -29,6 +30,8 @@ class APIDocView(SpectacularRedocView):
 
 urlpatterns = [
     path('admin', admin.site.urls),
+    # Before anthias_app, which routes everything else to the web UI.
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('', include('anthias_app.urls')),
     path('api/', include('api.urls')),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
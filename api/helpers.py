@@ -1,11 +1,50 @@
+import bisect
+import hashlib
 import json
+import threading
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import wraps
+from os import path, remove, stat
 
 from dateutil import parser as date_parser
+from django.conf import settings as django_settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import exception_handler
 
-from anthias_app.models import Asset
+from anthias_app.models import Asset, ScheduleSlot, ScheduleSlotItem
+from celery_tasks import (
+    build_keyframe_index,
+    generate_thumbnail,
+    ingest_asset,
+)
+from lib import keyframes, media_info, thumbnails
+from lib.jobs import Job
+from lib.utils import string_to_bool
+from settings import settings
+
+# What is known about the asset table, so that list requests for unchanged
+# assets can be answered without touching the database.
+_assets_state = {
+    'changes': 0,
+    'version': None,
+    'transitions': [],
+}
+_assets_state_lock = threading.Lock()
+
+# The same for the schedule slots.
+_schedule_state = {
+    'changes': 0,
+    'version': None,
+    'slots': [],
+}
+_schedule_state_lock = threading.Lock()
 
 
 class AssetCreationError(Exception):
@@ -49,18 +88,163 @@ def custom_exception_handler(exc, context):
     )
 
 
-def get_active_asset_ids():
-    enabled_assets = Asset.objects.filter(
-        is_enabled=1,
-        start_date__isnull=False,
-        end_date__isnull=False,
+def get_file_etag(stat_result):
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def etag_matches(request, etag):
+    """
+    Whether the request's If-None-Match header matches the given ETag.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+
+    etags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+    return '*' in etags or etag in etags
+
+
+def parse_range_header(range_header, size):
+    """
+    Parses a `Range: bytes=...` header into an inclusive (start, end) pair.
+    Returns None if the header is absent or should be ignored (e.g. several
+    ranges), and raises ValueError if the range can't be satisfied.
+    """
+    if not range_header or not range_header.startswith('bytes='):
+        return None
+
+    byte_range = range_header[len('bytes=') :].strip()
+    if ',' in byte_range or '-' not in byte_range:
+        return None
+
+    start, end = [value.strip() for value in byte_range.split('-', 1)]
+    try:
+        if start:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+        else:
+            # A suffix range, i.e. the last `end` bytes.
+            start = max(0, size - int(end))
+            end = size - 1
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        raise ValueError(f'Range {range_header} not satisfiable')
+
+    return start, end
+
+
+def iter_file_range(f, start, end, chunk_size=64 * 1024):
+    try:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def process_new_asset(asset):
+    """
+    Queues the background processing of a newly created asset.
+    """
+    if asset.is_processing or not asset.uri or not path.isfile(asset.uri):
+        return
+
+    # Files are shared between assets with the same content, in which case
+    # they have been processed already.
+    if ('image' in asset.mimetype or 'video' in asset.mimetype) and (
+        not path.isfile(thumbnails.thumbnail_path(asset.uri))
+    ):
+        generate_thumbnail.delay(asset.uri, asset.mimetype)
+
+    if 'video' in asset.mimetype and (
+        not path.isfile(keyframes.index_path(asset.uri))
+    ):
+        build_keyframe_index.delay(asset.uri)
+
+
+def start_ingest(r, asset, ext=''):
+    """
+    Queues a newly created asset for the ingestion pipeline, and returns
+    the job following it. Has to be called once the asset is committed.
+    """
+    job = Job.create(r, 'ingest')
+    ingest_asset.delay(job.id, asset.asset_id, ext)
+    return job
+
+
+def remove_asset_files(uri):
+    """
+    Removes an asset file, along with its thumbnail, keyframe index and
+    media info, unless another asset still uses it. Has to be called once
+    the asset is gone from the database.
+    """
+    if not uri:
+        return
+
+    # Files are shared by all assets with the same content.
+    if Asset.objects.filter(uri=uri).exists():
+        return
+
+    # Remote media is probed too, so its media info goes either way.
+    media_info.remove_media_info(uri)
+
+    if not uri.startswith(settings['assetdir']):
+        return
+
+    try:
+        keyframes.remove_index(uri)
+        thumbnails.remove_thumbnail(uri)
+        remove(uri)
+    except OSError:
+        pass
+
+
+def get_active_asset_ids(now=None):
+    """
+    Returns the ids of the active assets, by play order. Same as filtering
+    with `Asset.is_active`, but done by the database.
+    """
+    now = now or timezone.now()
+    return list(
+        Asset.objects.filter(
+            is_enabled=True,
+            start_date__lt=now,
+            end_date__gt=now,
+        )
+        .order_by('play_order')
+        .values_list('asset_id', flat=True)
     )
-    return [asset.asset_id for asset in enabled_assets if asset.is_active()]
 
 
 def save_active_assets_ordering(active_asset_ids):
-    for i, asset_id in enumerate(active_asset_ids):
-        Asset.objects.filter(asset_id=asset_id).update(play_order=i)
+    """
+    Sets the play order of the assets to their position in the list. Only
+    the assets whose play order changes are written, all in one
+    transaction, so the viewer sees a single change of the database.
+    """
+    play_orders = dict(
+        Asset.objects.filter(asset_id__in=active_asset_ids).values_list(
+            'asset_id', 'play_order'
+        )
+    )
+    changed_assets = [
+        Asset(asset_id=asset_id, play_order=i)
+        for i, asset_id in enumerate(active_asset_ids)
+        if asset_id in play_orders and play_orders[asset_id] != i
+    ]
+    if not changed_assets:
+        return
+
+    with transaction.atomic():
+        Asset.objects.bulk_update(changed_assets, ['play_order'])
+    invalidate_assets_version()
 
 
 def parse_request(request):
@@ -75,3 +259,221 @@ def parse_request(request):
         data = json.loads(request.data['model'])
 
     return data
+
+
+def _count_asset_change(**kwargs):
+    with _assets_state_lock:
+        _assets_state['changes'] += 1
+
+
+post_save.connect(_count_asset_change, sender=Asset)
+post_delete.connect(_count_asset_change, sender=Asset)
+
+
+def _get_database_version():
+    # Other processes write to the database too, which only shows in the
+    # modification time of the database file.
+    try:
+        stat_result = stat(django_settings.DATABASES['default']['NAME'])
+    except (OSError, TypeError):
+        return None
+    return stat_result.st_mtime_ns, stat_result.st_size
+
+
+def get_assets_version(now=None):
+    """
+    Returns a string that changes whenever the asset list does, including
+    when an asset becomes active or inactive as time passes.
+
+    The start and end dates of the assets are only read again when the
+    database has changed, so this is normally free of queries.
+    """
+    now = now or timezone.now()
+
+    with _assets_state_lock:
+        version = (_get_database_version(), _assets_state['changes'])
+        if version != _assets_state['version']:
+            transitions = []
+            for dates in Asset.objects.values_list('start_date', 'end_date'):
+                transitions.extend(date for date in dates if date)
+            _assets_state['transitions'] = sorted(transitions)
+            _assets_state['version'] = version
+
+        passed = bisect.bisect_right(_assets_state['transitions'], now)
+
+    return '{}-{}'.format(
+        hashlib.md5(repr(version).encode()).hexdigest()[:12], passed
+    )
+
+
+def invalidate_assets_version():
+    """
+    To be called after changing assets with queryset updates, which don't
+    send any signals.
+    """
+    _count_asset_change()
+
+
+def conditional_response(get_version):
+    """
+    Makes a GET view answer requests for an unchanged response with 304
+    Not Modified, and set the ETag on other responses. `get_version`
+    returns a string that changes whenever the response would.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def decorated(self, request, *args, **kwargs):
+            query = request.META.get('QUERY_STRING', '')
+            etag = '"{}"'.format(
+                hashlib.md5(
+                    f'{request.path}?{query}|{get_version()}'.encode()
+                ).hexdigest()
+            )
+
+            if etag_matches(request, etag):
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = view(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+
+            response['ETag'] = etag
+            response['Cache-Control'] = 'no-cache'
+            return response
+
+        return decorated
+
+    return decorator
+
+
+conditional_asset_list = conditional_response(get_assets_version)
+
+
+def _count_schedule_change(**kwargs):
+    with _schedule_state_lock:
+        _schedule_state['changes'] += 1
+
+
+for _sender in [ScheduleSlot, ScheduleSlotItem]:
+    post_save.connect(_count_schedule_change, sender=_sender)
+    post_delete.connect(_count_schedule_change, sender=_sender)
+
+
+def get_schedule_version(now=None):
+    """
+    Returns a string that changes whenever the schedule does, including
+    when slots start or end as time passes.
+
+    The slots are only read again when the database has changed, so this
+    is normally free of queries.
+    """
+    now = timezone.localtime(now)
+
+    with _schedule_state_lock:
+        # Slot items show the name, URI and duration of their assets.
+        version = (
+            _get_database_version(),
+            _schedule_state['changes'],
+            _assets_state['changes'],
+        )
+        if version != _schedule_state['version']:
+            _schedule_state['slots'] = list(ScheduleSlot.objects.all())
+            _schedule_state['version'] = version
+
+        active_slot_ids = [
+            slot.slot_id
+            for slot in _schedule_state['slots']
+            if slot.is_currently_active(now)
+        ]
+
+    return '{}-{}-{}'.format(
+        hashlib.md5(repr(version).encode()).hexdigest()[:12],
+        now.date().isoformat(),
+        hashlib.md5(repr(active_slot_ids).encode()).hexdigest()[:12],
+    )
+
+
+def invalidate_schedule_version():
+    """
+    To be called after changing the schedule with queryset updates, which
+    don't send any signals.
+    """
+    _count_schedule_change()
+
+
+conditional_schedule = conditional_response(get_schedule_version)
+
+
+def filter_assets(queryset, params, now):
+    """
+    Applies the asset list filters given as query parameters. Raises
+    ValueError for invalid values.
+    """
+    is_active = Q(
+        is_enabled=True,
+        start_date__lt=now,
+        end_date__gt=now,
+    )
+
+    if 'is_enabled' in params:
+        queryset = queryset.filter(
+            is_enabled=string_to_bool(params['is_enabled'])
+        )
+    if 'is_active' in params:
+        if string_to_bool(params['is_active']):
+            queryset = queryset.filter(is_active)
+        else:
+            queryset = queryset.exclude(is_active)
+    if 'mimetype' in params:
+        queryset = queryset.filter(mimetype=params['mimetype'])
+    if 'name_prefix' in params:
+        queryset = queryset.filter(name__startswith=params['name_prefix'])
+
+    # Assets scheduled to play at some point within [from, to].
+    if 'from' in params:
+        queryset = queryset.filter(end_date__gt=_parse_date(params['from']))
+    if 'to' in params:
+        queryset = queryset.filter(start_date__lt=_parse_date(params['to']))
+
+    return queryset
+
+
+def _parse_date(value):
+    date = date_parser.parse(value)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+def encode_cursor(asset):
+    data = json.dumps([asset.play_order, asset.asset_id]).encode()
+    return urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        play_order, asset_id = json.loads(urlsafe_b64decode(cursor.encode()))
+        return int(play_order), str(asset_id)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def paginate_assets(queryset, cursor, limit):
+    """
+    Returns a page of assets, ordered by play order, along with the cursor
+    of the next page or None if this is the last one.
+    """
+    queryset = queryset.order_by('play_order', 'asset_id')
+
+    if cursor:
+        play_order, asset_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(play_order__gt=play_order)
+            | Q(play_order=play_order, asset_id__gt=asset_id)
+        )
+
+    page = list(queryset[: limit + 1])
+    if len(page) > limit:
+        return page[:limit], encode_cursor(page[limit - 1])
+    return page, None
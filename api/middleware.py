@@ -0,0 +1,38 @@
+import time
+
+from django.db import connection
+
+from lib import metrics
+
+
+class MetricsMiddleware:
+    """
+    Records the latency and the number of database queries of the API
+    views, for the /metrics endpoint.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_count = [0]
+
+        def count_query(execute, sql, params, many, context):
+            query_count[0] += 1
+            return execute(sql, params, many, context)
+
+        started_at = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started_at
+
+        match = request.resolver_match
+        if match is not None and match.namespace == 'api':
+            metrics.REQUEST_DURATION.observe(
+                duration, match.view_name, request.method, response.status_code
+            )
+            metrics.REQUEST_QUERIES.observe(
+                query_count[0], match.view_name, request.method
+            )
+
+        return response
@@ -1,12 +1,14 @@
 from os import path
 
 from django.utils import timezone
+from drf_spectacular.utils import OpenApiTypes, extend_schema_field
 from rest_framework.serializers import (
     CharField,
     DateTimeField,
     IntegerField,
     ModelSerializer,
     Serializer,
+    SerializerMethodField,
 )
 
 from anthias_app.models import Asset
@@ -39,7 +41,7 @@ def validate_uri(uri):
 class AssetSerializer(ModelSerializer):
     duration = CharField()
     is_enabled = IntegerField(min_value=0, max_value=1)
-    is_active = IntegerField(min_value=0, max_value=1)
+    is_active = SerializerMethodField()
     is_processing = IntegerField(min_value=0, max_value=1)
     nocache = IntegerField(min_value=0, max_value=1)
     skip_asset_check = IntegerField(min_value=0, max_value=1)
@@ -62,6 +64,10 @@ class AssetSerializer(ModelSerializer):
             'is_processing',
         ]
 
+    @extend_schema_field(OpenApiTypes.INT)
+    def get_is_active(self, obj):
+        return int(obj.is_active(self.context.get('now')))
+
 
 class UpdateAssetSerializer(Serializer):
     name = CharField()
@@ -1,6 +1,5 @@
 import uuid
 from inspect import cleandoc
-from os import path, rename
 
 from rest_framework.serializers import CharField, Serializer
 
@@ -19,7 +18,12 @@ from . import (
 
 
 class CreateAssetSerializerMixin:
-    def prepare_asset(self, data, asset_id=None, version='v2'):
+    def prepare_asset(self, data, asset_id=None, version='v2', defer=False):
+        """
+        Returns the fields of the new asset. With `defer`, the checks and
+        processing that take time are left to the ingestion pipeline, and
+        the asset is marked as processing.
+        """
         ampersand_fix = '&amp;'
         name = data['name'].replace(ampersand_fix, '&')
 
@@ -49,14 +53,13 @@ class CreateAssetSerializerMixin:
         if not asset_id:
             asset['asset_id'] = uuid.uuid4().hex
 
-        if not asset_id and uri.startswith('/'):
-            path_name = path.join(settings['assetdir'], asset['asset_id'])
-            ext_name = data.get('ext', '')
-            new_uri = f'{path_name}{ext_name}'
-            rename(uri, new_uri)
-            uri = new_uri
+        # Local files are moved into the asset store once the asset is
+        # saved, by the `hash` stage of the ingestion.
+        asset['ext'] = data.get('ext', '')
+        if defer:
+            asset['is_processing'] = True
 
-        if 'youtube_asset' in asset['mimetype']:
+        if 'youtube_asset' in asset['mimetype'] and not defer:
             (uri, asset['name'], asset['duration']) = (
                 download_video_from_youtube(uri, asset['asset_id'])
             )
@@ -69,11 +72,13 @@ class CreateAssetSerializerMixin:
             if int(data.get('duration')) == 0:
                 original_mimetype = data.get('mimetype')
 
-                if original_mimetype != 'youtube_asset':
+                if original_mimetype != 'youtube_asset' and not defer:
                     duration = get_video_duration(uri).total_seconds()
                     asset['duration'] = (
                         duration if version == 'v2' else int(duration)
                     )
+                elif defer:
+                    asset['duration'] = 0
             else:
                 raise AssetCreationError(
                     'Duration must be zero for video assets.'
@@ -100,7 +105,11 @@ class CreateAssetSerializerMixin:
         asset['start_date'] = data.get('start_date').replace(tzinfo=None)
         asset['end_date'] = data.get('end_date').replace(tzinfo=None)
 
-        if not asset['skip_asset_check'] and url_fails(asset['uri']):
+        if (
+            not defer
+            and not asset['skip_asset_check']
+            and url_fails(asset['uri'])
+        ):
             raise AssetCreationError(
                 'Could not retrieve file. Check the asset URL.'
             )
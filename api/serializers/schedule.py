@@ -64,7 +64,8 @@ class ScheduleSlotSerializer(serializers.ModelSerializer):
         read_only_fields = ['slot_id', 'items', 'is_currently_active']
 
     def get_is_currently_active(self, obj):
-        return obj.is_currently_active()
+        # The views pass the time along, so it's taken once per request.
+        return obj.is_currently_active(self.context.get('now'))
 
     # ── days_of_week: accept list or JSON string, store as JSON string ──
 
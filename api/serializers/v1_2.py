@@ -26,6 +26,7 @@ class CreateAssetSerializerV1_2(Serializer, CreateAssetSerializerMixin):
     is_processing = IntegerField(min_value=0, max_value=1, required=False)
     nocache = IntegerField(min_value=0, max_value=1, required=False)
     play_order = IntegerField(required=False)
+    md5 = CharField(read_only=True)
     skip_asset_check = IntegerField(min_value=0, max_value=1, required=False)
 
     def validate(self, data):
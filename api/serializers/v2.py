@@ -1,3 +1,4 @@
+from django.urls import reverse
 from django.utils import timezone
 from drf_spectacular.utils import OpenApiTypes, extend_schema_field
 from rest_framework.serializers import (
@@ -18,10 +19,28 @@ from api.serializers.mixins import CreateAssetSerializerMixin
 
 class AssetSerializerV2(ModelSerializer, CreateAssetSerializerMixin):
     is_active = SerializerMethodField()
+    thumbnail_url = SerializerMethodField()
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Only include the requested fields, if any.
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
 
     @extend_schema_field(OpenApiTypes.BOOL)
     def get_is_active(self, obj):
-        return obj.is_active()
+        # The list views pass the time along, so that it's only taken once
+        # per request instead of once per asset.
+        return obj.is_active(self.context.get('now'))
+
+    @extend_schema_field(OpenApiTypes.STR)
+    def get_thumbnail_url(self, obj):
+        # Versioned by the checksum of the file, so that the thumbnail can
+        # be cached for good.
+        url = reverse('api:asset_thumbnail_v2', args=[obj.asset_id])
+        return f'{url}?v={obj.md5}' if obj.md5 else url
 
     class Meta:
         model = Asset
@@ -39,6 +58,7 @@ class AssetSerializerV2(ModelSerializer, CreateAssetSerializerMixin):
             'skip_asset_check',
             'is_active',
             'is_processing',
+            'thumbnail_url',
         ]
 
 
@@ -59,10 +79,11 @@ class CreateAssetSerializerV2(Serializer, CreateAssetSerializerMixin):
     is_processing = BooleanField(required=False)
     nocache = BooleanField(required=False)
     play_order = IntegerField(required=False)
+    md5 = CharField(read_only=True)
     skip_asset_check = BooleanField(required=False)
 
     def validate(self, data):
-        return self.prepare_asset(data, version='v2')
+        return self.prepare_asset(data, version='v2', defer=True)
 
 
 class UpdateAssetSerializerV2(UpdateAssetSerializer):
@@ -136,3 +157,7 @@ class IntegrationsSerializerV2(Serializer):
         allow_null=True,
         allow_blank=True,
     )
+
+
+class BackupSerializerV2(Serializer):
+    incremental = BooleanField(required=False, default=False)
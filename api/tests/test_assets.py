@@ -2,19 +2,37 @@
 Tests for asset-related API endpoints.
 """
 
+import hashlib
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import unittest
+from os import getenv, listdir, path
+
 import mock
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from unittest_parametrize import ParametrizedTestCase, parametrize
 
+from anthias_app.models import Asset
+from api.serializers.v2 import CreateAssetSerializerV2
 from api.tests.test_common import (
     ASSET_CREATION_DATA,
     ASSET_UPDATE_DATA_V1_2,
     ASSET_UPDATE_DATA_V2,
     get_request_data,
 )
+from api.views.v2 import AssetThumbnailViewV2
+from celery_tasks import ingest_asset
+from lib import jobs, thumbnails
+from settings import settings
+from tests.test_jobs import FakeRedis
 
 parametrize_version = parametrize(
     'version',
@@ -25,6 +43,13 @@ parametrize_version = parametrize(
 class CRUDAssetEndpointsTest(TestCase, ParametrizedTestCase):
     def setUp(self):
         self.client = APIClient()
+        self.redis = FakeRedis()
+        for patch in [
+            mock.patch('api.views.v2.r', self.redis),
+            mock.patch('api.helpers.ingest_asset'),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
 
     def get_assets(self, version):
         asset_list_url = reverse(f'api:asset_list_{version}')
@@ -36,9 +61,12 @@ class CRUDAssetEndpointsTest(TestCase, ParametrizedTestCase):
 
     def create_asset(self, data, version):
         asset_list_url = reverse(f'api:asset_list_{version}')
-        return self.client.post(
+        asset = self.client.post(
             asset_list_url, data=get_request_data(data, version)
         ).data
+        # v2 also returns the id of the ingestion job.
+        asset.pop('job_id', None)
+        return asset
 
     def update_asset(self, asset_id, data, version):
         return self.client.put(
@@ -65,7 +93,10 @@ class CRUDAssetEndpointsTest(TestCase, ParametrizedTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(assets), 0)
 
-    @parametrize_version
+    @parametrize(
+        'version',
+        [('v1',), ('v1_1',), ('v1_2',)],
+    )
     def test_create_asset_should_return_201(self, version):
         asset_list_url = reverse(f'api:asset_list_{version}')
         response = self.client.post(
@@ -81,10 +112,28 @@ class CRUDAssetEndpointsTest(TestCase, ParametrizedTestCase):
         self.assertEqual(response.data['play_order'], 0)
         self.assertEqual(response.data['skip_asset_check'], 0)
 
-    @mock.patch('api.serializers.mixins.rename')
+    @mock.patch('api.helpers.ingest_asset')
+    def test_create_asset_v2_starts_ingest_job(self, ingest_mock):
+        response = self.client.post(
+            reverse('api:asset_list_v2'),
+            data=get_request_data(ASSET_CREATION_DATA, 'v2'),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['name'], 'Anthias')
+        self.assertTrue(response.data['is_processing'])
+        job_id = response.data['job_id']
+        self.assertEqual(
+            response['Location'], reverse('api:job_v2', args=[job_id])
+        )
+        self.assertEqual(jobs.Job.get(self.redis, job_id)['kind'], 'ingest')
+        ingest_mock.delay.assert_called_once_with(
+            job_id, response.data['asset_id'], ''
+        )
+
     @mock.patch('api.serializers.mixins.validate_uri')
     def test_create_video_asset_v2_with_non_zero_duration_should_fail(
-        self, mock_validate_uri, mock_rename
+        self, mock_validate_uri
     ):
         """Test that v2 rejects video assets with non-zero duration."""
         mock_validate_uri.return_value = True
@@ -114,7 +163,6 @@ class CRUDAssetEndpointsTest(TestCase, ParametrizedTestCase):
             'Duration must be zero for video assets', str(response.data)
         )
 
-        self.assertEqual(mock_rename.call_count, 1)
         self.assertEqual(mock_validate_uri.call_count, 1)
 
     @parametrize_version
@@ -164,3 +212,595 @@ class CRUDAssetEndpointsTest(TestCase, ParametrizedTestCase):
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(len(assets), 0)
+
+
+class AssetThumbnailEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.asset = Asset.objects.create(
+            name='Image',
+            uri=path.join(self.tmp_dir, 'image.jpg'),
+            mimetype='image',
+            duration=10,
+        )
+        self.url = reverse(
+            'api:asset_thumbnail_v2', args=[self.asset.asset_id]
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @mock.patch('api.views.v2.r', new_callable=FakeRedis)
+    @mock.patch('api.views.v2.generate_thumbnail')
+    def test_missing_thumbnail_should_return_404(self, generate_mock, redis):
+        with open(self.asset.uri, 'wb') as f:
+            f.write(b'image')
+
+        for _ in range(2):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        generate_mock.delay.assert_called_once_with(self.asset.uri, 'image')
+        self.assertEqual(
+            redis.ttls[f'thumbnail_queued:{self.asset.uri}'],
+            AssetThumbnailViewV2.THUMBNAIL_RETRY_INTERVAL,
+        )
+
+    def test_get_thumbnail_should_be_cacheable(self):
+        with open(thumbnails.thumbnail_path(self.asset.uri), 'wb') as f:
+            f.write(b'thumbnail')
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'thumbnail')
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_versioned_thumbnail_should_be_immutable(self):
+        with open(thumbnails.thumbnail_path(self.asset.uri), 'wb') as f:
+            f.write(b'thumbnail')
+        self.asset.md5 = 'abc123'
+        self.asset.save()
+
+        response = self.client.get(
+            reverse('api:asset_detail_v2', args=[self.asset.asset_id])
+        )
+        thumbnail_url = response.data['thumbnail_url']
+        self.assertEqual(thumbnail_url, f'{self.url}?v=abc123')
+
+        response = self.client.get(thumbnail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response['Cache-Control'],
+            AssetThumbnailViewV2.VERSIONED_CACHE_CONTROL,
+        )
+
+        # An outdated version is revalidated like the unversioned URL.
+        response = self.client.get(self.url, {'v': 'outdated'})
+        self.assertIn('no-cache', response['Cache-Control'])
+
+
+class AssetDownloadEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.content = bytes(range(256)) * 4
+        self.asset = Asset.objects.create(
+            name='Video',
+            uri=path.join(self.tmp_dir, 'video.mp4'),
+            mimetype='video',
+            duration=10,
+        )
+        with open(self.asset.uri, 'wb') as f:
+            f.write(self.content)
+        self.url = reverse('api:asset_download_v2', args=[self.asset.asset_id])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_download_whole_file(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertIn('Video.mp4', response['Content-Disposition'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_download_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[10:20]
+        )
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+
+    def test_download_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(
+            b''.join(response.streaming_content), self.content[-4:]
+        )
+
+    def test_download_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        )
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_download_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_download_through_nginx(self):
+        response = self.client.get(
+            self.url,
+            HTTP_X_SENDFILE_TYPE='X-Accel-Redirect',
+            HTTP_X_ACCEL_MAPPING=f'{self.tmp_dir}/=/protected_assets/',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected_assets/video.mp4'
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_download_url_asset_redirects(self):
+        asset = Asset.objects.create(
+            name='Web page',
+            uri='https://anthias.screenly.io',
+            mimetype='webpage',
+            duration=10,
+        )
+        response = self.client.get(
+            reverse('api:asset_download_v2', args=[asset.asset_id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(response['Location'], asset.uri)
+
+    @mock.patch('api.views.mixins.AssetContentViewMixin.MAX_CONTENT_SIZE', 10)
+    def test_content_of_large_file_is_not_inlined(self):
+        response = self.client.get(
+            reverse('api:asset_content_v2', args=[self.asset.asset_id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['download_url'], self.url)
+
+
+class UploadSessionEndpointsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.content = b'0123456789' * 100
+
+        settings_patch = mock.patch(
+            'api.views.uploads.settings', {'assetdir': self.tmp_dir}
+        )
+        settings_patch.start()
+        self.addCleanup(settings_patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def put_chunk(self, upload_id, start, end):
+        return self.client.put(
+            reverse('api:upload_session_detail_v2', args=[upload_id]),
+            data=self.content[start:end],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(self.content)}',
+        )
+
+    def test_upload_in_chunks(self):
+        response = self.client.post(
+            reverse('api:upload_session_list_v2'),
+            data={'filename': 'video.mp4', 'size': len(self.content)},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_id = response.data['upload_id']
+
+        response = self.put_chunk(upload_id, 500, 1000)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['received'], [[500, 1000]])
+
+        finalize_url = reverse(
+            'api:upload_session_finalize_v2', args=[upload_id]
+        )
+        response = self.client.post(finalize_url)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.put_chunk(upload_id, 0, 500)
+        response = self.client.post(finalize_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['ext'], '.mp4')
+        self.assertEqual(
+            response.data['md5'], hashlib.md5(self.content).hexdigest()
+        )
+        with open(response.data['uri'], 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_upload_invalid_file_type(self):
+        response = self.client.post(
+            reverse('api:upload_session_list_v2'),
+            data={'filename': 'notes.txt', 'size': 10},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_put_chunk_without_content_range(self):
+        response = self.client.post(
+            reverse('api:upload_session_list_v2'),
+            data={'filename': 'video.mp4', 'size': len(self.content)},
+            format='json',
+        )
+        response = self.client.put(
+            reverse(
+                'api:upload_session_detail_v2',
+                args=[response.data['upload_id']],
+            ),
+            data=self.content,
+            content_type='application/octet-stream',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AssetDeduplicationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.content = b'image content'
+
+        settings_patch = mock.patch.dict(settings, {'assetdir': self.tmp_dir})
+        settings_patch.start()
+        self.addCleanup(settings_patch.stop)
+
+        # Runs the ingestion pipeline right away.
+        for patch in [
+            mock.patch('api.views.v2.r', FakeRedis()),
+            mock.patch('celery_tasks.r', FakeRedis()),
+            mock.patch(
+                'api.helpers.ingest_asset.delay', side_effect=ingest_asset
+            ),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def upload_and_create(self, name):
+        upload_path = path.join(self.tmp_dir, f'{name}.tmp')
+        with open(upload_path, 'wb') as f:
+            f.write(self.content)
+
+        response = self.client.post(
+            reverse('api:asset_list_v2'),
+            data={
+                **ASSET_CREATION_DATA,
+                'name': name,
+                'uri': upload_path,
+                'ext': '.png',
+                'mimetype': 'image',
+                'skip_asset_check': 1,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return self.client.get(
+            reverse('api:asset_detail_v2', args=[response.data['asset_id']])
+        ).data
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.upload_and_create('first')
+        second = self.upload_and_create('second')
+
+        md5 = hashlib.md5(self.content).hexdigest()
+        self.assertEqual(first['uri'], path.join(self.tmp_dir, f'{md5}.png'))
+        self.assertEqual(first['uri'], second['uri'])
+        self.assertEqual(
+            Asset.objects.get(asset_id=first['asset_id']).md5, md5
+        )
+        self.assertEqual(listdir(self.tmp_dir), [f'{md5}.png'])
+
+    def test_shared_file_is_removed_with_last_asset(self):
+        first = self.upload_and_create('first')
+        second = self.upload_and_create('second')
+
+        self.client.delete(
+            reverse('api:asset_detail_v2', args=[first['asset_id']])
+        )
+        self.assertTrue(path.isfile(second['uri']))
+
+        self.client.delete(
+            reverse('api:asset_detail_v2', args=[second['asset_id']])
+        )
+        self.assertFalse(path.isfile(second['uri']))
+
+
+class AssetListQueryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('api:asset_list_v2')
+
+        for i in range(5):
+            Asset.objects.create(
+                **{
+                    **ASSET_CREATION_DATA,
+                    'name': f'asset-{i}',
+                    'is_enabled': i % 2 == 0,
+                    'play_order': i,
+                }
+            )
+
+    def test_pagination_walks_all_assets_in_play_order(self):
+        names = []
+        params = {'limit': 2}
+        while True:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            names += [asset['name'] for asset in response.data['results']]
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+
+        self.assertEqual(names, [f'asset-{i}' for i in range(5)])
+
+    def test_filters_and_sparse_fields(self):
+        response = self.client.get(
+            self.url, {'is_enabled': 'true', 'fields': 'asset_id,name'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [asset['name'] for asset in response.data],
+            ['asset-0', 'asset-2', 'asset-4'],
+        )
+        self.assertEqual(set(response.data[0]), {'asset_id', 'name'})
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in [
+            {'fields': 'name,nope'},
+            {'is_enabled': 'maybe'},
+            {'limit': 0},
+            {'cursor': 'garbage'},
+        ]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Asset.objects.filter(name='asset-0').first().save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class AssetBulkEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('api:asset_bulk_v2')
+
+        self.assets = [
+            Asset.objects.create(
+                **{
+                    **ASSET_CREATION_DATA,
+                    'name': f'asset-{i}',
+                    'is_enabled': True,
+                    'play_order': i,
+                }
+            )
+            for i in range(3)
+        ]
+
+    def post(self, operations):
+        return self.client.post(
+            self.url, data={'operations': operations}, format='json'
+        )
+
+    def get_playlist(self):
+        return list(
+            Asset.objects.filter(is_enabled=True)
+            .order_by('play_order')
+            .values_list('name', flat=True)
+        )
+
+    @mock.patch('api.views.v2.r', FakeRedis())
+    @mock.patch('api.helpers.ingest_asset')
+    def test_operations_are_applied_in_one_batch(self, mock_ingest):
+        response = self.post(
+            [
+                {
+                    'op': 'create',
+                    'data': {
+                        **ASSET_UPDATE_DATA_V2,
+                        'name': 'new',
+                        'mimetype': 'webpage',
+                        'play_order': 1,
+                        'skip_asset_check': True,
+                    },
+                },
+                {'op': 'disable', 'asset_id': self.assets[0].asset_id},
+                {'op': 'delete', 'asset_id': self.assets[2].asset_id},
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            [202, 200, 204],
+        )
+        self.assertEqual(response.data['results'][0]['asset']['name'], 'new')
+        mock_ingest.delay.assert_called_once_with(
+            response.data['results'][0]['job_id'],
+            response.data['results'][0]['asset_id'],
+            '',
+        )
+        self.assertEqual(self.get_playlist(), ['asset-1', 'new'])
+        self.assertFalse(
+            Asset.objects.filter(asset_id=self.assets[2].asset_id).exists()
+        )
+
+    def test_failing_operation_does_not_affect_the_others(self):
+        response = self.post(
+            [
+                {'op': 'delete', 'asset_id': 'missing'},
+                {
+                    'op': 'update',
+                    'asset_id': self.assets[1].asset_id,
+                    'data': {'duration': 'forever'},
+                },
+                {'op': 'explode', 'asset_id': self.assets[1].asset_id},
+                {'op': 'disable', 'asset_id': self.assets[1].asset_id},
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            [404, 400, 400, 200],
+        )
+        self.assertEqual(self.get_playlist(), ['asset-0', 'asset-2'])
+
+    @mock.patch('api.views.v2.r', FakeRedis())
+    @mock.patch('api.helpers.ingest_asset')
+    def test_operations_are_validated_before_the_transaction(self, _):
+        savepoints = []
+        is_valid = CreateAssetSerializerV2.is_valid
+
+        def record_savepoints(serializer, *args, **kwargs):
+            savepoints.append(len(connection.savepoint_ids))
+            return is_valid(serializer, *args, **kwargs)
+
+        data = {
+            **ASSET_UPDATE_DATA_V2,
+            'name': 'new',
+            'mimetype': 'webpage',
+            'skip_asset_check': True,
+        }
+        with mock.patch.object(
+            CreateAssetSerializerV2, 'is_valid', record_savepoints
+        ):
+            response = self.post(
+                [{'op': 'create', 'data': data}] * 2
+                + [{'op': 'delete', 'asset_id': self.assets[0].asset_id}]
+                + [{'op': 'update', 'asset_id': self.assets[0].asset_id}]
+            )
+
+        self.assertEqual(savepoints, [len(connection.savepoint_ids)] * 2)
+        results = response.data['results']
+        self.assertEqual(
+            [result['status'] for result in results], [202, 202, 204, 404]
+        )
+        self.assertEqual(
+            [result['asset']['name'] for result in results[:2]],
+            ['new', 'new-1'],
+        )
+
+    def test_operations_must_be_a_list(self):
+        response = self.post({'op': 'delete'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PlaylistReorderBenchmarkTest(TestCase):
+    ASSET_COUNT = 1000
+
+    def setUp(self):
+        self.client = APIClient()
+        Asset.objects.bulk_create(
+            Asset(
+                **{
+                    **ASSET_CREATION_DATA,
+                    'name': f'asset-{i}',
+                    'is_enabled': True,
+                    'play_order': i,
+                }
+            )
+            for i in range(self.ASSET_COUNT)
+        )
+
+    def test_reorder_is_applied_in_a_few_queries(self):
+        asset_ids = list(
+            Asset.objects.order_by('-play_order').values_list(
+                'asset_id', flat=True
+            )
+        )
+
+        # One UPDATE per asset used to take over a thousand queries.
+        with self.assertNumQueries(7):
+            response = self.client.post(
+                reverse('api:playlist_order_v2'),
+                data={'ids': ','.join(asset_ids)},
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            list(
+                Asset.objects.order_by('play_order').values_list(
+                    'asset_id', flat=True
+                )
+            ),
+            asset_ids,
+        )
+
+    @unittest.skipUnless(
+        getenv('RUN_BENCHMARKS'), 'Set RUN_BENCHMARKS to run the benchmarks'
+    )
+    def test_reorder_latency(self):
+        asset_ids = list(Asset.objects.values_list('asset_id', flat=True))
+        rng = random.Random(0)
+        latencies = []
+        for _ in range(20):
+            rng.shuffle(asset_ids)
+            started_at = time.perf_counter()
+            response = self.client.post(
+                reverse('api:playlist_order_v2'),
+                data={'ids': ','.join(asset_ids)},
+            )
+            latencies.append(time.perf_counter() - started_at)
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        print(
+            f'\nReordering {self.ASSET_COUNT} assets: '
+            f'p50 {statistics.median(latencies) * 1000:.0f} ms, '
+            f'p95 {statistics.quantiles(latencies, n=20)[-1] * 1000:.0f} ms, '
+            f'max {max(latencies) * 1000:.0f} ms'
+        )
+
+    def test_unchanged_order_is_not_written(self):
+        asset_ids = list(
+            Asset.objects.order_by('play_order').values_list(
+                'asset_id', flat=True
+            )
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                reverse('api:playlist_order_v2'),
+                data={'ids': ','.join(asset_ids)},
+            )
+
+        self.assertFalse(
+            [query for query in queries if 'UPDATE' in query['sql']]
+        )
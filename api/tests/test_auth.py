@@ -0,0 +1,107 @@
+"""
+Tests for token authentication.
+"""
+
+import hashlib
+import time
+from base64 import b64encode
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from settings import settings
+
+
+class TokenAuthTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.assets_url = reverse('api:asset_list_v2')
+        self.token_url = reverse('api:auth_token_v2')
+
+        settings_patch = mock.patch.dict(
+            settings,
+            {
+                'auth_backend': 'auth_basic',
+                'user': 'admin',
+                'password': hashlib.sha256(b'secret').hexdigest(),
+            },
+        )
+        settings_patch.start()
+        self.addCleanup(settings_patch.stop)
+
+    def _create_token(self):
+        credentials = b64encode(b'admin:secret').decode()
+        response = self.client.post(
+            self.token_url, HTTP_AUTHORIZATION=f'Basic {credentials}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def _get_with_token(self, token):
+        return self.client.get(
+            self.assets_url, HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+
+    def test_token_authenticates_requests(self):
+        data = self._create_token()
+
+        self.assertAlmostEqual(
+            data['expires_at'], time.time() + 7 * 24 * 3600, delta=5
+        )
+        response = self._get_with_token(data['token'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_tokens_are_rejected(self):
+        token = self._create_token()['token']
+
+        self.assertEqual(
+            self._get_with_token(token[:-1] + 'x').status_code,
+            status.HTTP_302_FOUND,
+        )
+        self.assertEqual(
+            self.client.post(self.token_url).status_code,
+            status.HTTP_302_FOUND,
+        )
+
+        with mock.patch(
+            'lib.auth.time.time', return_value=time.time() + 8 * 24 * 3600
+        ):
+            self.assertEqual(
+                self._get_with_token(token).status_code,
+                status.HTTP_302_FOUND,
+            )
+
+    def test_password_change_revokes_tokens(self):
+        token = self._create_token()['token']
+
+        settings['password'] = hashlib.sha256(b'changed').hexdigest()
+
+        self.assertEqual(
+            self._get_with_token(token).status_code, status.HTTP_302_FOUND
+        )
+
+    def test_login_keeps_a_token_in_the_session_cookie(self):
+        response = self.client.post(
+            reverse('anthias_app:login'),
+            {'username': 'admin', 'password': 'secret'},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertNotIn('secret', self.client.session.values())
+        self.assertIn('auth_token', self.client.session)
+        # Nothing is written to screenly.db.
+        self.assertEqual(Session.objects.count(), 0)
+
+        response = self.client.get(self.assets_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_tokens_need_authentication_enabled(self):
+        settings['auth_backend'] = ''
+
+        response = self.client.post(self.token_url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
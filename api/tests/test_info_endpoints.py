@@ -2,6 +2,11 @@
 Tests for Info API endpoints (v1 and v2).
 """
 
+import json
+import shutil
+import tempfile
+import time
+from os import path
 from unittest import mock
 
 from django.test import TestCase
@@ -9,6 +14,22 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from lib import device_info
+from lib.timeseries import TimeSeries
+
+
+def get_redis_mock(samples, display_power):
+    """
+    Returns a Redis client mock holding the given device info samples.
+    """
+    redis_mock = mock.MagicMock()
+    redis_mock.get.return_value = display_power
+    redis_mock.hmget.side_effect = lambda key, names: [
+        json.dumps(samples[name]) if name in samples else None
+        for name in names
+    ]
+    return redis_mock
+
 
 class InfoEndpointsTest(TestCase):
     def setUp(self):
@@ -16,34 +37,28 @@ class InfoEndpointsTest(TestCase):
         self.info_url_v1 = reverse('api:info_v1')
         self.info_url_v2 = reverse('api:info_v2')
 
-    def _assert_mock_calls(self, mocks):
-        """Assert that all mocks were called exactly once."""
-        for mock_obj in mocks:
-            self.assertEqual(mock_obj.call_count, 1)
-
     def _assert_response_data(self, data, expected_data):
         """Assert that the response data matches the expected data."""
         for key, expected_value in expected_data.items():
             self.assertEqual(data[key], expected_value)
 
-    @mock.patch('api.views.mixins.is_up_to_date', return_value=False)
-    @mock.patch('lib.diagnostics.get_load_avg', return_value={'15 min': 0.11})
-    @mock.patch('api.views.mixins.size', return_value='15G')
-    @mock.patch('api.views.mixins.statvfs', mock.MagicMock())
-    @mock.patch('api.views.mixins.r.get', return_value='off')
-    def test_info_v1_endpoint(
-        self, redis_get_mock, size_mock, get_load_avg_mock, is_up_to_date_mock
-    ):
-        response = self.client.get(self.info_url_v1)
+    def test_info_v1_endpoint(self):
+        sampled_at = time.time() - 10
+        samples = {
+            'loadavg': {'value': 0.11, 'time': sampled_at},
+            'free_space': {'value': '15G', 'time': sampled_at},
+            'up_to_date': {'value': False, 'time': sampled_at},
+        }
+
+        with mock.patch(
+            'api.views.mixins.r', get_redis_mock(samples, 'off')
+        ) as redis_mock:
+            response = self.client.get(self.info_url_v1)
         data = response.data
 
         # Assert response status
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-
-        # Assert mock calls
-        self._assert_mock_calls(
-            [redis_get_mock, size_mock, get_load_avg_mock, is_up_to_date_mock]
-        )
+        redis_mock.get.assert_called_once_with('display_power')
 
         # Assert response data
         expected_data = {
@@ -54,84 +69,15 @@ class InfoEndpointsTest(TestCase):
             'up_to_date': False,
         }
         self._assert_response_data(data, expected_data)
+        for name in ['loadavg', 'free_space', 'up_to_date']:
+            self.assertAlmostEqual(data['ages'][name], 10, delta=5)
 
-    @mock.patch('api.views.v2.is_up_to_date', return_value=True)
-    @mock.patch('lib.diagnostics.get_load_avg', return_value={'15 min': 0.25})
-    @mock.patch('api.views.v2.size', return_value='20G')
-    @mock.patch('api.views.v2.statvfs', mock.MagicMock())
-    @mock.patch('api.views.v2.r.get', return_value='on')
-    @mock.patch('api.views.v2.diagnostics.get_git_branch', return_value='main')
-    @mock.patch(
-        'api.views.v2.diagnostics.get_git_short_hash', return_value='a1b2c3d'
-    )
-    @mock.patch(
-        'api.views.v2.device_helper.parse_cpu_info',
-        return_value={'model': 'Raspberry Pi 4'},
-    )
-    @mock.patch('api.views.v2.diagnostics.get_uptime', return_value=86400)
-    @mock.patch(
-        'api.views.v2.psutil.virtual_memory',
-        return_value=mock.MagicMock(
-            total=8192 << 20,  # 8GB
-            used=4096 << 20,  # 4GB
-            free=4096 << 20,  # 4GB
-            shared=0,
-            buffers=1024 << 20,  # 1GB
-            available=7168 << 20,  # 7GB
-        ),
-    )
-    @mock.patch(
-        'api.views.v2.get_node_mac_address', return_value='00:11:22:33:44:55'
-    )
-    @mock.patch(
-        'api.views.v2.get_node_ip', return_value='192.168.1.100 10.0.0.50'
-    )
     @mock.patch('api.views.v2.getenv', return_value='testuser')
-    def test_info_v2_endpoint(
-        self,
-        getenv_mock,
-        get_node_ip_mock,
-        mac_address_mock,
-        virtual_memory_mock,
-        get_uptime_mock,
-        parse_cpu_info_mock,
-        get_git_short_hash_mock,
-        get_git_branch_mock,
-        redis_get_mock,
-        size_mock,
-        get_load_avg_mock,
-        is_up_to_date_mock,
-    ):
-        response = self.client.get(self.info_url_v2)
-        data = response.data
-
-        # Assert response status
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-
-        # Assert mock calls
-        self._assert_mock_calls(
-            [
-                redis_get_mock,
-                size_mock,
-                get_load_avg_mock,
-                is_up_to_date_mock,
-                get_git_branch_mock,
-                get_git_short_hash_mock,
-                parse_cpu_info_mock,
-                get_uptime_mock,
-                virtual_memory_mock,
-                mac_address_mock,
-                get_node_ip_mock,
-                getenv_mock,
-            ]
-        )
-
-        # Assert response data
-        expected_data = {
-            'viewlog': 'Not yet implemented',
+    def test_info_v2_endpoint(self, getenv_mock):
+        sampled_at = time.time()
+        values = {
             'loadavg': 0.25,
             'free_space': '20G',
-            'display_power': 'on',
             'up_to_date': True,
             'anthias_version': 'main@a1b2c3d',
             'device_model': 'Raspberry Pi 4',
@@ -146,6 +92,93 @@ class InfoEndpointsTest(TestCase):
             },
             'ip_addresses': ['http://192.168.1.100', 'http://10.0.0.50'],
             'mac_address': '00:11:22:33:44:55',
+        }
+        samples = {
+            name: {'value': value, 'time': sampled_at}
+            for name, value in values.items()
+        }
+
+        with mock.patch('api.views.v2.r', get_redis_mock(samples, 'on')):
+            response = self.client.get(self.info_url_v2)
+        data = response.data
+
+        # Assert response status
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        getenv_mock.assert_called_once_with('HOST_USER')
+
+        # Assert response data
+        expected_data = {
+            'viewlog': 'Not yet implemented',
+            'display_power': 'on',
             'host_user': 'testuser',
+            # Not sampled yet.
+            'cpu_temp': None,
+            'throttle_state': None,
+            **values,
         }
         self._assert_response_data(data, expected_data)
+        self.assertEqual(set(data['ages']), set(device_info.COLLECTORS))
+        self.assertIsNone(data['ages']['cpu_temp'])
+        self.assertLess(data['ages']['memory'], 5)
+
+
+class InfoHistoryEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('api:info_history_v2')
+        self.tmp_dir = tempfile.mkdtemp()
+        self.history = TimeSeries(
+            path.join(self.tmp_dir, 'health.rrd'),
+            device_info.HISTORY_METRICS,
+            device_info.HISTORY_STEP,
+            device_info.HISTORY_SLOTS,
+        )
+
+        history_patch = mock.patch(
+            'api.views.v2.device_info.get_history', return_value=self.history
+        )
+        history_patch.start()
+        self.addCleanup(history_patch.stop)
+
+    def tearDown(self):
+        self.history.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_history_is_downsampled(self):
+        for i in range(12):
+            self.history.add({'cpu_temp': 50 + i}, 1000 + i * 5)
+
+        response = self.client.get(
+            self.url,
+            {
+                'start': 1000,
+                'end': 1060,
+                'buckets': 2,
+                'metrics': 'cpu_temp',
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['time'], [1000, 1030])
+        self.assertEqual(
+            response.data['metrics'],
+            {
+                'cpu_temp': {
+                    'min': [50, 56],
+                    'avg': [52.5, 58.5],
+                    'max': [55, 61],
+                }
+            },
+        )
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in [
+            {'metrics': 'cpu_temp,nope'},
+            {'start': 'yesterday'},
+            {'start': 2000, 'end': 1000},
+            {'buckets': 0},
+        ]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
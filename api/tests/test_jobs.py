@@ -0,0 +1,124 @@
+"""
+Tests for background job endpoints.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from lib import backup_helper, jobs
+from tests.test_jobs import FakeRedis
+
+
+class JobEndpointsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.redis = FakeRedis()
+        redis_patch = mock.patch('api.views.v2.r', self.redis)
+        redis_patch.start()
+        self.addCleanup(redis_patch.stop)
+
+    @mock.patch('api.views.v2.update_containers')
+    def test_update_starts_job(self, update_mock):
+        response = self.client.post(reverse('api:update_v2'))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job_id']
+        update_mock.delay.assert_called_once_with(job_id)
+        self.assertEqual(
+            response['Location'], reverse('api:job_v2', args=[job_id])
+        )
+
+        response = self.client.get(response['Location'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['kind'], 'update')
+        self.assertEqual(response.data['state'], jobs.PENDING)
+
+    @mock.patch('api.views.v2.create_backup')
+    def test_backup_starts_job(self, backup_mock):
+        response = self.client.post(reverse('api:backup_v2'))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job_id']
+        backup_mock.delay.assert_called_once_with(job_id, mock.ANY, False)
+        self.assertEqual(jobs.Job.get(self.redis, job_id)['kind'], 'backup')
+
+    @mock.patch(
+        'api.views.v2.backup_helper.iter_backup',
+        return_value=iter([b'part 1', b'part 2']),
+    )
+    def test_backup_download_is_streamed(self, iter_mock):
+        response = self.client.get(reverse('api:backup_download_v2'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-tar')
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content), b'part 1part 2')
+
+    def test_missing_job(self):
+        response = self.client.get(reverse('api:job_v2', args=['nope']))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RecoverEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('api:recover_v2')
+        self.home = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.home)
+
+        self.lock_redis = mock.MagicMock()
+        for patch in [
+            mock.patch.dict('os.environ', {'HOME': self.home}),
+            mock.patch('api.views.v2.r', FakeRedis()),
+            mock.patch('api.views.mixins.r', self.lock_redis),
+            mock.patch('api.views.v2.ZmqPublisher'),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _upload(self, name='backup.tar'):
+        return self.client.post(
+            self.url,
+            {'backup_upload': SimpleUploadedFile(name, b'archive')},
+            format='multipart',
+        )
+
+    @mock.patch('api.views.v2.recover_backup')
+    def test_recovery_starts_job(self, recover_mock):
+        self.lock_redis.set.return_value = True
+
+        response = self._upload()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id, file_path = recover_mock.delay.call_args.args
+        self.assertEqual(job_id, response.data['job_id'])
+        self.assertEqual(
+            os.path.dirname(file_path), backup_helper.get_backup_dir()
+        )
+        with open(file_path, 'rb') as f:
+            self.assertEqual(f.read(), b'archive')
+        self.lock_redis.delete.assert_not_called()
+
+    @mock.patch('api.views.v2.recover_backup')
+    def test_one_recovery_at_a_time(self, recover_mock):
+        self.lock_redis.set.return_value = None
+
+        response = self._upload()
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        recover_mock.delay.assert_not_called()
+
+    def test_wrong_file_type(self):
+        response = self._upload('backup.zip')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,54 @@
+"""
+Tests for the metrics endpoint.
+"""
+
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from lib import metrics
+
+
+class MetricsEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        metrics.REQUEST_DURATION.clear()
+        metrics.REQUEST_QUERIES.clear()
+
+        redis_mock = mock.MagicMock()
+        redis_mock.hgetall.return_value = {}
+        redis_mock.hmget.side_effect = lambda key, names: [None] * len(names)
+        redis_patch = mock.patch('api.views.metrics.r', redis_mock)
+        redis_patch.start()
+        self.addCleanup(redis_patch.stop)
+
+    def test_api_requests_are_measured(self):
+        self.client.get(reverse('api:asset_list_v2'))
+
+        response = self.client.get(reverse('metrics'))
+        text = response.content.decode()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn(
+            'anthias_http_request_duration_seconds_count'
+            '{view="api:asset_list_v2",method="GET",status="200"} 1',
+            text,
+        )
+        self.assertIn(
+            'anthias_http_request_db_queries_count'
+            '{view="api:asset_list_v2",method="GET"} 1',
+            text,
+        )
+        self.assertIn('# TYPE anthias_celery_task_duration_seconds', text)
+        self.assertTrue(text.endswith('# EOF\n'))
+
+    def test_other_requests_are_not_measured(self):
+        self.client.get(reverse('metrics'))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertNotIn('view="metrics"', response.content.decode())
@@ -0,0 +1,138 @@
+"""
+Tests for the schedule API endpoints.
+"""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from anthias_app.models import Asset, ScheduleSlot, ScheduleSlotItem
+from api.tests.test_common import ASSET_CREATION_DATA
+
+
+class ScheduleSlotItemOrderTest(TestCase):
+    ITEM_COUNT = 1000
+
+    def setUp(self):
+        self.client = APIClient()
+        self.slot = ScheduleSlot.objects.create(name='Morning')
+        assets = Asset.objects.bulk_create(
+            Asset(**{**ASSET_CREATION_DATA, 'name': f'asset-{i}'})
+            for i in range(self.ITEM_COUNT)
+        )
+        ScheduleSlotItem.objects.bulk_create(
+            ScheduleSlotItem(slot=self.slot, asset=asset, sort_order=i)
+            for i, asset in enumerate(assets)
+        )
+        self.url = reverse(
+            'api:schedule_slot_item_order', args=[self.slot.slot_id]
+        )
+
+    def get_item_ids(self):
+        return list(
+            self.slot.items.order_by('sort_order').values_list(
+                'item_id', flat=True
+            )
+        )
+
+    def test_reorder_is_applied_in_a_few_queries(self):
+        item_ids = self.get_item_ids()[::-1]
+
+        with self.assertNumQueries(9) as queries:
+            response = self.client.post(
+                self.url, data={'ids': item_ids}, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_item_ids(), item_ids)
+        self.assertEqual([item['item_id'] for item in response.data], item_ids)
+        updates = [query for query in queries if 'UPDATE' in query['sql']]
+        self.assertLess(len(updates), 5)
+
+    def test_only_moved_items_are_written(self):
+        item_ids = self.get_item_ids()
+        item_ids[0], item_ids[1] = item_ids[1], item_ids[0]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url, data={'ids': item_ids}, format='json')
+
+        updates = [query for query in queries if 'UPDATE' in query['sql']]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0]['sql'].count('WHEN'), 2)
+        self.assertEqual(self.get_item_ids(), item_ids)
+
+
+class ScheduleQueryCountTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('api:schedule_slot_list')
+
+    def add_slots(self, count):
+        for i in range(count):
+            slot = ScheduleSlot.objects.create(
+                name=f'slot-{i}',
+                time_from=f'{i:02d}:00',
+                time_to=f'{i:02d}:30',
+            )
+            for j in range(3):
+                asset = Asset.objects.create(
+                    **{**ASSET_CREATION_DATA, 'name': f'asset-{i}-{j}'}
+                )
+                ScheduleSlotItem.objects.create(
+                    slot=slot, asset=asset, sort_order=j
+                )
+
+    def count_queries(self, url):
+        # Warm up the schedule version, which is cached between requests.
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_slot_list_queries_do_not_grow_with_slots(self):
+        self.add_slots(2)
+        query_count = self.count_queries(self.url)
+
+        self.add_slots(10)
+        self.assertEqual(self.count_queries(self.url), query_count)
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 12)
+        self.assertEqual(
+            response.data[0]['items'][0]['asset_name'], 'asset-0-0'
+        )
+
+    def test_status_queries_do_not_grow_with_items(self):
+        ScheduleSlot.objects.create(name='Default', is_default=True)
+        url = reverse('api:schedule_status')
+        query_count = self.count_queries(url)
+
+        default_slot = ScheduleSlot.objects.get(is_default=True)
+        for i in range(10):
+            asset = Asset.objects.create(
+                **{**ASSET_CREATION_DATA, 'name': f'asset-{i}'}
+            )
+            ScheduleSlotItem.objects.create(slot=default_slot, asset=asset)
+
+        self.assertEqual(self.count_queries(url), query_count)
+
+    def test_unchanged_schedule_is_not_modified(self):
+        self.add_slots(1)
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        slot = ScheduleSlot.objects.get()
+        slot.name = 'renamed'
+        slot.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['name'], 'renamed')
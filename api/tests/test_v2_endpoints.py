@@ -3,6 +3,8 @@ Tests for V2 API endpoints.
 """
 
 import hashlib
+import tempfile
+from datetime import datetime, timezone
 from unittest import mock
 from unittest.mock import patch
 
@@ -11,6 +13,10 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from anthias_app.models import Asset
+from api.views.v2 import ScreenshotStreamViewV2, ScreenshotViewV2
+from tests.test_jobs import FakeRedis
+
 
 class DeviceSettingsViewV2Test(TestCase):
     def setUp(self):
@@ -19,20 +25,21 @@ class DeviceSettingsViewV2Test(TestCase):
 
     @mock.patch('api.views.v2.settings')
     def test_get_device_settings(self, settings_mock):
-        settings_mock.__getitem__.side_effect = lambda key: {
+        settings_mock.snapshot.return_value = {
             'player_name': 'Test Player',
             'audio_output': 'hdmi',
             'default_duration': '15',
             'default_streaming_duration': '100',
             'date_format': 'YYYY-MM-DD',
             'auth_backend': '',
+            'resolution': '1920x1080',
             'show_splash': True,
             'default_assets': [],
             'shuffle_playlist': False,
             'use_24_hour_clock': True,
             'debug_logging': False,
             'user': '',
-        }[key]
+        }
 
         response = self.client.get(self.device_settings_url)
 
@@ -278,8 +285,24 @@ class DeviceSettingsViewV2Test(TestCase):
 
         publisher_instance.send_to_viewer.assert_called_once_with('reload')
 
+        settings_mock.snapshot.return_value = {
+            'player_name': 'Test Player',
+            'auth_backend': '',
+            'user': 'testuser',
+            'audio_output': 'hdmi',
+            'default_duration': '15',
+            'default_streaming_duration': '100',
+            'date_format': 'YYYY-MM-DD',
+            'resolution': '1920x1080',
+            'show_splash': True,
+            'default_assets': [],
+            'shuffle_playlist': False,
+            'use_24_hour_clock': True,
+            'debug_logging': False,
+        }
         response = self.client.get(self.device_settings_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], '')
 
     @mock.patch('api.views.v2.settings')
     @mock.patch('api.views.v2.ZmqPublisher')
@@ -433,3 +456,86 @@ class TestIntegrationsViewV2(TestCase):
                 'balena_device_name_at_init': None,
             },
         )
+
+
+class ScreenshotViewV2Test(TestCase):
+    @mock.patch('api.views.v2.build_keyframe_index')
+    @mock.patch('lib.keyframes.read_frame', return_value=None)
+    def test_missing_keyframe_index_is_queued_once(self, _, build_mock):
+        redis = FakeRedis()
+        view = ScreenshotViewV2()
+
+        with mock.patch('api.views.v2.r', redis):
+            for _ in range(2):
+                self.assertIsNone(view._keyframe('/video.mp4', 1, None, 70))
+
+        build_mock.delay.assert_called_once_with('/video.mp4')
+        # Once the marker expires, a build that failed is queued again.
+        self.assertEqual(
+            redis.ttls['keyframe_index_queued:/video.mp4'],
+            ScreenshotViewV2.INDEX_RETRY_INTERVAL,
+        )
+
+    @mock.patch('api.views.v2.probe_media')
+    @mock.patch('lib.media_info.probe')
+    @mock.patch('api.views.v2.viewlog.get_latest')
+    def test_video_is_not_probed_for_screenshot(
+        self, get_latest_mock, probe_mock, probe_media_mock
+    ):
+        video = tempfile.NamedTemporaryFile(suffix='.mp4')
+        self.addCleanup(video.close)
+        asset = Asset.objects.create(
+            name='Video', uri=video.name, mimetype='video', duration=60
+        )
+        get_latest_mock.return_value = {
+            'asset_id': asset.asset_id,
+            'mimetype': 'video',
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'ended_at': None,
+        }
+        redis = FakeRedis()
+
+        with mock.patch('api.views.v2.r', redis):
+            for _ in range(2):
+                video_path, _ = ScreenshotViewV2._get_current_video()
+                self.assertEqual(video_path, video.name)
+
+        probe_mock.assert_not_called()
+        probe_media_mock.delay.assert_called_once_with(video.name)
+
+
+class ScreenshotStreamViewV2Test(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('api:screenshot_stream_v2')
+
+        capture_patch = mock.patch(
+            'api.views.v2.ScreenshotStreamViewV2._capture',
+            return_value=b'jpeg',
+        )
+        self.capture_mock = capture_patch.start()
+        self.addCleanup(capture_patch.stop)
+
+    def test_width_must_be_positive(self):
+        for url in [reverse('api:screenshot_v2'), self.url]:
+            for width in [0, -100]:
+                response = self.client.get(url, {'width': width})
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+        self.capture_mock.assert_not_called()
+
+    def test_parameters_are_snapped_and_broadcaster_dropped(self):
+        response = self.client.get(
+            self.url, {'fps': 3, 'width': 700, 'quality': 73}
+        )
+        frames = iter(response.streaming_content)
+
+        self.assertIn(b'jpeg', next(frames))
+        self.assertEqual(
+            list(ScreenshotStreamViewV2._broadcasters), [(2, 640, 70)]
+        )
+        self.capture_mock.assert_called_with(640, 70)
+
+        response.close()
+        self.assertEqual(ScreenshotStreamViewV2._broadcasters, {})
@@ -0,0 +1,123 @@
+"""
+Tests for the playback history endpoints.
+"""
+
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from os import path
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from anthias_app.models import Asset
+from lib import viewlog
+
+
+class ViewLogEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.tmp_dir = tempfile.mkdtemp()
+        db_path_patch = mock.patch.object(
+            viewlog,
+            'get_db_path',
+            return_value=path.join(self.tmp_dir, 'viewlog.db'),
+        )
+        db_path_patch.start()
+        self.addCleanup(db_path_patch.stop)
+
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i in range(5):
+            viewlog.log_playback(
+                f'asset-{i}', f'Asset {i}', 'image', start + timedelta(hours=i)
+            )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_all_entries_are_listed_without_parameters(self):
+        response = self.client.get(reverse('api:viewlog_v2'))
+        entries = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [entry['asset_id'] for entry in entries],
+            [f'asset-{i}' for i in range(5)],
+        )
+
+    def test_entries_are_paginated_by_cursor(self):
+        asset_ids = []
+        params = {'limit': 2, 'since': '2026-01-01T00:30:00Z'}
+        while True:
+            response = self.client.get(reverse('api:viewlog_v2'), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            asset_ids += [e['asset_id'] for e in response.data['results']]
+            if response.data['next_cursor'] is None:
+                break
+            params['cursor'] = response.data['next_cursor']
+
+        self.assertEqual(
+            asset_ids, ['asset-1', 'asset-2', 'asset-3', 'asset-4']
+        )
+
+    def test_entries_are_exported_as_ndjson(self):
+        response = self.client.get(
+            reverse('api:viewlog_export_v2'), {'cursor': 3}
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(line)['id'] for line in lines], [4, 5])
+
+    def test_report_is_answered_from_rollups(self):
+        Asset.objects.create(asset_id='asset-1', name='Asset 1')
+        entry_id = viewlog.log_playback(
+            'asset-1',
+            'Asset 1',
+            'image',
+            datetime(2026, 1, 2, tzinfo=timezone.utc),
+        )
+        viewlog.end_playback(
+            entry_id, datetime(2026, 1, 2, 0, 0, 30, tzinfo=timezone.utc)
+        )
+
+        response = self.client.get(
+            reverse('api:viewlog_report_v2'),
+            {
+                'start': '2026-01-01T00:00:00+00:00',
+                'end': '2026-01-08T00:00:00+00:00',
+                'asset_id': 'asset-1',
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['assets'],
+            [
+                {
+                    'asset_id': 'asset-1',
+                    'plays': 2,
+                    'seconds': 30,
+                    'name': 'Asset 1',
+                }
+            ],
+        )
+
+    def test_invalid_parameters_are_rejected(self):
+        for url, params in [
+            (reverse('api:viewlog_v2'), {'since': 'yesterday'}),
+            (reverse('api:viewlog_v2'), {'limit': 0}),
+            (reverse('api:viewlog_v2'), {'limit': 5000}),
+            (reverse('api:viewlog_export_v2'), {'cursor': 'abc'}),
+            (reverse('api:viewlog_report_v2'), {'start': 'last week'}),
+            (reverse('api:viewlog_report_v2'), {'end': '2026-01-01T00:00'}),
+        ]:
+            response = self.client.get(url, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
@@ -8,27 +8,42 @@ from api.views.schedule import (
     ScheduleSlotListView,
     ScheduleStatusView,
 )
+from api.views.uploads import (
+    UploadSessionDetailView,
+    UploadSessionFinalizeView,
+    UploadSessionListView,
+)
 from api.views.v2 import (
+    AssetBulkViewV2,
     AssetContentViewV2,
+    AssetDownloadViewV2,
     AssetListViewV2,
+    AssetThumbnailViewV2,
     AssetsControlViewV2,
     AssetViewV2,
+    AuthTokenViewV2,
+    BackupDownloadViewV2,
     BackupViewV2,
     CecStandbyViewV2,
     CecStatusViewV2,
     CecWakeViewV2,
     DeviceSettingsViewV2,
     FileAssetViewV2,
+    InfoHistoryViewV2,
     InfoViewV2,
     IntegrationsViewV2,
     IrStatusViewV2,
     IrTestViewV2,
+    JobViewV2,
     PlaylistOrderViewV2,
     RebootViewV2,
     RecoverViewV2,
+    ScreenshotStreamViewV2,
     ScreenshotViewV2,
     ShutdownViewV2,
     UpdateViewV2,
+    ViewLogExportViewV2,
+    ViewLogReportViewV2,
     ViewLogViewV2,
 )
 
@@ -41,6 +56,11 @@ def get_url_patterns():
             PlaylistOrderViewV2.as_view(),
             name='playlist_order_v2',
         ),
+        path(
+            'v2/assets/bulk',
+            AssetBulkViewV2.as_view(),
+            name='asset_bulk_v2',
+        ),
         path(
             'v2/assets/control/<str:command>',
             AssetsControlViewV2.as_view(),
@@ -51,16 +71,51 @@ def get_url_patterns():
             AssetViewV2.as_view(),
             name='asset_detail_v2',
         ),
+        path(
+            'v2/auth/token',
+            AuthTokenViewV2.as_view(),
+            name='auth_token_v2',
+        ),
         path('v2/backup', BackupViewV2.as_view(), name='backup_v2'),
+        path(
+            'v2/backup/download',
+            BackupDownloadViewV2.as_view(),
+            name='backup_download_v2',
+        ),
         path('v2/recover', RecoverViewV2.as_view(), name='recover_v2'),
         path('v2/reboot', RebootViewV2.as_view(), name='reboot_v2'),
         path('v2/shutdown', ShutdownViewV2.as_view(), name='shutdown_v2'),
         path('v2/file_asset', FileAssetViewV2.as_view(), name='file_asset_v2'),
+        path(
+            'v2/uploads',
+            UploadSessionListView.as_view(),
+            name='upload_session_list_v2',
+        ),
+        path(
+            'v2/uploads/<str:upload_id>',
+            UploadSessionDetailView.as_view(),
+            name='upload_session_detail_v2',
+        ),
+        path(
+            'v2/uploads/<str:upload_id>/finalize',
+            UploadSessionFinalizeView.as_view(),
+            name='upload_session_finalize_v2',
+        ),
         path(
             'v2/assets/<str:asset_id>/content',
             AssetContentViewV2.as_view(),
             name='asset_content_v2',
         ),
+        path(
+            'v2/assets/<str:asset_id>/download',
+            AssetDownloadViewV2.as_view(),
+            name='asset_download_v2',
+        ),
+        path(
+            'v2/assets/<str:asset_id>/thumbnail',
+            AssetThumbnailViewV2.as_view(),
+            name='asset_thumbnail_v2',
+        ),
         path(
             'v2/device_settings',
             DeviceSettingsViewV2.as_view(),
@@ -71,6 +126,11 @@ def get_url_patterns():
             InfoViewV2.as_view(),
             name='info_v2',
         ),
+        path(
+            'v2/info/history',
+            InfoHistoryViewV2.as_view(),
+            name='info_history_v2',
+        ),
         path(
             'v2/integrations',
             IntegrationsViewV2.as_view(),
@@ -81,16 +141,32 @@ def get_url_patterns():
             ScreenshotViewV2.as_view(),
             name='screenshot_v2',
         ),
+        path(
+            'v2/screenshot/stream',
+            ScreenshotStreamViewV2.as_view(),
+            name='screenshot_stream_v2',
+        ),
         path(
             'v2/update',
             UpdateViewV2.as_view(),
             name='update_v2',
         ),
+        path('v2/jobs/<str:job_id>', JobViewV2.as_view(), name='job_v2'),
         path(
             'v2/viewlog',
             ViewLogViewV2.as_view(),
             name='viewlog_v2',
         ),
+        path(
+            'v2/viewlog/export',
+            ViewLogExportViewV2.as_view(),
+            name='viewlog_export_v2',
+        ),
+        path(
+            'v2/viewlog/report',
+            ViewLogReportViewV2.as_view(),
+            name='viewlog_report_v2',
+        ),
         # CEC TV control
         path(
             'v2/cec/status',
@@ -0,0 +1,103 @@
+import logging
+
+from django.http import HttpResponse
+from drf_spectacular.utils import extend_schema
+from redis.exceptions import RedisError
+from rest_framework.views import APIView
+
+from lib import device_info, diagnostics, metrics
+from lib.auth import authorized
+from lib.utils import connect_to_redis
+
+r = connect_to_redis()
+
+
+class MetricsView(APIView):
+    # name: (help, snapshot value, factor)
+    DEVICE_GAUGES = {
+        'anthias_cpu_temperature_celsius': (
+            'CPU temperature.',
+            'cpu_temp',
+            1,
+        ),
+        'anthias_cpu_usage_ratio': ('CPU usage.', 'cpu_usage', 0.01),
+        'anthias_throttle_state': (
+            'Raspberry Pi throttling flags, as reported by vcgencmd.',
+            'throttle_state',
+            1,
+        ),
+        'anthias_disk_usage_ratio': (
+            'Disk usage of the root file system.',
+            'disk_usage',
+            0.01,
+        ),
+    }
+
+    def _get_device_gauges(self):
+        values, _ = device_info.get_snapshot(
+            r,
+            [value for _, value, _ in self.DEVICE_GAUGES.values()]
+            + ['memory'],
+        )
+        if values['disk_usage'] is not None:
+            values['disk_usage'] = values['disk_usage']['percent']
+
+        families = [
+            metrics.render_gauge(
+                name,
+                documentation,
+                None if values[key] is None else values[key] * factor,
+            )
+            for name, (documentation, key, factor) in (
+                self.DEVICE_GAUGES.items()
+            )
+        ]
+
+        memory = values['memory'] or {}
+        for key in ['used', 'available']:
+            families.append(
+                metrics.render_gauge(
+                    f'anthias_memory_{key}_bytes',
+                    f'Memory {key}.',
+                    memory[key] << 20 if key in memory else None,
+                )
+            )
+        return families
+
+    @extend_schema(
+        summary='Get metrics',
+        description=(
+            'Request latencies and query counts of the API views, Celery '
+            'task durations and device gauges, in the OpenMetrics text '
+            'format.'
+        ),
+        responses={200: {'type': 'string'}},
+    )
+    @authorized
+    def get(self, request):
+        families = [
+            metrics.REQUEST_DURATION.render(),
+            metrics.REQUEST_QUERIES.render(),
+            metrics.render_gauge(
+                'anthias_uptime_seconds',
+                'System uptime.',
+                diagnostics.get_uptime(),
+            ),
+            metrics.render_gauge(
+                'anthias_load_average_15m',
+                '15 minute load average.',
+                diagnostics.get_load_avg()['15 min'],
+            ),
+        ]
+
+        # The rest is kept in Redis, which may be unavailable.
+        try:
+            metrics.TASK_DURATION.load(r)
+            families.append(metrics.TASK_DURATION.render())
+            families.extend(self._get_device_gauges())
+        except RedisError as e:
+            logging.warning('Could not read metrics from Redis: %s', e)
+
+        return HttpResponse(
+            metrics.render(families), content_type=metrics.CONTENT_TYPE
+        )
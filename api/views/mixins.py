@@ -1,17 +1,20 @@
+import hashlib
+import shutil
 import uuid
 from base64 import b64encode
 from inspect import cleandoc
 from mimetypes import guess_extension, guess_type
-from os import path, remove, statvfs
+from os import makedirs, path
 
+from django.db import transaction
+from django.urls import reverse
 from drf_spectacular.utils import OpenApiParameter, OpenApiTypes, extend_schema
-from hurry.filesize import size
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from anthias_app.models import Asset
-from api.helpers import save_active_assets_ordering
+from api.helpers import remove_asset_files, save_active_assets_ordering
 from api.serializers.mixins import (
     BackupViewSerializerMixin,
     PlaylistOrderSerializerMixin,
@@ -19,9 +22,8 @@ from api.serializers.mixins import (
     ShutdownViewSerializerMixin,
 )
 from celery_tasks import reboot_anthias, shutdown_anthias
-from lib import backup_helper, diagnostics
+from lib import backup_helper, device_info, uploads
 from lib.auth import authorized
-from lib.github import is_up_to_date
 from lib.utils import connect_to_redis
 from settings import ZmqPublisher, settings
 
@@ -33,14 +35,11 @@ class DeleteAssetViewMixin:
     @authorized
     def delete(self, request, asset_id):
         asset = Asset.objects.get(asset_id=asset_id)
-
-        try:
-            if asset.uri.startswith(settings['assetdir']):
-                remove(asset.uri)
-        except OSError:
-            pass
-
-        asset.delete()
+        # The assets still using the file are counted in the same
+        # transaction as the delete.
+        with transaction.atomic():
+            asset.delete()
+            remove_asset_files(asset.uri)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -60,7 +59,7 @@ class BackupViewMixin(APIView):
         responses={
             201: {
                 'type': 'string',
-                'example': 'anthias-backup-2021-09-16T15-00-00.tar.gz',
+                'example': 'anthias-backup-2021-09-16T15-00-00.tar',
                 'description': 'Backup file name',
             }
         },
@@ -72,11 +71,42 @@ class BackupViewMixin(APIView):
 
 
 class RecoverViewMixin(APIView):
+    def _save_upload(self, file_upload) -> str:
+        """
+        Puts the upload in the backup directory for the recovery to read.
+        Django spools large uploads to a temporary file, which is moved
+        there rather than read into memory.
+        """
+        backup_dir = backup_helper.get_backup_dir()
+        makedirs(backup_dir, exist_ok=True)
+        file_path = path.join(backup_dir, f'{uuid.uuid4().hex}.recover')
+
+        if hasattr(file_upload, 'temporary_file_path'):
+            shutil.move(file_upload.temporary_file_path(), file_path)
+        else:
+            with open(file_path, 'wb') as f:
+                for chunk in file_upload.chunks():
+                    f.write(chunk)
+        return file_path
+
+    def _lock(self) -> bool:
+        return bool(
+            r.set(
+                backup_helper.RECOVERY_LOCK_KEY,
+                1,
+                nx=True,
+                ex=backup_helper.RECOVERY_TIMEOUT,
+            )
+        )
+
+    def _unlock(self):
+        r.delete(backup_helper.RECOVERY_LOCK_KEY)
+
     @extend_schema(
         summary='Recover from backup',
         description=cleandoc("""
         Recover data from a backup file. The backup file must be
-        a `.tar.gz` file.
+        a `.tar` or, for older backups, a `.tar.gz` file.
         """),
         request={
             'multipart/form-data': {
@@ -101,18 +131,20 @@ class RecoverViewMixin(APIView):
 
         if guess_type(filename)[0] != 'application/x-tar':
             raise Exception('Incorrect file extension.')
-        try:
-            publisher.send_to_viewer('stop')
-            location = path.join('static', filename)
-
-            with open(location, 'wb') as f:
-                f.write(file_upload.read())
-
-            backup_helper.recover(location)
+        if not self._lock():
+            return Response(
+                {'error': 'A backup is being recovered already.'},
+                status=status.HTTP_409_CONFLICT,
+            )
 
+        try:
+            publisher.send_to_viewer(
+                f'standby&{backup_helper.RECOVERY_LOCK_KEY}'
+            )
+            backup_helper.recover(self._save_upload(file_upload))
             return Response('Recovery successful.')
         finally:
-            publisher.send_to_viewer('play')
+            self._unlock()
 
 
 class RebootViewMixin(APIView):
@@ -168,28 +200,43 @@ class FileAssetViewMixin(APIView):
         if file_type.split('/')[0] not in ['image', 'video']:
             raise Exception('Invalid file type.')
 
-        file_path = (
-            path.join(
-                settings['assetdir'],
-                uuid.uuid5(uuid.NAMESPACE_URL, filename).hex,
-            )
-            + '.tmp'
-        )
-
         if 'Content-Range' in request.headers:
+            # Chunks of the same file have to end up in the same file, so
+            # the name is derived from the file name. New clients should use
+            # the upload sessions instead.
+            file_path = (
+                path.join(
+                    settings['assetdir'],
+                    uuid.uuid5(uuid.NAMESPACE_URL, filename).hex,
+                )
+                + '.tmp'
+            )
             range_str = request.headers['Content-Range']
             start_bytes = int(range_str.split(' ')[1].split('-')[0])
-            with open(file_path, 'ab') as f:
+            mode = 'r+b' if path.exists(file_path) else 'wb'
+            with open(file_path, mode) as f:
                 f.seek(start_bytes)
-                f.write(file_upload.read())
+                for chunk in file_upload.chunks():
+                    f.write(chunk)
         else:
+            file_path = (
+                path.join(settings['assetdir'], uuid.uuid4().hex) + '.tmp'
+            )
+            md5 = hashlib.md5()
             with open(file_path, 'wb') as f:
-                f.write(file_upload.read())
+                for chunk in file_upload.chunks():
+                    md5.update(chunk)
+                    f.write(chunk)
+            uploads.write_md5(file_path, md5.hexdigest())
 
         return Response({'uri': file_path, 'ext': guess_extension(file_type)})
 
 
 class AssetContentViewMixin(APIView):
+    # Files are returned base64-encoded in a JSON body, which has to be
+    # built in memory, so larger ones have to use the download endpoint.
+    MAX_CONTENT_SIZE = 10 * 1024 * 1024  # bytes
+
     @extend_schema(
         summary='Get asset content',
         description=cleandoc("""
@@ -198,6 +245,9 @@ class AssetContentViewMixin(APIView):
 
         In case of a file, the fields `mimetype`, `filename`, and `content`
         will be present. In case of a URL, the field `url` will be present.
+
+        Files larger than 10 MB are not returned inline, download them
+        from `/api/v2/assets/{asset_id}/download` instead.
         """),
         responses={
             200: {
@@ -217,6 +267,17 @@ class AssetContentViewMixin(APIView):
         asset = Asset.objects.get(asset_id=asset_id)
 
         if path.isfile(asset.uri):
+            if path.getsize(asset.uri) > self.MAX_CONTENT_SIZE:
+                return Response(
+                    {
+                        'error': 'Asset is too large to be returned inline',
+                        'download_url': reverse(
+                            'api:asset_download_v2', args=[asset_id]
+                        ),
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
             filename = asset.name
 
             with open(asset.uri, 'rb') as f:
@@ -295,6 +356,10 @@ class InfoViewMixin(APIView):
                     'free_space': {'type': 'string'},
                     'display_power': {'type': 'string'},
                     'up_to_date': {'type': 'boolean'},
+                    'ages': {
+                        'type': 'object',
+                        'additionalProperties': {'type': ['number', 'null']},
+                    },
                 },
                 'example': {
                     'viewlog': 'Not yet implemented',
@@ -302,25 +367,27 @@ class InfoViewMixin(APIView):
                     'free_space': '10G',
                     'display_power': 'on',
                     'up_to_date': True,
+                    'ages': {
+                        'loadavg': 4.2,
+                        'free_space': 31.0,
+                        'up_to_date': 1250.5,
+                    },
                 },
             }
         },
     )
     @authorized
     def get(self, request):
-        viewlog = 'Not yet implemented'
-
-        # Calculate disk space
-        slash = statvfs('/')
-        free_space = size(slash.f_bavail * slash.f_frsize)
-        display_power = r.get('display_power')
+        # Sampled in the background by the collect_device_info task.
+        values, ages = device_info.get_snapshot(
+            r, ['loadavg', 'free_space', 'up_to_date']
+        )
 
         return Response(
             {
-                'viewlog': viewlog,
-                'loadavg': diagnostics.get_load_avg()['15 min'],
-                'free_space': free_space,
-                'display_power': display_power,
-                'up_to_date': is_up_to_date(),
+                'viewlog': 'Not yet implemented',
+                **values,
+                'display_power': r.get('display_power'),
+                'ages': ages,
             }
         )
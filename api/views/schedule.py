@@ -2,12 +2,15 @@ import json
 import logging
 from datetime import datetime, timedelta
 
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from anthias_app.models import Asset, ScheduleSlot, ScheduleSlotItem
+from api.helpers import conditional_schedule, invalidate_schedule_version
 from api.serializers.schedule import (
     CreateScheduleSlotItemSerializer,
     ReorderSlotItemsSerializer,
@@ -33,13 +36,24 @@ def _recalculate_event_time_to(slot):
     slot.save(update_fields=['time_to'])
 
 
+def _prefetch_items():
+    """Load the items of slots, with their assets, in a single query."""
+    return Prefetch(
+        'items',
+        queryset=ScheduleSlotItem.objects.select_related('asset'),
+    )
+
+
 class ScheduleSlotListView(APIView):
     """GET: list all schedule slots.  POST: create a new slot."""
 
     @authorized
+    @conditional_schedule
     def get(self, request):
-        slots = ScheduleSlot.objects.all()
-        serializer = ScheduleSlotSerializer(slots, many=True)
+        slots = ScheduleSlot.objects.prefetch_related(_prefetch_items())
+        serializer = ScheduleSlotSerializer(
+            slots, many=True, context={'now': timezone.localtime()},
+        )
         return Response(serializer.data)
 
     @authorized
@@ -63,6 +77,7 @@ class ScheduleSlotDetailView(APIView):
             return None
 
     @authorized
+    @conditional_schedule
     def get(self, request, slot_id):
         slot = self._get_slot(slot_id)
         if slot is None:
@@ -70,6 +85,7 @@ class ScheduleSlotDetailView(APIView):
                 {'error': 'Slot not found'},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        prefetch_related_objects([slot], _prefetch_items())
         return Response(ScheduleSlotSerializer(slot).data)
 
     @authorized
@@ -117,6 +133,7 @@ class ScheduleSlotItemListView(APIView):
             return None
 
     @authorized
+    @conditional_schedule
     def get(self, request, slot_id):
         slot = self._get_slot(slot_id)
         if slot is None:
@@ -258,11 +275,22 @@ class ScheduleSlotItemOrderView(APIView):
                 serializer.errors, status=status.HTTP_400_BAD_REQUEST,
             )
 
-        item_ids = serializer.validated_data['ids']
-        for i, item_id in enumerate(item_ids):
-            ScheduleSlotItem.objects.filter(
-                item_id=item_id, slot=slot,
-            ).update(sort_order=i)
+        # Only write the items that move, in a single transaction, as each
+        # commit makes the viewer reload its playlist.
+        items = slot.items.in_bulk()
+        changed_items = []
+        for i, item_id in enumerate(serializer.validated_data['ids']):
+            item = items.get(item_id)
+            if item is not None and item.sort_order != i:
+                item.sort_order = i
+                changed_items.append(item)
+
+        if changed_items:
+            with transaction.atomic():
+                ScheduleSlotItem.objects.bulk_update(
+                    changed_items, ['sort_order'],
+                )
+            invalidate_schedule_version()
 
         items = slot.items.select_related('asset').all()
         return Response(ScheduleSlotItemSerializer(items, many=True).data)
@@ -272,7 +300,9 @@ class ScheduleStatusView(APIView):
     """GET: current schedule status — which slot is active, next change, etc."""
 
     @authorized
+    @conditional_schedule
     def get(self, request):
+        now = timezone.localtime()
         slots = list(ScheduleSlot.objects.all())
 
         if not slots:
@@ -291,9 +321,9 @@ class ScheduleStatusView(APIView):
         for slot in slots:
             if slot.is_default:
                 default_slot = slot
-            elif slot.slot_type == 'event' and slot.is_currently_active():
+            elif slot.slot_type == 'event' and slot.is_currently_active(now):
                 active_event = slot
-            elif slot.is_currently_active():
+            elif slot.is_currently_active(now):
                 active_time = slot
 
         # Priority: event > time > default
@@ -304,12 +334,17 @@ class ScheduleStatusView(APIView):
             using_default = True
 
         # Calculate next change
-        next_change = _calc_next_change(active_slot, slots)
+        next_change = _calc_next_change(active_slot, slots, now)
+
+        if active_slot is not None:
+            prefetch_related_objects([active_slot], _prefetch_items())
 
         return Response({
             'schedule_enabled': True,
             'current_slot': (
-                ScheduleSlotSerializer(active_slot).data
+                ScheduleSlotSerializer(
+                    active_slot, context={'now': now},
+                ).data
                 if active_slot else None
             ),
             'next_change_at': (
@@ -320,9 +355,9 @@ class ScheduleStatusView(APIView):
         })
 
 
-def _calc_next_change(active_slot, all_slots):
+def _calc_next_change(active_slot, all_slots, now=None):
     """Calculate when the next slot transition occurs."""
-    now = timezone.localtime()
+    now = now or timezone.localtime()
     current_time = now.time()
 
     if active_slot is None:
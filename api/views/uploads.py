@@ -0,0 +1,181 @@
+import re
+import uuid
+from mimetypes import guess_extension, guess_type
+from os import path, statvfs
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from lib import asset_store
+from lib.auth import authorized
+from lib.errors import UploadSessionError, UploadSessionNotFoundError
+from lib.uploads import UploadSession
+from settings import settings
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+def get_upload_dir():
+    return path.join(settings['assetdir'], '.uploads')
+
+
+def _get_file_type(filename):
+    file_type = guess_type(filename)[0]
+    if not file_type or file_type.split('/')[0] not in ['image', 'video']:
+        return None
+    return file_type
+
+
+def _session_not_found():
+    return Response(
+        {'error': 'Upload session not found'},
+        status=status.HTTP_404_NOT_FOUND,
+    )
+
+
+class UploadSessionListView(APIView):
+    """POST: start a resumable upload of an image or video file.
+
+    If `md5` is given and a file with that content is already stored, no
+    session is created and the response is the same as when finalizing.
+    """
+
+    @authorized
+    def post(self, request):
+        filename = request.data.get('filename')
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = -1
+
+        if not filename or size < 0:
+            return Response(
+                {'error': 'filename and size are required'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        file_type = _get_file_type(filename)
+        if not file_type:
+            return Response(
+                {'error': 'Invalid file type.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Clients that know the MD5 of the file can skip uploading files
+        # the device already has.
+        md5 = request.data.get('md5')
+        if md5 and re.fullmatch(r'[0-9a-f]{32}', md5):
+            ext = guess_extension(file_type)
+            file_path = asset_store.find_blob(settings['assetdir'], md5, ext)
+            if file_path:
+                return Response(
+                    {'uri': file_path, 'ext': ext, 'md5': md5},
+                    status=status.HTTP_200_OK,
+                )
+
+        stats = statvfs(settings['assetdir'])
+        if size > stats.f_bavail * stats.f_frsize:
+            return Response(
+                {'error': 'Not enough free disk space'},
+                status=status.HTTP_507_INSUFFICIENT_STORAGE,
+            )
+
+        session = UploadSession.create(get_upload_dir(), filename, size)
+        return Response(session.to_dict(), status=status.HTTP_201_CREATED)
+
+
+class UploadSessionDetailView(APIView):
+    """GET: received ranges.  PUT: upload a chunk.  DELETE: abort."""
+
+    @authorized
+    def get(self, request, upload_id):
+        try:
+            session = UploadSession.get(get_upload_dir(), upload_id)
+        except UploadSessionNotFoundError:
+            return _session_not_found()
+        return Response(session.to_dict())
+
+    @authorized
+    def put(self, request, upload_id):
+        try:
+            session = UploadSession.get(get_upload_dir(), upload_id)
+        except UploadSessionNotFoundError:
+            return _session_not_found()
+
+        match = CONTENT_RANGE_RE.match(
+            request.headers.get('Content-Range', '')
+        )
+        if not match:
+            return Response(
+                {'error': 'A Content-Range header is required'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        start, end, total = match.groups()
+        start, end = int(start), int(end) + 1
+        if total != '*' and int(total) != session.size:
+            return Response(
+                {'error': f'The upload is {session.size} bytes long'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        content_length = request.headers.get('Content-Length')
+        if content_length and content_length != str(end - start):
+            return Response(
+                {'error': 'Content-Length does not match Content-Range'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # The chunk is read straight from the request, in small blocks, so
+        # it is never held in memory as a whole.
+        try:
+            session.write_chunk(start, end, request.stream)
+        except UploadSessionNotFoundError:
+            return _session_not_found()
+        except UploadSessionError as e:
+            return Response(
+                {'error': str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(session.to_dict())
+
+    @authorized
+    def delete(self, request, upload_id):
+        try:
+            session = UploadSession.get(get_upload_dir(), upload_id)
+        except UploadSessionNotFoundError:
+            return _session_not_found()
+
+        session.abort()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionFinalizeView(APIView):
+    """POST: complete an upload, the response can be used to add an asset."""
+
+    @authorized
+    def post(self, request, upload_id):
+        try:
+            session = UploadSession.get(get_upload_dir(), upload_id)
+        except UploadSessionNotFoundError:
+            return _session_not_found()
+
+        file_path = path.join(settings['assetdir'], uuid.uuid4().hex) + '.tmp'
+        try:
+            md5 = session.finalize(file_path)
+        except UploadSessionNotFoundError:
+            return _session_not_found()
+        except UploadSessionError as e:
+            return Response(
+                {'error': str(e), **session.to_dict()},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        return Response(
+            {
+                'uri': file_path,
+                'ext': guess_extension(_get_file_type(session.filename)),
+                'md5': md5,
+            }
+        )
@@ -1,3 +1,6 @@
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 from drf_spectacular.utils import (
     OpenApiExample,
     OpenApiRequest,
@@ -11,7 +14,9 @@ from rest_framework.views import APIView
 from anthias_app.models import Asset
 from api.helpers import (
     AssetCreationError,
+    conditional_asset_list,
     parse_request,
+    process_new_asset,
 )
 from api.serializers import (
     AssetSerializer,
@@ -109,6 +114,7 @@ class AssetContentViewV1(AssetContentViewMixin):
     pass
 
 
+@method_decorator(gzip_page, name='get')
 class AssetListViewV1(APIView):
     serializer_class = AssetSerializer
 
@@ -116,9 +122,12 @@ class AssetListViewV1(APIView):
         summary='List assets', responses={200: AssetSerializer(many=True)}
     )
     @authorized
+    @conditional_asset_list
     def get(self, request, format=None):
         queryset = Asset.objects.all()
-        serializer = AssetSerializer(queryset, many=True)
+        serializer = AssetSerializer(
+            queryset, many=True, context={'now': timezone.now()}
+        )
         return Response(serializer.data)
 
     @extend_schema(
@@ -138,6 +147,7 @@ class AssetListViewV1(APIView):
             return Response(error.errors, status=status.HTTP_400_BAD_REQUEST)
 
         asset = Asset.objects.create(**serializer.data)
+        process_new_asset(asset)
 
         return Response(
             AssetSerializer(asset).data, status=status.HTTP_201_CREATED
@@ -1,10 +1,18 @@
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from anthias_app.models import Asset
-from api.helpers import AssetCreationError, parse_request
+from api.helpers import (
+    AssetCreationError,
+    conditional_asset_list,
+    parse_request,
+    process_new_asset,
+)
 from api.serializers import (
     AssetSerializer,
     UpdateAssetSerializer,
@@ -15,14 +23,18 @@ from api.views.v1 import V1_ASSET_REQUEST
 from lib.auth import authorized
 
 
+@method_decorator(gzip_page, name='get')
 class AssetListViewV1_1(APIView):
     @extend_schema(
         summary='List assets', responses={200: AssetSerializer(many=True)}
     )
     @authorized
+    @conditional_asset_list
     def get(self, request):
         queryset = Asset.objects.all()
-        serializer = AssetSerializer(queryset, many=True)
+        serializer = AssetSerializer(
+            queryset, many=True, context={'now': timezone.now()}
+        )
         return Response(serializer.data)
 
     @extend_schema(
@@ -42,6 +54,7 @@ class AssetListViewV1_1(APIView):
             return Response(error.errors, status=status.HTTP_400_BAD_REQUEST)
 
         asset = Asset.objects.create(**serializer.data)
+        process_new_asset(asset)
 
         return Response(
             AssetSerializer(asset).data, status=status.HTTP_201_CREATED
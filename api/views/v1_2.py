@@ -1,3 +1,7 @@
+from django.db import transaction
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.response import Response
@@ -6,7 +10,9 @@ from rest_framework.views import APIView
 from anthias_app.models import Asset
 from api.helpers import (
     AssetCreationError,
+    conditional_asset_list,
     get_active_asset_ids,
+    process_new_asset,
     save_active_assets_ordering,
 )
 from api.serializers import (
@@ -15,9 +21,12 @@ from api.serializers import (
 )
 from api.serializers.v1_2 import CreateAssetSerializerV1_2
 from api.views.mixins import DeleteAssetViewMixin
+from lib import ingest
 from lib.auth import authorized
+from lib.errors import IngestError
 
 
+@method_decorator(gzip_page, name='get')
 class AssetListViewV1_2(APIView):
     serializer_class = AssetSerializer
 
@@ -25,9 +34,12 @@ class AssetListViewV1_2(APIView):
         summary='List assets', responses={200: AssetSerializer(many=True)}
     )
     @authorized
+    @conditional_asset_list
     def get(self, request):
         queryset = Asset.objects.all()
-        serializer = self.serializer_class(queryset, many=True)
+        serializer = self.serializer_class(
+            queryset, many=True, context={'now': timezone.now()}
+        )
         return Response(serializer.data)
 
     @extend_schema(
@@ -48,7 +60,19 @@ class AssetListViewV1_2(APIView):
             return Response(error.errors, status=status.HTTP_400_BAD_REQUEST)
 
         active_asset_ids = get_active_asset_ids()
-        asset = Asset.objects.create(**serializer.data)
+        try:
+            # Saved before its file is stored, see `Ingest.hash`. YouTube
+            # videos are still being downloaded.
+            with transaction.atomic():
+                asset = Asset.objects.create(**serializer.data)
+                if not asset.is_processing:
+                    ext = serializer.validated_data['ext']
+                    ingest.Ingest(asset, ext).hash()
+        except IngestError as error:
+            return Response(
+                {'error': str(error)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        process_new_asset(asset)
 
         if asset.is_active():
             active_asset_ids.insert(asset.play_order, asset.asset_id)
@@ -1,19 +1,31 @@
 import hashlib
-import io
-import ipaddress
 import json
 import logging
-import struct
-import subprocess
+import mimetypes
+import queue
+import threading
 import time
-from datetime import timedelta
-from os import getenv, path, statvfs
-from platform import machine
-
-import psutil
-from drf_spectacular.utils import extend_schema
-from django.http import HttpResponse
-from hurry.filesize import size
+from datetime import datetime, timedelta
+from inspect import cleandoc
+from os import getenv, path, stat
+from urllib.parse import quote
+
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    OpenApiTypes,
+    extend_schema,
+)
+from django.db import close_old_connections, transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -22,11 +34,22 @@ from anthias_app.helpers import add_default_assets, remove_default_assets
 from anthias_app.models import Asset
 from api.helpers import (
     AssetCreationError,
+    conditional_asset_list,
+    etag_matches,
+    filter_assets,
     get_active_asset_ids,
+    get_file_etag,
+    iter_file_range,
+    paginate_assets,
+    parse_range_header,
+    remove_asset_files,
     save_active_assets_ordering,
+    start_ingest,
 )
+from api.serializers import get_unique_name
 from api.serializers.v2 import (
     AssetSerializerV2,
+    BackupSerializerV2,
     CreateAssetSerializerV2,
     DeviceSettingsSerializerV2,
     IntegrationsSerializerV2,
@@ -45,13 +68,33 @@ from api.views.mixins import (
     RecoverViewMixin,
     ShutdownViewMixin,
 )
-from lib import device_helper, diagnostics
+from celery_tasks import (
+    build_keyframe_index,
+    create_backup,
+    generate_thumbnail,
+    probe_media,
+    recover_backup,
+    update_containers,
+)
+from lib import (
+    backup_helper,
+    device_info,
+    keyframes,
+    media_info,
+    thumbnails,
+    viewlog,
+)
 from lib.auth import authorized
-from lib.github import is_up_to_date
+from lib.errors import FramebufferUnavailableError
+from lib.jobs import Job
+from lib.screenshot import (
+    FrameBroadcaster,
+    SingleFlightCache,
+    capture_framebuffer,
+    resize_jpeg,
+)
 from lib.utils import (
     connect_to_redis,
-    get_node_ip,
-    get_node_mac_address,
     is_balena_app,
 )
 from settings import ZmqPublisher, settings
@@ -59,22 +102,97 @@ from settings import ZmqPublisher, settings
 r = connect_to_redis()
 
 
+@method_decorator(gzip_page, name='get')
 class AssetListViewV2(APIView):
     serializer_class = AssetSerializerV2
 
+    FILTER_PARAMS = [
+        'is_enabled',
+        'is_active',
+        'mimetype',
+        'name_prefix',
+        'from',
+        'to',
+    ]
+    MAX_PAGE_SIZE = 1000
+
     @extend_schema(
-        summary='List assets', responses={200: AssetSerializerV2(many=True)}
+        summary='List assets',
+        description=cleandoc("""
+        Without any query parameters, all assets are returned as a list.
+
+        * `is_enabled`, `is_active`, `mimetype`, `name_prefix`, and the
+          `from`/`to` date window filter the assets.
+        * `fields` is a comma-separated list of the fields to return.
+        * `limit` and `cursor` paginate the assets by play order. The
+          response is then an object with the `results` and the
+          `next_cursor` to pass to get the following page.
+
+        Responses carry an ETag, and If-None-Match requests for an
+        unchanged list are answered with 304 Not Modified.
+        """),
+        parameters=[
+            OpenApiParameter(name, OpenApiTypes.STR, required=False)
+            for name in FILTER_PARAMS + ['fields', 'cursor']
+        ]
+        + [OpenApiParameter('limit', OpenApiTypes.INT, required=False)],
+        responses={200: AssetSerializerV2(many=True)},
     )
     @authorized
+    @conditional_asset_list
     def get(self, request):
-        queryset = Asset.objects.all()
-        serializer = AssetSerializerV2(queryset, many=True)
+        params = request.query_params
+        now = timezone.now()
+
+        fields = None
+        if params.get('fields'):
+            fields = params['fields'].split(',')
+            unknown_fields = set(fields) - set(self.serializer_class().fields)
+            if unknown_fields:
+                return Response(
+                    {'error': f'Unknown fields: {", ".join(unknown_fields)}'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        try:
+            queryset = filter_assets(Asset.objects.all(), params, now)
+
+            is_paginated = 'limit' in params or 'cursor' in params
+            if is_paginated:
+                limit = int(params.get('limit', self.MAX_PAGE_SIZE))
+                if not 0 < limit <= self.MAX_PAGE_SIZE:
+                    raise ValueError(
+                        f'limit must be between 1 and {self.MAX_PAGE_SIZE}'
+                    )
+                queryset, next_cursor = paginate_assets(
+                    queryset, params.get('cursor'), limit
+                )
+        except (ValueError, OverflowError) as e:
+            return Response(
+                {'error': str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = AssetSerializerV2(
+            queryset, many=True, fields=fields, context={'now': now}
+        )
+
+        if is_paginated:
+            return Response(
+                {'results': serializer.data, 'next_cursor': next_cursor}
+            )
         return Response(serializer.data)
 
     @extend_schema(
         summary='Create asset',
+        description=cleandoc("""
+        Stores the asset as processing, and returns it along with the id
+        of the job running it through the ingestion pipeline: checking
+        the URL, downloading YouTube videos, storing and probing the file,
+        and rendering its thumbnail. The asset is deleted if any of these
+        fail, with the reason in the job.
+        """),
         request=CreateAssetSerializerV2,
-        responses={201: AssetSerializerV2},
+        responses={202: AssetSerializerV2},
     )
     @authorized
     def post(self, request):
@@ -90,7 +208,6 @@ class AssetListViewV2(APIView):
 
         active_asset_ids = get_active_asset_ids()
         asset = Asset.objects.create(**serializer.data)
-        asset.refresh_from_db()
 
         if asset.is_active():
             active_asset_ids.insert(asset.play_order, asset.asset_id)
@@ -98,9 +215,11 @@ class AssetListViewV2(APIView):
         save_active_assets_ordering(active_asset_ids)
         asset.refresh_from_db()
 
+        job = start_ingest(r, asset, serializer.validated_data['ext'])
         return Response(
-            AssetSerializerV2(asset).data,
-            status=status.HTTP_201_CREATED,
+            {**AssetSerializerV2(asset).data, 'job_id': job.id},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('api:job_v2', args=[job.id])},
         )
 
 
@@ -163,12 +282,366 @@ class AssetViewV2(APIView, DeleteAssetViewMixin):
         return self.update(request, asset_id, partial=False)
 
 
+class AssetBulkViewV2(APIView):
+    OPERATIONS = ['create', 'update', 'delete', 'enable', 'disable']
+    MAX_OPERATIONS = 1000
+
+    @extend_schema(
+        summary='Bulk asset operations',
+        description=cleandoc("""
+        Applies a list of operations in a single transaction, and updates
+        the playlist order once at the end. Each operation is an object
+        with an `op` (`create`, `update`, `delete`, `enable` or
+        `disable`), the `asset_id` of the asset it applies to (except for
+        `create`), and the asset `data` for `create` and `update`.
+
+        An operation that fails doesn't affect the others. The response
+        has one result per operation, in the same order, with the status
+        code the single asset endpoints would have returned. The results
+        of `create` operations have the `job_id` of the ingestion job.
+        """),
+        request={
+            'application/json': {
+                'type': 'object',
+                'properties': {
+                    'operations': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'op': {'type': 'string', 'enum': OPERATIONS},
+                                'asset_id': {'type': 'string'},
+                                'data': {'type': 'object'},
+                            },
+                        },
+                    }
+                },
+            }
+        },
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'results': {'type': 'array', 'items': {'type': 'object'}},
+                },
+            }
+        },
+    )
+    @authorized
+    def post(self, request):
+        operations = request.data.get('operations')
+        if not isinstance(operations, list) or not all(
+            isinstance(operation, dict) for operation in operations
+        ):
+            return Response(
+                {'error': 'operations must be a list of objects'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(operations) > self.MAX_OPERATIONS:
+            return Response(
+                {'error': f'At most {self.MAX_OPERATIONS} operations'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # The requests are validated before the transaction, which only
+        # holds the writes, so that nothing slow keeps the database locked.
+        prepared = [
+            self._handle_errors(self._validate, operation)
+            for operation in operations
+        ]
+
+        results = []
+        created = []
+        deleted_uris = []
+        touched_ids = []
+
+        with transaction.atomic():
+            for operation, result in zip(operations, prepared):
+                if 'status' not in result:
+                    # Each operation gets its own savepoint, so a failing
+                    # one is rolled back without the rest of the batch.
+                    result = self._handle_errors(
+                        self._apply_in_savepoint, operation, result
+                    )
+
+                asset = result.pop('asset', None)
+                ext = result.pop('ext', '')
+                if asset is not None:
+                    result['asset_id'] = asset.asset_id
+                    touched_ids.append(asset.asset_id)
+                    if operation['op'] == 'create':
+                        created.append((asset, ext))
+                    elif operation['op'] == 'delete':
+                        deleted_uris.append(asset.uri)
+
+                results.append(
+                    {
+                        'op': operation.get('op'),
+                        'asset_id': operation.get('asset_id'),
+                        **result,
+                    }
+                )
+
+            self._save_ordering(touched_ids)
+
+            # Removed within the transaction, like a single delete does, so
+            # that no asset added to the same file meanwhile loses it.
+            for uri in deleted_uris:
+                remove_asset_files(uri)
+
+        # Files are only moved by the ingestion jobs once the batch is
+        # committed.
+        job_ids = {
+            asset.asset_id: start_ingest(r, asset, ext).id
+            for asset, ext in created
+        }
+
+        assets = Asset.objects.in_bulk(touched_ids)
+        now = timezone.now()
+        for result in results:
+            asset = assets.get(result.get('asset_id'))
+            if asset is not None and result['op'] != 'delete':
+                result['asset'] = AssetSerializerV2(
+                    asset, context={'now': now}
+                ).data
+            if result.get('asset_id') in job_ids:
+                result['job_id'] = job_ids[result['asset_id']]
+
+        return Response({'results': results})
+
+    @staticmethod
+    def _handle_errors(function, *args):
+        try:
+            return function(*args)
+        except Asset.DoesNotExist:
+            return {
+                'status': status.HTTP_404_NOT_FOUND,
+                'errors': 'Asset not found',
+            }
+        except AssetCreationError as error:
+            return {
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': error.errors,
+            }
+
+    def _validate(self, operation):
+        """
+        Checks an operation, and returns the data to apply it with.
+        """
+        op = operation.get('op')
+        if op not in self.OPERATIONS:
+            raise AssetCreationError(
+                f'op must be one of: {", ".join(self.OPERATIONS)}'
+            )
+
+        if op == 'create':
+            serializer = CreateAssetSerializerV2(
+                data=operation.get('data', {})
+            )
+            if not serializer.is_valid():
+                raise AssetCreationError(serializer.errors)
+            return {
+                'data': dict(serializer.data),
+                'ext': serializer.validated_data['ext'],
+            }
+
+        if op == 'update':
+            asset = Asset.objects.get(asset_id=operation.get('asset_id'))
+            serializer = UpdateAssetSerializerV2(
+                asset, data=operation.get('data', {}), partial=True
+            )
+            if not serializer.is_valid():
+                raise AssetCreationError(serializer.errors)
+            return {'data': serializer.validated_data}
+
+        return {}
+
+    def _apply_in_savepoint(self, operation, prepared):
+        with transaction.atomic():
+            return self._apply(operation, prepared)
+
+    def _apply(self, operation, prepared):
+        op = operation['op']
+
+        if op == 'create':
+            # Named here rather than when validated, so that the assets
+            # of the batch are told apart from each other too.
+            data = prepared['data']
+            asset = Asset.objects.create(
+                **{**data, 'name': get_unique_name(data['name'])}
+            )
+            return {
+                'status': status.HTTP_202_ACCEPTED,
+                'asset': asset,
+                'ext': prepared['ext'],
+            }
+
+        # Fetched again, as an earlier operation may have deleted it.
+        asset = Asset.objects.get(asset_id=operation.get('asset_id'))
+
+        if op == 'update':
+            UpdateAssetSerializerV2().update(asset, prepared['data'])
+            asset.refresh_from_db()
+        elif op == 'delete':
+            asset.delete()
+            return {'status': status.HTTP_204_NO_CONTENT, 'asset': asset}
+        else:
+            asset.is_enabled = op == 'enable'
+            asset.save(update_fields=['is_enabled'])
+
+        return {'status': status.HTTP_200_OK, 'asset': asset}
+
+    @staticmethod
+    def _save_ordering(touched_ids):
+        """
+        Same result as applying the operations one by one: the assets
+        touched by the batch are inserted, in order, at their play order
+        among the active assets that were left alone.
+        """
+        now = timezone.now()
+        touched = set(touched_ids)
+        active_asset_ids = [
+            asset_id
+            for asset_id in get_active_asset_ids(now)
+            if asset_id not in touched
+        ]
+
+        assets = Asset.objects.in_bulk(touched_ids)
+        for asset_id in dict.fromkeys(touched_ids):
+            asset = assets.get(asset_id)
+            if asset is not None and asset.is_active(now):
+                active_asset_ids.insert(asset.play_order, asset_id)
+
+        save_active_assets_ordering(active_asset_ids)
+
+
 class BackupViewV2(BackupViewMixin):
-    pass
+    @extend_schema(
+        summary='Create backup',
+        description=cleandoc("""
+        Starts a background job that writes a backup of the current
+        Anthias instance: the settings, the assets and their metadata.
+        Poll the job at the returned `Location`. Its result holds the
+        `filename` of the archive, a tar file in which the media are
+        stored uncompressed and the other files are gzipped.
+
+        With `incremental`, only the files that changed since the latest
+        backup kept on the device are stored, and the archive refers to
+        that backup for the rest. Recovering it then needs both.
+        """),
+        request=BackupSerializerV2,
+        responses={
+            202: {
+                'type': 'object',
+                'properties': {'job_id': {'type': 'string'}},
+            }
+        },
+    )
+    @authorized
+    def post(self, request):
+        serializer = BackupSerializerV2(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        job = Job.create(r, 'backup')
+        create_backup.delay(
+            job.id,
+            settings['player_name'],
+            serializer.validated_data['incremental'],
+        )
+        return Response(
+            {'job_id': job.id},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('api:job_v2', args=[job.id])},
+        )
+
+
+class BackupDownloadViewV2(APIView):
+    @extend_schema(
+        summary='Download backup',
+        description=cleandoc("""
+        Streams a backup archive as it is written, without keeping a
+        copy on the device.
+        """),
+        responses={200: {'type': 'string', 'format': 'binary'}},
+    )
+    @authorized
+    def get(self, request):
+        archive_name = backup_helper.get_archive_name(settings['player_name'])
+        response = StreamingHttpResponse(
+            backup_helper.iter_backup(), content_type='application/x-tar'
+        )
+        response['Content-Disposition'] = (
+            f"attachment; filename*=UTF-8''{quote(archive_name)}"
+        )
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class RecoverViewV2(RecoverViewMixin):
-    pass
+    @extend_schema(
+        summary='Recover from backup',
+        description=cleandoc("""
+        Uploads a backup, a `.tar` or, for older backups, a `.tar.gz`
+        file, and starts a background job that restores it while the
+        viewer shows the standby screen. Poll the job at the returned
+        `Location`. Only one backup can be recovered at a time.
+        """),
+        request={
+            'multipart/form-data': {
+                'type': 'object',
+                'properties': {
+                    'backup_upload': {'type': 'string', 'format': 'binary'}
+                },
+            }
+        },
+        responses={
+            202: {
+                'type': 'object',
+                'properties': {'job_id': {'type': 'string'}},
+            },
+            400: {
+                'type': 'object',
+                'properties': {'error': {'type': 'string'}},
+            },
+            409: {
+                'type': 'object',
+                'properties': {'error': {'type': 'string'}},
+            },
+        },
+    )
+    @authorized
+    def post(self, request):
+        file_upload = request.data.get('backup_upload')
+        if (
+            not file_upload
+            or mimetypes.guess_type(file_upload.name)[0] != 'application/x-tar'
+        ):
+            return Response(
+                {'error': 'The backup must be a .tar or .tar.gz file.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not self._lock():
+            return Response(
+                {'error': 'A backup is being recovered already.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        try:
+            file_path = self._save_upload(file_upload)
+        except Exception:
+            self._unlock()
+            raise
+
+        job = Job.create(r, 'recover')
+        ZmqPublisher.get_instance().send_to_viewer(
+            f'standby&{backup_helper.RECOVERY_LOCK_KEY}'
+        )
+        recover_backup.delay(job.id, file_path)
+        return Response(
+            {'job_id': job.id},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('api:job_v2', args=[job.id])},
+        )
 
 
 class RebootViewV2(RebootViewMixin):
@@ -187,6 +660,210 @@ class AssetContentViewV2(AssetContentViewMixin):
     pass
 
 
+class AssetDownloadViewV2(APIView):
+    """GET /api/v2/assets/<asset_id>/download — the raw asset file.
+
+    Supports single byte ranges and If-None-Match. Behind the bundled nginx,
+    the file is handed off with X-Accel-Redirect instead of being copied
+    through the worker.
+    """
+
+    @staticmethod
+    def _get_accel_path(request, file_path):
+        # nginx announces where it can serve files from internally, in the
+        # "<file system prefix>=<internal location>" form.
+        if request.headers.get('X-Sendfile-Type') != 'X-Accel-Redirect':
+            return None
+
+        mapping = request.headers.get('X-Accel-Mapping', '')
+        prefix, _, location = mapping.partition('=')
+        if not prefix or not location:
+            return None
+
+        file_path = path.realpath(file_path)
+        prefix = path.join(path.realpath(prefix), '')
+        if not file_path.startswith(prefix):
+            return None
+
+        return path.join(location, quote(file_path[len(prefix) :]))
+
+    @staticmethod
+    def _get_filename(asset):
+        filename = asset.name
+        if not path.splitext(filename)[1]:
+            filename += path.splitext(asset.uri)[1]
+        return filename
+
+    @extend_schema(
+        summary='Download asset file',
+        responses={
+            200: {'type': 'string', 'format': 'binary'},
+            206: {'type': 'string', 'format': 'binary'},
+            302: None,
+            304: None,
+            404: None,
+            416: None,
+        },
+    )
+    @authorized
+    def get(self, request, asset_id):
+        try:
+            asset = Asset.objects.get(asset_id=asset_id)
+        except Asset.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        if not path.isfile(asset.uri):
+            if asset.uri.startswith(('http://', 'https://')):
+                return HttpResponseRedirect(asset.uri)
+            return Response(
+                {'error': 'Asset file not found'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        stat_result = stat(asset.uri)
+        etag = get_file_etag(stat_result)
+        filename = self._get_filename(asset)
+        content_type = (
+            mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+
+        if etag_matches(request, etag):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        accel_path = self._get_accel_path(request, asset.uri)
+        if accel_path:
+            # nginx takes care of ranges and conditional requests itself.
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = accel_path
+            response['Content-Disposition'] = (
+                f"attachment; filename*=UTF-8''{quote(filename)}"
+            )
+            response['ETag'] = etag
+            return response
+
+        byte_range = None
+        if request.headers.get('If-Range', etag) == etag:
+            try:
+                byte_range = parse_range_header(
+                    request.headers.get('Range'), stat_result.st_size
+                )
+            except ValueError:
+                response = HttpResponse(
+                    status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+                )
+                response['Content-Range'] = f'bytes */{stat_result.st_size}'
+                return response
+
+        f = open(asset.uri, 'rb')
+        if byte_range is None:
+            response = FileResponse(
+                f,
+                as_attachment=True,
+                filename=filename,
+                content_type=content_type,
+            )
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                iter_file_range(f, start, end),
+                status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type=content_type,
+            )
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = (
+                f'bytes {start}-{end}/{stat_result.st_size}'
+            )
+
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        return response
+
+
+class AssetThumbnailViewV2(APIView):
+    # The `thumbnail_url` of the asset is versioned by the checksum of its
+    # file, so the thumbnail it points to never changes. Without the
+    # version, clients check with the ETag, which follows the thumbnail
+    # file, before using the thumbnail they have.
+    CACHE_CONTROL = 'private, no-cache'
+    VERSIONED_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+    # Assets without a thumbnail get one generated once per this long, so
+    # that one that failed is tried again later.
+    THUMBNAIL_RETRY_INTERVAL = 3600  # seconds
+
+    @extend_schema(
+        summary='Get asset thumbnail',
+        description=cleandoc("""
+        Use the `thumbnail_url` of the asset, which is versioned by the
+        checksum of its file with the `v` parameter, to have the thumbnail
+        cached for good. Without it, the thumbnail has to be revalidated
+        with its ETag.
+        """),
+        parameters=[
+            OpenApiParameter('v', OpenApiTypes.STR, required=False),
+        ],
+        responses={
+            200: {
+                'type': 'string',
+                'format': 'binary',
+                'description': 'JPEG image',
+            },
+            304: None,
+            404: None,
+        },
+    )
+    @authorized
+    def get(self, request, asset_id):
+        try:
+            asset = Asset.objects.get(asset_id=asset_id)
+        except Asset.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        thumbnail_path = thumbnails.thumbnail_path(asset.uri)
+        try:
+            stat_result = stat(thumbnail_path)
+        except OSError:
+            self._queue_thumbnail(asset)
+            return Response(
+                {'error': 'Thumbnail not available'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        etag = get_file_etag(stat_result)
+        if etag_matches(request, etag):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = FileResponse(
+                open(thumbnail_path, 'rb'), content_type='image/jpeg'
+            )
+        response['ETag'] = etag
+        if asset.md5 and request.query_params.get('v') == asset.md5:
+            response['Cache-Control'] = self.VERSIONED_CACHE_CONTROL
+        else:
+            response['Cache-Control'] = self.CACHE_CONTROL
+        return response
+
+    def _queue_thumbnail(self, asset):
+        # Assets added before thumbnails existed don't have one yet.
+        if (
+            asset.is_processing
+            or not path.isfile(asset.uri)
+            or not (
+                'image' in asset.mimetype or 'video' in asset.mimetype
+            )
+        ):
+            return
+
+        if r.set(
+            f'thumbnail_queued:{asset.uri}',
+            1,
+            nx=True,
+            ex=self.THUMBNAIL_RETRY_INTERVAL,
+        ):
+            generate_thumbnail.delay(asset.uri, asset.mimetype)
+
+
 class PlaylistOrderViewV2(PlaylistOrderViewMixin):
     pass
 
@@ -203,13 +880,13 @@ class DeviceSettingsViewV2(APIView):
     @authorized
     def get(self, request):
         try:
-            # Force reload of settings
-            settings.load()
+            current = settings.snapshot()
         except Exception as e:
             logging.error(f'Failed to reload settings: {str(e)}')
             # Continue with existing settings if reload fails
+            current = settings
 
-        schedule_raw = settings.get('display_power_schedule', '')
+        schedule_raw = current.get('display_power_schedule', '')
         try:
             display_schedule = json.loads(schedule_raw) if schedule_raw else None
         except (json.JSONDecodeError, TypeError):
@@ -217,30 +894,30 @@ class DeviceSettingsViewV2(APIView):
 
         return Response(
             {
-                'player_name': settings['player_name'],
-                'audio_output': settings['audio_output'],
-                'default_duration': int(settings['default_duration']),
+                'player_name': current['player_name'],
+                'audio_output': current['audio_output'],
+                'default_duration': int(current['default_duration']),
                 'default_streaming_duration': int(
-                    settings['default_streaming_duration']
+                    current['default_streaming_duration']
                 ),
-                'date_format': settings['date_format'],
-                'auth_backend': settings['auth_backend'],
-                'resolution': settings['resolution'],
-                'show_splash': settings['show_splash'],
-                'default_assets': settings['default_assets'],
-                'shuffle_playlist': settings['shuffle_playlist'],
-                'use_24_hour_clock': settings['use_24_hour_clock'],
-                'debug_logging': settings['debug_logging'],
+                'date_format': current['date_format'],
+                'auth_backend': current['auth_backend'],
+                'resolution': current['resolution'],
+                'show_splash': current['show_splash'],
+                'default_assets': current['default_assets'],
+                'shuffle_playlist': current['shuffle_playlist'],
+                'use_24_hour_clock': current['use_24_hour_clock'],
+                'debug_logging': current['debug_logging'],
                 'username': (
-                    settings['user']
-                    if settings['auth_backend'] == 'auth_basic'
+                    current['user']
+                    if current['auth_backend'] == 'auth_basic'
                     else ''
                 ),
                 'display_power_schedule': display_schedule,
-                'language': settings.get('language', 'en'),
-                'ir_enabled': settings.get('ir_enabled', False),
-                'ir_protocol': settings.get('ir_protocol', ''),
-                'ir_power_scancode': settings.get('ir_power_scancode', ''),
+                'language': current.get('language', 'en'),
+                'ir_enabled': current.get('ir_enabled', False),
+                'ir_protocol': current.get('ir_protocol', ''),
+                'ir_power_scancode': current.get('ir_power_scancode', ''),
             }
         )
 
@@ -407,116 +1084,6 @@ class DeviceSettingsViewV2(APIView):
 
 
 class InfoViewV2(InfoViewMixin):
-    def get_anthias_version(self):
-        app_version = getenv('APP_VERSION', '')
-        git_short_hash = diagnostics.get_git_short_hash() or 'unknown'
-
-        if app_version and app_version != 'dev':
-            return 'v{}@{}'.format(app_version, git_short_hash)
-
-        git_branch = diagnostics.get_git_branch() or 'dev'
-        return '{}@{}'.format(git_branch, git_short_hash)
-
-    def get_device_model(self):
-        device_model = device_helper.parse_cpu_info().get('model')
-
-        if device_model is None and machine() == 'x86_64':
-            device_model = 'Generic x86_64 Device'
-
-        return device_model
-
-    def get_uptime(self):
-        system_uptime = timedelta(seconds=diagnostics.get_uptime())
-        return {
-            'days': system_uptime.days,
-            'hours': round(system_uptime.seconds / 3600, 2),
-        }
-
-    def get_memory(self):
-        virtual_memory = psutil.virtual_memory()
-        return {
-            'total': virtual_memory.total >> 20,
-            'used': virtual_memory.used >> 20,
-            'free': virtual_memory.free >> 20,
-            'shared': virtual_memory.shared >> 20,
-            'buff': virtual_memory.buffers >> 20,
-            'available': virtual_memory.available >> 20,
-        }
-
-    def get_ip_addresses(self):
-        ip_addresses = []
-        node_ip = get_node_ip()
-
-        if node_ip == 'Unable to retrieve IP.':
-            return []
-
-        for ip_address in node_ip.split():
-            ip_address_object = ipaddress.ip_address(ip_address)
-
-            if isinstance(ip_address_object, ipaddress.IPv6Address):
-                ip_addresses.append(f'http://[{ip_address}]')
-            else:
-                ip_addresses.append(f'http://{ip_address}')
-
-        return ip_addresses
-
-    def get_cpu_temp(self):
-        try:
-            temps = psutil.sensors_temperatures()
-            if 'cpu_thermal' in temps and temps['cpu_thermal']:
-                return round(temps['cpu_thermal'][0].current, 1)
-        except Exception:
-            pass
-        try:
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                return round(int(f.read().strip()) / 1000, 1)
-        except Exception:
-            return None
-
-    def get_cpu_usage(self):
-        try:
-            return psutil.cpu_percent(interval=None)
-        except Exception:
-            return 0.0
-
-    def get_cpu_freq(self):
-        try:
-            freq = psutil.cpu_freq()
-            if freq:
-                return {
-                    'current': int(freq.current),
-                    'max': int(freq.max) if freq.max else int(freq.current),
-                }
-        except Exception:
-            pass
-        return None
-
-    def get_throttle_state(self):
-        try:
-            result = subprocess.run(
-                ['vcgencmd', 'get_throttled'],
-                capture_output=True, text=True, timeout=5,
-            )
-            if result.returncode == 0:
-                # Output: throttled=0x50000
-                val = result.stdout.strip().split('=')[-1]
-                return int(val, 16)
-        except Exception:
-            pass
-        return None
-
-    def get_disk_usage(self):
-        try:
-            usage = psutil.disk_usage('/')
-            return {
-                'total_gb': round(usage.total / (1024 ** 3), 1),
-                'used_gb': round(usage.used / (1024 ** 3), 1),
-                'free_gb': round(usage.free / (1024 ** 3), 1),
-                'percent': usage.percent,
-            }
-        except Exception:
-            return None
-
     @extend_schema(
         summary='Get system information',
         responses={
@@ -573,78 +1140,159 @@ class InfoViewV2(InfoViewMixin):
                             'percent': {'type': 'number'},
                         },
                     },
+                    'ages': {
+                        'type': 'object',
+                        'description': (
+                            'Seconds since each value was sampled, null '
+                            'if it has not been yet.'
+                        ),
+                        'additionalProperties': {'type': ['number', 'null']},
+                    },
                 },
             }
         },
     )
     @authorized
     def get(self, request):
-        viewlog = 'Not yet implemented'
-
-        # Calculate disk space
-        slash = statvfs('/')
-        free_space = size(slash.f_bavail * slash.f_frsize)
-        display_power = r.get('display_power')
+        # Sampled in the background by the collect_device_info task, as
+        # some of the values take seconds to get.
+        values, ages = device_info.get_snapshot(r, device_info.COLLECTORS)
 
         return Response(
             {
-                'viewlog': viewlog,
-                'loadavg': diagnostics.get_load_avg()['15 min'],
-                'free_space': free_space,
-                'display_power': display_power,
-                'up_to_date': is_up_to_date(),
-                'anthias_version': self.get_anthias_version(),
-                'device_model': self.get_device_model(),
-                'uptime': self.get_uptime(),
-                'memory': self.get_memory(),
-                'ip_addresses': self.get_ip_addresses(),
-                'mac_address': get_node_mac_address(),
+                'viewlog': 'Not yet implemented',
+                **values,
+                'display_power': r.get('display_power'),
                 'host_user': getenv('HOST_USER'),
-                'cpu_temp': self.get_cpu_temp(),
-                'cpu_usage': self.get_cpu_usage(),
-                'cpu_freq': self.get_cpu_freq(),
-                'throttle_state': self.get_throttle_state(),
-                'disk_usage': self.get_disk_usage(),
+                'ages': ages,
             }
         )
 
 
+class InfoHistoryViewV2(APIView):
+    DEFAULT_DURATION = 3600  # seconds
+    DEFAULT_BUCKETS = 60
+    MAX_BUCKETS = 1000
+
+    @extend_schema(
+        summary='Get health metrics history',
+        description=cleandoc("""
+        Returns the history of the health metrics, downsampled to the
+        min, average and max of each metric over `buckets` intervals of
+        equal length between `start` and `end` (Unix times, the last
+        hour by default). The device keeps one day of history, sampled
+        every few seconds.
+
+        The throttling flags (`under_voltage`, `freq_capped`, `throttled`
+        and `soft_temp_limit`) are 1 while raised and 0 otherwise: their
+        max tells whether they were raised in a bucket, their average for
+        how much of it.
+
+        Buckets without samples have null values.
+        """),
+        parameters=[
+            OpenApiParameter('start', OpenApiTypes.INT, required=False),
+            OpenApiParameter('end', OpenApiTypes.INT, required=False),
+            OpenApiParameter('buckets', OpenApiTypes.INT, required=False),
+            OpenApiParameter(
+                'metrics',
+                OpenApiTypes.STR,
+                required=False,
+                description=(
+                    'Comma-separated, out of: '
+                    + ', '.join(device_info.HISTORY_METRICS)
+                ),
+            ),
+        ],
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'step': {'type': 'integer'},
+                    'bucket_size': {'type': 'integer'},
+                    'time': {'type': 'array', 'items': {'type': 'integer'}},
+                    'metrics': {
+                        'type': 'object',
+                        'additionalProperties': {
+                            'type': 'object',
+                            'properties': {
+                                key: {
+                                    'type': 'array',
+                                    'items': {'type': ['number', 'null']},
+                                }
+                                for key in ['min', 'avg', 'max']
+                            },
+                        },
+                    },
+                },
+            }
+        },
+    )
+    @authorized
+    def get(self, request):
+        params = request.query_params
+        try:
+            end = int(params.get('end', time.time()))
+            start = int(params.get('start', end - self.DEFAULT_DURATION))
+            buckets = int(params.get('buckets', self.DEFAULT_BUCKETS))
+        except ValueError:
+            return Response(
+                {'error': 'start, end and buckets must be integers'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        metrics = device_info.HISTORY_METRICS
+        if params.get('metrics'):
+            metrics = params['metrics'].split(',')
+
+        unknown_metrics = set(metrics) - set(device_info.HISTORY_METRICS)
+        if unknown_metrics:
+            return Response(
+                {'error': f'Unknown metrics: {", ".join(unknown_metrics)}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if start >= end or not 0 < buckets <= self.MAX_BUCKETS:
+            return Response(
+                {
+                    'error': 'start must be before end, and buckets between '
+                    f'1 and {self.MAX_BUCKETS}'
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with device_info.get_history() as history:
+            return Response(history.query(start, end, buckets, metrics))
+
+
 class ScreenshotViewV2(APIView):
-    _cache = None
-    _cache_time = 0
     CACHE_TTL = 5  # seconds
-
-    @staticmethod
-    def _get_current_video():
+    _cache = SingleFlightCache(ttl=CACHE_TTL)
+    # Videos without a keyframe index get one built once per this long,
+    # so a build that failed is tried again later.
+    INDEX_RETRY_INTERVAL = keyframes.BUILD_TIMEOUT + 60  # seconds
+    # Likewise for videos without media info.
+    PROBE_RETRY_INTERVAL = 3600  # seconds
+
+    @classmethod
+    def _get_current_video(cls):
         """Check viewlog.db for a currently-playing video asset.
 
         Returns (file_path, seconds_elapsed) or (None, None).
         The viewer writes a row to viewlog on each asset start via _log_playback().
         """
-        import sqlite3
         from datetime import datetime, timezone as tz
 
-        db_path = path.join(
-            path.expanduser('~'), '.screenly', 'viewlog.db'
-        )
-        if not path.exists(db_path):
-            return None, None
-
         try:
-            conn = sqlite3.connect(db_path, timeout=3)
-            row = conn.execute(
-                'SELECT asset_id, mimetype, started_at FROM viewlog '
-                'ORDER BY id DESC LIMIT 1'
-            ).fetchone()
-            conn.close()
+            entry = viewlog.get_latest()
         except Exception:
             return None, None
 
-        if not row:
+        if not entry:
             return None, None
 
-        asset_id, mimetype, started_at = row
-        if mimetype != 'video':
+        asset_id = entry['asset_id']
+        started_at = entry['started_at']
+        if entry['mimetype'] != 'video' or entry['ended_at']:
             return None, None
 
         # Calculate how far into the video we are
@@ -681,6 +1329,23 @@ class ScreenshotViewV2(APIView):
             else:
                 return None, None
 
+        # A slot may show the asset for longer than the video lasts, in
+        # which case the player stays on the last frame. Probing the video
+        # takes too long for a screenshot, so it's left to a task.
+        info = media_info.get_stored_media_info(file_path)
+        if info is None and r.set(
+            f'media_info_queued:{file_path}',
+            1,
+            nx=True,
+            ex=cls.PROBE_RETRY_INTERVAL,
+        ):
+            probe_media.delay(file_path)
+        if info is not None:
+            if not info.has_video:
+                return None, None
+            if info.duration:
+                elapsed = min(elapsed, max(0, info.duration - 1))
+
         return file_path, elapsed
 
     @staticmethod
@@ -712,6 +1377,52 @@ class ScreenshotViewV2(APIView):
             logging.warning('ffmpeg frame extraction failed: %s', e)
         return None
 
+    def _keyframe(self, video_path, elapsed, width, quality):
+        """Look up the frame in the pre-generated keyframe index.
+
+        Returns JPEG bytes, or None if the video has no index yet or the
+        requested width is larger than the indexed frames.
+        """
+        result = keyframes.read_frame(video_path, elapsed)
+        if result is None:
+            # Videos added before indexing existed have no index; build one
+            # in the background so later screenshots can use it.
+            if r.set(
+                f'keyframe_index_queued:{video_path}',
+                1,
+                nx=True,
+                ex=self.INDEX_RETRY_INTERVAL,
+            ):
+                build_keyframe_index.delay(video_path)
+            return None
+
+        jpeg_bytes, frame_width = result
+        if not width or width == frame_width:
+            return jpeg_bytes
+        if width > frame_width:
+            return None
+        return resize_jpeg(jpeg_bytes, width, quality)
+
+    def _capture(self, width, quality):
+        # If a video is currently playing, serve a frame of it
+        # (VLC uses hardware overlay on Pi4 which bypasses /dev/fb0)
+        # Default to 640px wide for video to keep file size small (~30-50KB)
+        video_path, elapsed = self._get_current_video()
+        if video_path:
+            jpeg_bytes = self._keyframe(video_path, elapsed, width, quality)
+            if jpeg_bytes:
+                return jpeg_bytes
+
+            # No usable index, extract the frame via ffmpeg
+            jpeg_bytes = self._ffmpeg_frame(
+                video_path, elapsed, min(quality, 60), width or 640
+            )
+            if jpeg_bytes:
+                return jpeg_bytes
+
+        # Fallback: framebuffer capture (works for images and web pages)
+        return capture_framebuffer(width, quality)
+
     @extend_schema(
         summary='Take a screenshot of the current display',
         responses={
@@ -724,106 +1435,163 @@ class ScreenshotViewV2(APIView):
     )
     @authorized
     def get(self, request):
-        width = request.query_params.get('width', None)
-        quality = int(request.query_params.get('quality', 70))
-        quality = max(10, min(100, quality))
-
-        now = time.time()
-        if (
-            ScreenshotViewV2._cache is not None
-            and now - ScreenshotViewV2._cache_time < self.CACHE_TTL
-            and width is None
-        ):
-            return HttpResponse(
-                ScreenshotViewV2._cache,
-                content_type='image/jpeg',
+        try:
+            width = request.query_params.get('width', None)
+            width = int(width) if width else None
+            quality = int(request.query_params.get('quality', 70))
+        except ValueError:
+            return Response(
+                {'error': 'width and quality must be integers'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-
-        # If a video is currently playing, extract a frame via ffmpeg
-        # (VLC uses hardware overlay on Pi4 which bypasses /dev/fb0)
-        # Default to 640px wide for video to keep file size small (~30-50KB)
-        video_path, elapsed = self._get_current_video()
-        if video_path:
-            video_width = width or '640'
-            video_quality = min(quality, 60)
-            jpeg_bytes = self._ffmpeg_frame(
-                video_path, elapsed, video_quality, video_width
+        if width is not None and width < 1:
+            return Response(
+                {'error': 'width must be positive'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            if jpeg_bytes:
-                if width is None:
-                    ScreenshotViewV2._cache = jpeg_bytes
-                    ScreenshotViewV2._cache_time = now
-                return HttpResponse(
-                    jpeg_bytes, content_type='image/jpeg'
-                )
+        quality = max(10, min(100, quality))
 
-        # Fallback: framebuffer capture (works for images and web pages)
+        # Concurrent requests for the same size and quality share a single
+        # capture, and the result is reused for CACHE_TTL seconds.
         try:
-            from PIL import Image
+            jpeg_bytes = self._cache.get_or_compute(
+                (width, quality), lambda: self._capture(width, quality)
+            )
         except ImportError:
             return Response(
                 {'error': 'Pillow is not installed'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
-
-        fb_path = '/dev/fb0'
-        if not path.exists(fb_path):
+        except FramebufferUnavailableError as e:
             return Response(
-                {'error': 'Framebuffer /dev/fb0 not available'},
+                {'error': str(e)},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
+        except Exception as e:
+            logging.error(f'Screenshot error: {e}')
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
-        try:
-            fb_size_path = '/sys/class/graphics/fb0/virtual_size'
-            fb_bits_path = '/sys/class/graphics/fb0/bits_per_pixel'
-
-            with open(fb_size_path) as f:
-                fb_w, fb_h = [int(x) for x in f.read().strip().split(',')]
-            with open(fb_bits_path) as f:
-                bpp = int(f.read().strip())
-
-            bytes_per_pixel = bpp // 8
-            line_length = fb_w * bytes_per_pixel
-
-            with open(fb_path, 'rb') as fb:
-                raw = fb.read(line_length * fb_h)
-
-            if bytes_per_pixel == 4:
-                img = Image.frombytes('RGBA', (fb_w, fb_h), raw, 'raw', 'BGRA')
-            elif bytes_per_pixel == 3:
-                img = Image.frombytes('RGB', (fb_w, fb_h), raw, 'raw', 'BGR')
-            elif bytes_per_pixel == 2:
-                img = Image.frombytes('RGB', (fb_w, fb_h), raw, 'raw', 'BGR;16')
-            else:
-                return Response(
-                    {'error': f'Unsupported bits_per_pixel: {bpp}'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
+        return HttpResponse(jpeg_bytes, content_type='image/jpeg')
 
-            img = img.convert('RGB')
 
-            if width:
-                w = int(width)
-                ratio = w / img.width
-                h = int(img.height * ratio)
-                img = img.resize((w, h), Image.LANCZOS)
+class ScreenshotStreamViewV2(ScreenshotViewV2):
+    """GET /api/v2/screenshot/stream — live MJPEG preview of the display.
 
-            buf = io.BytesIO()
-            img.save(buf, format='JPEG', quality=quality)
-            jpeg_bytes = buf.getvalue()
+    All clients asking for the same fps, width and quality share one
+    capture producer, which is dropped once the last client disconnects.
+    """
 
-            if width is None:
-                ScreenshotViewV2._cache = jpeg_bytes
-                ScreenshotViewV2._cache_time = now
+    BOUNDARY = 'frame'
+    DEFAULT_FPS = 2
+    MAX_FPS = 10
+    # The parameters are snapped to these, so that clients share a few
+    # producers rather than getting one for every value they ask for.
+    FPS_STEPS = (0.5, 1, 2, 5, 10)
+    WIDTH_STEP = 160
+    MAX_WIDTH = 1920
+    QUALITY_STEP = 10
+    # Give up on a stream that hasn't received a frame for this long, so a
+    # client of a failing capture doesn't keep the producer alive forever.
+    IDLE_TIMEOUT = 30  # seconds
 
-            return HttpResponse(jpeg_bytes, content_type='image/jpeg')
+    _broadcasters = {}
+    _broadcasters_lock = threading.Lock()
 
-        except Exception as e:
-            logging.error(f'Screenshot error: {e}')
+    def _capture_frame(self, width, quality):
+        try:
+            return self._capture(width, quality)
+        finally:
+            # The producer runs outside of the request cycle, so it has to
+            # release its database connection itself.
+            close_old_connections()
+
+    def _get_key(self, fps, width, quality):
+        fps = min(self.FPS_STEPS, key=lambda step: abs(step - fps))
+        if width is not None:
+            width = round(width / self.WIDTH_STEP) * self.WIDTH_STEP
+            width = max(self.WIDTH_STEP, min(self.MAX_WIDTH, width))
+        quality = round(quality / self.QUALITY_STEP) * self.QUALITY_STEP
+        quality = max(10, min(100, quality))
+        return fps, width, quality
+
+    def _subscribe(self, key):
+        fps, width, quality = key
+        with self._broadcasters_lock:
+            broadcaster = self._broadcasters.get(key)
+            if broadcaster is None:
+                broadcaster = self._broadcasters[key] = FrameBroadcaster(
+                    lambda: self._capture_frame(width, quality), 1 / fps
+                )
+            return broadcaster, broadcaster.subscribe()
+
+    def _unsubscribe(self, key, broadcaster, frames):
+        with self._broadcasters_lock:
+            broadcaster.unsubscribe(frames)
+            if broadcaster.subscriber_count == 0:
+                del self._broadcasters[key]
+
+    def _stream(self, key):
+        broadcaster, frames = self._subscribe(key)
+        try:
+            while True:
+                try:
+                    frame = frames.get(timeout=self.IDLE_TIMEOUT)
+                except queue.Empty:
+                    return
+                yield (
+                    f'--{self.BOUNDARY}\r\n'
+                    'Content-Type: image/jpeg\r\n'
+                    f'Content-Length: {len(frame)}\r\n\r\n'
+                ).encode() + frame + b'\r\n'
+        finally:
+            self._unsubscribe(key, broadcaster, frames)
+
+    @extend_schema(
+        summary='Stream a live preview of the current display',
+        responses={
+            200: {
+                'type': 'string',
+                'format': 'binary',
+                'description': 'multipart/x-mixed-replace stream of JPEGs',
+            }
+        },
+    )
+    @authorized
+    def get(self, request):
+        try:
+            fps = float(request.query_params.get('fps', self.DEFAULT_FPS))
+            width = request.query_params.get('width', None)
+            width = int(width) if width else None
+            quality = int(request.query_params.get('quality', 70))
+        except ValueError:
             return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {'error': 'fps, width and quality must be numbers'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 0 < fps <= self.MAX_FPS:
+            return Response(
+                {'error': f'fps must be between 0 and {self.MAX_FPS}'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        if width is not None and width < 1:
+            return Response(
+                {'error': 'width must be positive'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = StreamingHttpResponse(
+            self._stream(self._get_key(fps, width, quality)),
+            content_type=(
+                f'multipart/x-mixed-replace; boundary={self.BOUNDARY}'
+            ),
+        )
+        response['Cache-Control'] = 'no-cache, no-store'
+        # Stop nginx from buffering the stream.
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class IntegrationsViewV2(APIView):
@@ -863,25 +1631,61 @@ class IntegrationsViewV2(APIView):
 
 
 class UpdateViewV2(APIView):
-    """POST /api/v2/update — trigger Watchtower to pull and restart containers."""
+    """POST /api/v2/update — trigger Watchtower to pull and restart containers.
+
+    Pulling the images takes minutes, so it runs as a background job whose
+    id is returned for polling at /api/v2/jobs/<job_id>.
+    """
 
     @authorized
     def post(self, request):
-        import requests as req
+        job = Job.create(r, 'update')
+        update_containers.delay(job.id)
+        return Response(
+            {'success': True, 'job_id': job.id},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('api:job_v2', args=[job.id])},
+        )
 
-        token = getenv('WATCHTOWER_TOKEN', 'anthias-player-update')
-        try:
-            resp = req.post(
-                'http://watchtower:8080/v1/update',
-                headers={'Authorization': f'Bearer {token}'},
-                timeout=10,
-            )
-            return Response({'success': resp.status_code == 200})
-        except Exception as e:
+
+class JobViewV2(APIView):
+    @extend_schema(
+        summary='Get background job',
+        description=cleandoc("""
+        Returns the state of a background job: `pending`, `running`,
+        `succeeded` or `failed`, along with its `progress` from 0 to 1,
+        and its `result` or `error` once it's done. Jobs are kept for a
+        day after their last update.
+        """),
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'id': {'type': 'string'},
+                    'kind': {'type': 'string'},
+                    'state': {'type': 'string'},
+                    'progress': {'type': 'number'},
+                    'message': {'type': 'string'},
+                    'result': {},
+                    'error': {'type': 'string'},
+                    'created_at': {'type': 'number'},
+                    'updated_at': {'type': 'number'},
+                },
+            },
+            404: {
+                'type': 'object',
+                'properties': {'error': {'type': 'string'}},
+            },
+        },
+    )
+    @authorized
+    def get(self, request, job_id):
+        job = Job.get(r, job_id)
+        if job is None:
             return Response(
-                {'success': False, 'error': str(e)},
-                status=status.HTTP_502_BAD_GATEWAY,
+                {'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND
             )
+        return Response(job)
 
 
 # ── CEC TV control ──
@@ -983,44 +1787,226 @@ class IrTestViewV2(APIView):
 
 
 class ViewLogViewV2(APIView):
-    """GET /api/v2/viewlog — playback history from viewlog.db."""
+    MAX_PAGE_SIZE = 1000
+
+    @staticmethod
+    def _parse_params(params):
+        """
+        Returns the (cursor, since, limit) of the query parameters. Raises
+        ValueError if they aren't valid.
+        """
+        cursor = int(params.get('cursor', 0))
+        since = params.get('since')
+        if since:
+            since = viewlog.parse_time(since)
+
+        limit = None
+        if 'limit' in params:
+            limit = int(params['limit'])
+            if limit <= 0:
+                raise ValueError('limit must be positive')
+
+        return cursor, since, limit
+
+    @staticmethod
+    def _stream_list(entries):
+        yield '['
+        for i, entry in enumerate(entries):
+            yield (',' if i else '') + json.dumps(entry)
+        yield ']'
+
+    @extend_schema(
+        summary='Get playback history',
+        description=cleandoc("""
+        Entries are returned in the order they were logged. Without
+        `limit` or `cursor`, they are all returned as a list.
+
+        * `since` only returns the entries started after that ISO 8601
+          time.
+        * `limit` and `cursor` paginate the entries. The response is then
+          an object with the `results` and the `next_cursor` to pass to
+          get the following page, which is null on the last one. The
+          cursor is an entry id, so a client can also resume after the
+          last entry it has.
+        """),
+        parameters=[
+            OpenApiParameter('since', OpenApiTypes.DATETIME, required=False),
+            OpenApiParameter('cursor', OpenApiTypes.INT, required=False),
+            OpenApiParameter('limit', OpenApiTypes.INT, required=False),
+        ],
+    )
+    @authorized
+    def get(self, request):
+        params = request.query_params
+        try:
+            cursor, since, limit = self._parse_params(params)
+            if limit is not None and limit > self.MAX_PAGE_SIZE:
+                raise ValueError(
+                    f'limit must be between 1 and {self.MAX_PAGE_SIZE}'
+                )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if 'limit' not in params and 'cursor' not in params:
+            return StreamingHttpResponse(
+                self._stream_list(viewlog.iter_entries(since=since)),
+                content_type='application/json',
+            )
+
+        limit = limit or self.MAX_PAGE_SIZE
+        entries = list(viewlog.iter_entries(cursor, since, limit + 1))
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = entries[-1]['id']
+
+        return Response({'results': entries, 'next_cursor': next_cursor})
 
+
+class ViewLogExportViewV2(ViewLogViewV2):
+    @extend_schema(
+        summary='Export playback history',
+        description=cleandoc("""
+        Streams the entries as newline-delimited JSON, one entry per line
+        in the order they were logged, however many there are. `since`,
+        `cursor` and `limit` filter them as they do for the playback
+        history.
+        """),
+        parameters=[
+            OpenApiParameter('since', OpenApiTypes.DATETIME, required=False),
+            OpenApiParameter('cursor', OpenApiTypes.INT, required=False),
+            OpenApiParameter('limit', OpenApiTypes.INT, required=False),
+        ],
+        responses={200: {'type': 'string'}},
+    )
     @authorized
     def get(self, request):
-        import sqlite3
+        try:
+            cursor, since, limit = self._parse_params(request.query_params)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
 
-        db_path = path.join(
-            path.expanduser('~'), '.screenly', 'viewlog.db'
+        response = StreamingHttpResponse(
+            (
+                json.dumps(entry) + '\n'
+                for entry in viewlog.iter_entries(cursor, since, limit)
+            ),
+            content_type='application/x-ndjson',
         )
-        if not path.exists(db_path):
-            return Response([])
+        # Let the client see the entries as they are read.
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
-        since = request.query_params.get('since')
 
-        try:
-            conn = sqlite3.connect(db_path, timeout=3)
-            if since:
-                rows = conn.execute(
-                    'SELECT asset_id, asset_name, mimetype, started_at '
-                    'FROM viewlog WHERE started_at > ? ORDER BY id ASC',
-                    (since,)
-                ).fetchall()
-            else:
-                rows = conn.execute(
-                    'SELECT asset_id, asset_name, mimetype, started_at '
-                    'FROM viewlog ORDER BY id ASC'
-                ).fetchall()
-            conn.close()
-        except Exception:
-            return Response([])
+class ViewLogReportViewV2(APIView):
+    DEFAULT_DURATION = timedelta(days=7)
 
-        entries = [
-            {
-                'asset_id': r[0],
-                'asset_name': r[1],
-                'mimetype': r[2],
-                'started_at': r[3],
+    @extend_schema(
+        summary='Get playback report',
+        description=cleandoc("""
+        Returns how many times each asset was played and for how many
+        seconds it was on screen, over the hours that overlap the
+        `start`/`end` window (ISO 8601 times, the last 7 days by
+        default). `asset_id` restricts the report to one asset.
+        """),
+        parameters=[
+            OpenApiParameter('start', OpenApiTypes.DATETIME, required=False),
+            OpenApiParameter('end', OpenApiTypes.DATETIME, required=False),
+            OpenApiParameter('asset_id', OpenApiTypes.STR, required=False),
+        ],
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'start': {'type': 'string'},
+                    'end': {'type': 'string'},
+                    'assets': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'asset_id': {'type': 'string'},
+                                'name': {'type': ['string', 'null']},
+                                'plays': {'type': 'integer'},
+                                'seconds': {'type': 'number'},
+                            },
+                        },
+                    },
+                },
             }
-            for r in rows
-        ]
-        return Response(entries)
+        },
+    )
+    @authorized
+    def get(self, request):
+        params = request.query_params
+        try:
+            end = timezone.now()
+            if params.get('end'):
+                end = datetime.fromisoformat(params['end'])
+            start = end - self.DEFAULT_DURATION
+            if params.get('start'):
+                start = datetime.fromisoformat(params['start'])
+            if start.tzinfo is None or end.tzinfo is None:
+                raise ValueError('start and end must have a time zone')
+            if start >= end:
+                raise ValueError('start must be before end')
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        report = viewlog.get_report(start, end, params.get('asset_id'))
+
+        # Deleted assets are still reported, without a name.
+        names = dict(
+            Asset.objects.filter(
+                asset_id__in=[row['asset_id'] for row in report['assets']]
+            ).values_list('asset_id', 'name')
+        )
+        for row in report['assets']:
+            row['name'] = names.get(row['asset_id'])
+
+        return Response(report)
+
+
+class AuthTokenViewV2(APIView):
+    @extend_schema(
+        summary='Create API token',
+        description=cleandoc("""
+        Returns a signed token to send as `Authorization: Bearer <token>`
+        instead of the password, until it expires. Changing the username
+        or password revokes all the tokens.
+        """),
+        request=None,
+        responses={
+            201: {
+                'type': 'object',
+                'properties': {
+                    'token': {'type': 'string'},
+                    'expires_at': {'type': 'integer'},
+                },
+            },
+            400: {
+                'type': 'object',
+                'properties': {'error': {'type': 'string'}},
+            },
+        },
+    )
+    @authorized
+    def post(self, request):
+        token = settings.auth.create_token()
+        if token is None:
+            return Response(
+                {'error': 'Authentication is disabled'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        token, expires_at = token
+        return Response(
+            {'token': token, 'expires_at': expires_at},
+            status=status.HTTP_201_CREATED,
+        )
@@ -1,19 +1,40 @@
 import json
 import logging
-from datetime import datetime, timedelta
-from os import getenv, path
+import time
+from datetime import datetime, timedelta, timezone
+from os import getenv, path, remove
 
 import django
 import sh
 from celery import Celery
+from celery.signals import (
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_revoked,
+    worker_ready,
+)
 from tenacity import Retrying, stop_after_attempt, wait_fixed
 
+from lib import (
+    backup_helper,
+    jobs,
+    keyframes,
+    metrics,
+    notifications,
+    thumbnails,
+    uploads,
+    viewlog,
+)
+
 try:
     django.setup()
 
     # Place imports that uses Django in this block.
 
-    from lib import diagnostics
+    from anthias_app.models import Asset, MediaInfo
+    from lib import device_info, diagnostics, ingest, media_info
+    from lib.errors import MediaProbeError
     from lib.utils import (
         connect_to_redis,
         is_balena_app,
@@ -34,6 +55,11 @@ CELERY_RESULT_BACKEND = getenv(
 )
 CELERY_BROKER_URL = getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_TASK_RESULT_EXPIRES = timedelta(hours=6)
+DEVICE_INFO_LOCK_TIMEOUT = 120  # seconds
+WATCHTOWER_TIMEOUT = 600  # seconds
+BACKUP_TIMEOUT = 3600  # seconds
+# Temporary files are left alone for longer than any task writes them.
+STALE_FILE_AGE = 24 * 3600  # seconds
 
 r = connect_to_redis()
 celery = Celery(
@@ -44,6 +70,53 @@ celery = Celery(
 )
 
 
+# Long enough for any task to run to its time limit.
+TASK_STARTED_AT_TTL = 24 * 3600  # seconds
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    # Kept in Redis rather than in memory, as a task killed by its time
+    # limit is reported by the main worker process, not the one running it.
+    try:
+        r.set(
+            f'task_started_at:{task_id}', time.time(), ex=TASK_STARTED_AT_TTL
+        )
+    except Exception as e:
+        logging.warning('Failed to record the start of %s: %s', task_id, e)
+
+
+def _record_task_duration(task_id, task, state):
+    try:
+        # Taken along with the key, so that a task reported both as failed
+        # and by task_postrun is only counted once.
+        started_at = r.getdel(f'task_started_at:{task_id}')
+        if started_at is None:
+            return
+
+        metrics.TASK_DURATION.observe_to(
+            r, max(time.time() - float(started_at), 0), task.name, state
+        )
+    except Exception as e:
+        logging.warning('Failed to record the duration of %s: %s', task, e)
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    _record_task_duration(task_id, task, state)
+
+
+@task_failure.connect
+def record_failed_task_duration(sender=None, task_id=None, **kwargs):
+    # Tasks killed by their time limit fail without task_postrun.
+    _record_task_duration(task_id, sender, 'FAILURE')
+
+
+@task_revoked.connect
+def record_revoked_task_duration(sender=None, request=None, **kwargs):
+    _record_task_duration(request.id, sender, 'REVOKED')
+
+
 @celery.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
     # Calls cleanup() every hour.
@@ -54,6 +127,26 @@ def setup_periodic_tasks(sender, **kwargs):
     sender.add_periodic_task(
         60, enforce_display_schedule.s(), name='display_schedule'
     )
+    sender.add_periodic_task(
+        device_info.COLLECT_INTERVAL,
+        collect_device_info.s(),
+        name='device_info',
+        expires=device_info.COLLECT_INTERVAL,
+    )
+    sender.add_periodic_task(
+        device_info.COLLECT_INTERVAL,
+        collect_slow_device_info.s(),
+        name='slow_device_info',
+        expires=device_info.COLLECT_INTERVAL,
+    )
+    sender.add_periodic_task(
+        24 * 3600, archive_viewlog.s(), name='archive_viewlog'
+    )
+
+
+@worker_ready.connect
+def queue_backfills(sender=None, **kwargs):
+    backfill_media_info.delay()
 
 
 @celery.task(time_limit=30)
@@ -62,14 +155,256 @@ def get_display_power():
     r.expire('display_power', 3600)
 
 
+@celery.task(time_limit=DEVICE_INFO_LOCK_TIMEOUT)
+def collect_device_info():
+    """
+    Samples the device information served by the info endpoints, each
+    value on its own cadence, and records the health history. The slow
+    values are left to `collect_slow_device_info`, so that they can't
+    hold up the samples.
+    """
+    if not r.set('device_info_lock', 1, nx=True, ex=DEVICE_INFO_LOCK_TIMEOUT):
+        return
+
+    try:
+        now = time.time()
+        values = device_info.collect(
+            r,
+            now,
+            names=set(device_info.COLLECTORS) - device_info.SLOW_COLLECTORS,
+        )
+        device_info.record_history(values, now)
+    finally:
+        r.delete('device_info_lock')
+
+
+@celery.task(time_limit=DEVICE_INFO_LOCK_TIMEOUT)
+def collect_slow_device_info():
+    """
+    Samples the device information that can take a while to get, such as
+    the IP addresses.
+    """
+    # Getting the IP address can take over a minute, so don't let runs
+    # pile up behind a slow one.
+    if not r.set(
+        'device_info_slow_lock', 1, nx=True, ex=DEVICE_INFO_LOCK_TIMEOUT
+    ):
+        return
+
+    try:
+        device_info.collect(r, names=device_info.SLOW_COLLECTORS)
+    finally:
+        r.delete('device_info_slow_lock')
+
+
 @celery.task
 def cleanup():
-    sh.find(
-        path.join(getenv('HOME'), 'screenly_assets'),
+    """
+    Removes the temporary files left behind in the asset directory. Files
+    younger than `STALE_FILE_AGE` may still be written to, and uploads are
+    kept as long as their asset waits for the ingestion pipeline.
+    """
+    assets_dir = path.join(getenv('HOME'), 'screenly_assets')
+    stale_files = sh.find(
+        assets_dir,
+        '(',
         '-name',
         '*.tmp',
-        '-delete',
+        '-o',
+        '-name',
+        f'*.tmp{uploads.MD5_SUFFIX}',
+        ')',
+        '-mmin',
+        f'+{STALE_FILE_AGE // 60}',
+    )
+    pending_uris = set(
+        Asset.objects.filter(is_processing=True).values_list('uri', flat=True)
+    )
+
+    for file_path in str(stale_files).splitlines():
+        if file_path.removesuffix(uploads.MD5_SUFFIX) in pending_uris:
+            continue
+        try:
+            remove(file_path)
+        except OSError:
+            pass
+    uploads.remove_stale_sessions(path.join(assets_dir, '.uploads'))
+
+
+@celery.task(time_limit=WATCHTOWER_TIMEOUT + 30)
+def update_containers(job_id):
+    """
+    Has Watchtower pull the new images and restart the containers, which
+    takes as long as the download.
+    """
+    import requests
+
+    token = getenv('WATCHTOWER_TOKEN', 'anthias-player-update')
+    with jobs.Job(r, job_id):
+        response = requests.post(
+            'http://watchtower:8080/v1/update',
+            headers={'Authorization': f'Bearer {token}'},
+            timeout=WATCHTOWER_TIMEOUT,
+        )
+        response.raise_for_status()
+
+
+@celery.task(time_limit=BACKUP_TIMEOUT)
+def create_backup(job_id, name, incremental=False):
+    """
+    Writes a backup archive to the static files, for download once the
+    job is done. An incremental backup builds on the latest one there.
+    """
+    with jobs.Job(r, job_id) as job:
+        archive_name = backup_helper.create_backup(
+            name,
+            progress=job.track,
+            base=backup_helper.get_latest_backup() if incremental else None,
+        )
+        job.succeed({'filename': archive_name})
+
+
+@celery.task(time_limit=ingest.INGEST_TIMEOUT)
+def ingest_asset(job_id, asset_id, ext=''):
+    """
+    Runs a new asset through the ingestion pipeline. The progress goes to
+    the job and to the web interface, and the asset is deleted if any
+    stage fails.
+    """
+    with jobs.Job(r, job_id) as job:
+        asset = Asset.objects.get(asset_id=asset_id)
+
+        def progress(fraction, stage):
+            job.set_progress(fraction, stage)
+            notifications.send_to_ws_server(
+                r,
+                {
+                    'type': 'ingest',
+                    'asset_id': asset_id,
+                    'data': {'job_id': job_id, 'stage': stage},
+                },
+            )
+
+        try:
+            ingest.Ingest(asset, ext).run(progress)
+        except Exception:
+            ingest.discard(asset)
+            raise
+        finally:
+            # Has the web interface reload the assets.
+            notifications.send_to_ws_server(r, asset_id)
+
+        job.succeed({'asset_id': asset_id})
+
+    if 'video' in asset.mimetype and not path.isfile(
+        keyframes.index_path(asset.uri)
+    ):
+        build_keyframe_index.delay(asset.uri)
+
+
+@celery.task(time_limit=backup_helper.RECOVERY_TIMEOUT)
+def recover_backup(job_id, file_path):
+    """
+    Restores a backup while the viewer waits on the standby screen, which
+    it leaves once the recovery lock is released.
+    """
+    try:
+        with jobs.Job(r, job_id) as job:
+            backup_helper.recover(file_path, progress=job.track)
+    finally:
+        r.delete(backup_helper.RECOVERY_LOCK_KEY)
+
+
+@celery.task
+def archive_viewlog():
+    """
+    Moves the viewlog entries past their retention to the archive, and
+    deletes the archives past theirs.
+    """
+    from settings import settings as app_settings
+
+    app_settings.load()
+    now = datetime.now(timezone.utc)
+
+    retention_days = app_settings['viewlog_retention_days']
+    if retention_days > 0:
+        archived = viewlog.archive(now - timedelta(days=retention_days))
+        logging.info('Archived %d viewlog entries', archived)
+
+    archive_days = app_settings['viewlog_archive_days']
+    if archive_days > 0:
+        viewlog.prune_archive(now - timedelta(days=archive_days))
+
+    viewlog.vacuum()
+
+
+@celery.task(time_limit=keyframes.BUILD_TIMEOUT + 60)
+def build_keyframe_index(video_path):
+    """
+    Pre-renders the screenshot frames of a video asset, so screenshots
+    taken while it plays don't need to spawn ffmpeg.
+    """
+    if not path.isfile(video_path):
+        return
+
+    try:
+        count = keyframes.build_index(video_path)
+        logging.info(
+            'Built keyframe index for %s (%d frames)', video_path, count
+        )
+    except Exception as e:
+        logging.warning(
+            'Failed to build keyframe index for %s: %s', video_path, e
+        )
+
+
+@celery.task(time_limit=thumbnails.POSTER_TIMEOUT * 2 + 30)
+def generate_thumbnail(asset_path, mimetype):
+    """
+    Renders the thumbnail served by the asset thumbnail endpoint: a
+    downscaled copy of an image, or a poster frame of a video.
+    """
+    if not path.isfile(asset_path):
+        return
+
+    try:
+        thumbnails.generate_thumbnail(asset_path, mimetype)
+    except Exception as e:
+        logging.warning(
+            'Failed to generate thumbnail for %s: %s', asset_path, e
+        )
+
+
+@celery.task(time_limit=media_info.PROBE_TIMEOUT + 30)
+def probe_media(uri):
+    """
+    Stores the media info of a video, which screenshots taken while it
+    plays only read.
+    """
+    if not path.isfile(uri):
+        return
+
+    try:
+        media_info.get_media_info(uri)
+    except MediaProbeError as e:
+        logging.warning('Failed to probe %s: %s', uri, e)
+
+
+@celery.task
+def backfill_media_info():
+    """
+    Queues the probe of the videos added before their media info was
+    stored at ingestion. Only the ones still without it are queued, so
+    this is cheap once they're done.
+    """
+    uris = (
+        Asset.objects.filter(mimetype='video', is_processing=False)
+        .exclude(uri__in=MediaInfo.objects.values('uri'))
+        .values_list('uri', flat=True)
+        .distinct()
     )
+    for uri in uris:
+        probe_media.delay(uri)
 
 
 @celery.task
@@ -0,0 +1,56 @@
+"""
+Content-addressed storage of asset files.
+
+Uploaded files are stored in the asset directory as `<md5><ext>`, so
+uploading a file that is already there doesn't take any extra space: the
+new asset simply points at the existing file. Assets sharing a file are
+counted through their `uri`, and the file is only removed along with the
+last of them.
+"""
+
+import hashlib
+from os import path, replace
+from typing import Optional
+
+from lib import uploads
+
+READ_SIZE = 1024 * 1024  # bytes
+
+
+def file_md5(file_path: str) -> str:
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for data in iter(lambda: f.read(READ_SIZE), b''):
+            md5.update(data)
+    return md5.hexdigest()
+
+
+def blob_path(store_dir: str, md5: str, ext: str = '') -> str:
+    return path.join(store_dir, f'{md5}{ext}')
+
+
+def find_blob(store_dir: str, md5: str, ext: str = '') -> Optional[str]:
+    file_path = blob_path(store_dir, md5, ext)
+    return file_path if path.isfile(file_path) else None
+
+
+def add_file(
+    file_path: str, store_dir: str, ext: str = '', md5: Optional[str] = None
+) -> tuple:
+    """
+    Moves a file into the store and returns its (path, md5). If the store
+    already has a file with the same content, it's replaced by the given
+    one, rather than the given one being dropped, as the stored one may be
+    removed along with its last asset at any time.
+
+    The MD5 is taken from the argument, from the sidecar file written
+    during the upload, or computed as a last resort.
+    """
+    md5 = md5 or uploads.read_md5(file_path) or file_md5(file_path)
+    stored_path = blob_path(store_dir, md5, ext)
+
+    if stored_path != file_path:
+        replace(file_path, stored_path)
+
+    uploads.remove_md5(file_path)
+    return stored_path, md5
@@ -5,15 +5,35 @@ from __future__ import unicode_literals
 
 import hashlib
 import os.path
+import time
 from abc import ABCMeta, abstractmethod
 from base64 import b64decode
 from builtins import object, str
-from functools import wraps
+from functools import lru_cache, wraps
 
 from future.utils import with_metaclass
 
 LINUX_USER = os.getenv('USER', 'pi')
 
+TOKEN_MAX_AGE = 7 * 24 * 3600  # seconds
+TOKEN_SALT = 'lib.auth.token'
+
+
+@lru_cache(maxsize=256)
+def _read_token(token, key):
+    """
+    Returns the (username, expiry) signed in `token` with `key`, or None
+    if the signature doesn't match. Clients send the same few tokens over
+    and over, so the results are cached.
+    """
+    from django.core import signing
+
+    try:
+        payload = signing.loads(token, key=key, salt=TOKEN_SALT)
+        return payload['user'], payload['exp']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
 
 class Auth(with_metaclass(ABCMeta, object)):
     @abstractmethod
@@ -77,6 +97,14 @@ class Auth(with_metaclass(ABCMeta, object)):
         """
         pass
 
+    def create_token(self):
+        """
+        Creates a token that authenticates the requests bearing it.
+        :return: (token, expiry as a Unix time) or None if the backend
+        has no tokens.
+        """
+        pass
+
 
 class NoAuth(Auth):
     display_name = 'Disabled'
@@ -116,6 +144,37 @@ class BasicAuth(Auth):
         hashed_password = hashlib.sha256(password.encode('utf-8')).hexdigest()
         return self.settings['password'] == hashed_password
 
+    def _get_token_key(self):
+        from django.conf import settings as django_settings
+
+        # Changing the username or password revokes the tokens.
+        return ':'.join(
+            [
+                django_settings.SECRET_KEY,
+                self.settings['user'],
+                self.settings['password'],
+            ]
+        )
+
+    def create_token(self, max_age=TOKEN_MAX_AGE):
+        from django.core import signing
+
+        expires_at = int(time.time()) + max_age
+        token = signing.dumps(
+            {'user': self.settings['user'], 'exp': expires_at},
+            key=self._get_token_key(),
+            salt=TOKEN_SALT,
+        )
+        return token, expires_at
+
+    def check_token(self, token):
+        payload = _read_token(token, self._get_token_key())
+        return (
+            payload is not None
+            and payload[0] == self.settings['user']
+            and payload[1] > time.time()
+        )
+
     def is_authenticated(self, request):
         # First check Authorization header for API requests
         authorization = request.headers.get('Authorization')
@@ -124,6 +183,8 @@ class BasicAuth(Auth):
             if len(content) == 2:
                 auth_type = content[0]
                 auth_data = content[1]
+                if auth_type == 'Bearer':
+                    return self.check_token(auth_data)
                 if auth_type == 'Basic':
                     auth_data = b64decode(auth_data).decode('utf-8')
                     auth_data = auth_data.split(':')
@@ -133,10 +194,9 @@ class BasicAuth(Auth):
                         return self._check(username, password)
 
         # Then check session for form-based login
-        username = request.session.get('auth_username')
-        password = request.session.get('auth_password')
-        if username and password:
-            return self._check(username, password)
+        token = request.session.get('auth_token')
+        if token:
+            return self.check_token(token)
 
         return False
 
@@ -1,43 +1,635 @@
 from __future__ import unicode_literals
 
+import gzip
+import hashlib
+import json
 import logging
+import shutil
+import stat
 import sys
 import tarfile
+import tempfile
+import time
 from datetime import datetime
-from os import getenv, makedirs, path, remove
+from os import (
+    getenv,
+    link,
+    listdir,
+    lstat,
+    makedirs,
+    path,
+    readlink,
+    remove,
+    replace,
+    utime,
+    walk,
+)
+from typing import Callable, Dict, Iterator, Optional
+
+from lib.errors import BackupError
 
 directories = ['.screenly', 'screenly_assets']
 default_archive_name = 'anthias-backup'
 static_dir = 'screenly/staticfiles'
 
+# The archive is an uncompressed tar, so that the assets, which are
+# mostly video and images in compressed formats already, are stored as
+# they are rather than gzipped again for nothing. The other files, like
+# the databases, are gzipped one by one, get a .gz suffix, and are marked
+# with this PAX header so that recovery knows to decompress them.
+COMPRESSION_HEADER = 'ANTHIAS.compression'
+MANIFEST_NAME = 'anthias-manifest.json'
+MANIFEST_VERSION = 1
+# Restores are extracted into this directory inside each backed up one,
+# on the same file system as the entries they replace, which are moved
+# aside into the other one until the restore is through. The backed up
+# directories themselves may be mount points, so they aren't renamed.
+STAGING_DIR = '.anthias-restore'
+PREVIOUS_DIR = '.anthias-previous'
+# Only one restore runs at a time, and the viewer waits on the standby
+# screen while this key exists.
+RECOVERY_LOCK_KEY = 'backup_recovery'
+RECOVERY_TIMEOUT = 3600  # seconds
+# Python 3.12 makes the safer extraction filter the default, earlier
+# versions have it from their latest patch releases, if at all.
+EXTRACT_OPTIONS = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+COMPRESSED_EXTENSIONS = {
+    '.7z',
+    '.aac',
+    '.avi',
+    '.bz2',
+    '.flac',
+    '.flv',
+    '.gif',
+    '.gz',
+    '.heic',
+    '.jpeg',
+    '.jpg',
+    '.m4a',
+    '.m4v',
+    '.mkv',
+    '.mov',
+    '.mp3',
+    '.mp4',
+    '.mpeg',
+    '.mpg',
+    '.ogg',
+    '.ogv',
+    '.opus',
+    '.png',
+    '.webm',
+    '.webp',
+    '.wmv',
+    '.xz',
+    '.zip',
+    '.zst',
+}
+CHUNK_SIZE = 1 << 20
+# Files gzipped for the archive are kept in memory up to this size, and
+# in a temporary file beyond it, as the tar header needs their size.
+SPOOL_SIZE = 8 << 20
 
-def create_backup(name=default_archive_name):
-    home = getenv('HOME')
-    archive_name = '{}-{}.tar.gz'.format(
+ProgressCallback = Callable[[int, int], None]
+
+
+def get_archive_name(name: Optional[str] = None) -> str:
+    return '{}-{}.tar'.format(
         name if name else default_archive_name,
         datetime.now().strftime('%Y-%m-%dT%H-%M-%S'),
     )
-    file_path = path.join(home, static_dir, archive_name)
 
-    if not path.exists(path.join(home, static_dir)):
-        makedirs(path.join(home, static_dir), exist_ok=True)
 
-    if path.isfile(file_path):
-        remove(file_path)
+def is_compressed(file_name: str) -> bool:
+    return path.splitext(file_name)[1].lower() in COMPRESSED_EXTENSIONS
+
+
+def _get_tarinfo(arcname: str, file_path: str) -> Optional[tarfile.TarInfo]:
+    st = lstat(file_path)
+    info = tarfile.TarInfo(arcname)
+    info.mode = stat.S_IMODE(st.st_mode)
+    info.mtime = st.st_mtime
+    info.uid = st.st_uid
+    info.gid = st.st_gid
+
+    if stat.S_ISDIR(st.st_mode):
+        info.type = tarfile.DIRTYPE
+    elif stat.S_ISLNK(st.st_mode):
+        info.type = tarfile.SYMTYPE
+        info.linkname = readlink(file_path)
+    elif stat.S_ISREG(st.st_mode):
+        info.size = st.st_size
+    else:
+        # Sockets, FIFOs and devices don't belong in a backup.
+        return None
+    return info
+
+
+def _list_members(home: str):
+    """
+    Yields the tar header and the path of everything to back up, with the
+    directories before their contents.
+    """
+    for directory in directories:
+        root_dir = path.join(home, directory)
+        yield _get_tarinfo(directory, root_dir), root_dir
+
+        for dir_path, dir_names, file_names in walk(root_dir):
+            dir_names.sort()
+            relative_path = path.relpath(dir_path, root_dir)
+            if relative_path == '.':
+                arcname = directory
+                # Left over by a restore that didn't finish.
+                dir_names[:] = [
+                    name
+                    for name in dir_names
+                    if name not in (STAGING_DIR, PREVIOUS_DIR)
+                ]
+            else:
+                arcname = path.join(directory, relative_path)
+                yield _get_tarinfo(arcname, dir_path), dir_path
+
+            # Links to directories are listed as directories, but aren't
+            # followed.
+            links = [
+                name
+                for name in dir_names
+                if path.islink(path.join(dir_path, name))
+            ]
+            for file_name in sorted(file_names + links):
+                file_path = path.join(dir_path, file_name)
+                try:
+                    info = _get_tarinfo(
+                        path.join(arcname, file_name), file_path
+                    )
+                except FileNotFoundError:
+                    continue
+                if info is not None:
+                    yield info, file_path
+
+
+def _get_header(info: tarfile.TarInfo) -> bytes:
+    return info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+
+
+def _read_exactly(f, size: int) -> Iterator[bytes]:
+    """
+    Yields `size` bytes of the file, padded with zeros if it shrank while
+    being read, as the tar header already has its size.
+    """
+    while size > 0:
+        chunk = f.read(min(CHUNK_SIZE, size))
+        if not chunk:
+            chunk = tarfile.NUL * min(CHUNK_SIZE, size)
+        size -= len(chunk)
+        yield chunk
+
+
+def _get_padding(size: int) -> bytes:
+    remainder = size % tarfile.BLOCKSIZE
+    return tarfile.NUL * (tarfile.BLOCKSIZE - remainder) if remainder else b''
+
+
+def _hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _iter_stored(info, f, digest, on_read) -> Iterator[bytes]:
+    yield _get_header(info)
+    for chunk in _read_exactly(f, info.size):
+        digest.update(chunk)
+        on_read(len(chunk))
+        yield chunk
+    yield _get_padding(info.size)
+
+
+def _iter_gzipped(info, f, digest, on_read) -> Iterator[bytes]:
+    with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as spool:
+        with gzip.GzipFile(
+            fileobj=spool, mode='wb', compresslevel=6, mtime=0
+        ) as compressed:
+            for chunk in _read_exactly(f, info.size):
+                digest.update(chunk)
+                compressed.write(chunk)
+        on_read(info.size)
+
+        info.size = spool.tell()
+        info.name += '.gz'
+        info.pax_headers = {COMPRESSION_HEADER: 'gzip'}
+        spool.seek(0)
 
+        yield _get_header(info)
+        yield from _read_exactly(spool, info.size)
+        yield _get_padding(info.size)
+
+
+def _get_unchanged_entry(
+    previous: Optional[dict],
+    info: tarfile.TarInfo,
+    file_path: str,
+    base: str,
+) -> Optional[dict]:
+    """
+    Returns the manifest entry of a file that hasn't changed since the
+    base backup, pointing to the archive that holds its content.
+    """
+    if previous is None or previous['size'] != info.size:
+        return None
+    if previous['mtime'] != info.mtime:
+        # Touched, but maybe not changed.
+        try:
+            if _hash_file(file_path) != previous['sha256']:
+                return None
+        except FileNotFoundError:
+            return None
+    return {
+        **previous,
+        'mtime': info.mtime,
+        'archive': previous['archive'] or base,
+    }
+
+
+def get_backup_dir() -> str:
+    return path.join(getenv('HOME'), static_dir)
+
+
+def read_manifest(file_path: str) -> Optional[dict]:
+    """
+    Returns the manifest of a backup archive, or None for archives made
+    before backups had one.
+    """
     try:
-        with tarfile.open(file_path, 'w:gz') as tar:
-            for directory in directories:
-                path_to_dir = path.join(home, directory)
-                tar.add(path_to_dir, arcname=directory)
-    except IOError as e:
-        remove(file_path)
+        with tarfile.open(file_path, 'r:') as tar:
+            with tar.extractfile(tar.getmember(MANIFEST_NAME)) as f:
+                return json.load(f)
+    except (tarfile.ReadError, KeyError):
+        return None
+
+
+def get_latest_backup() -> Optional[str]:
+    """
+    Returns the name of the most recent backup in the backup directory
+    that can serve as the base of an incremental one.
+    """
+    try:
+        file_names = listdir(get_backup_dir())
+    except FileNotFoundError:
+        return None
+
+    archives = sorted(
+        (file_name for file_name in file_names if file_name.endswith('.tar')),
+        key=lambda file_name: path.getmtime(
+            path.join(get_backup_dir(), file_name)
+        ),
+        reverse=True,
+    )
+    for archive_name in archives:
+        if read_manifest(path.join(get_backup_dir(), archive_name)):
+            return archive_name
+    return None
+
+
+def iter_backup(
+    progress: Optional[ProgressCallback] = None,
+    base: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Yields the backup archive in chunks, reading the files as it goes, so
+    that it can be streamed to a response or a file without a copy.
+    `progress` is called with the bytes read so far and the total.
+
+    The archive ends with a manifest of the files, with their size, mtime
+    and SHA-256. Given the name of an earlier `base` backup, the archive
+    is incremental: the files that haven't changed since are only listed
+    in the manifest, along with the archive that holds them.
+    """
+    home = getenv('HOME')
+    base_files = {}
+    if base:
+        base_manifest = read_manifest(path.join(get_backup_dir(), base))
+        if base_manifest is None:
+            raise BackupError(f'{base} is not a backup with a manifest.')
+        base_files = base_manifest['files']
+
+    members = list(_list_members(home))
+    total = sum(info.size for info, _ in members if info.isreg())
+    done = 0
+    written = 0
+    files = {}
+
+    def on_read(size):
+        nonlocal done
+        done += size
+        if progress:
+            progress(done, total)
+
+    def iter_members():
+        for info, file_path in members:
+            if not info.isreg():
+                yield _get_header(info)
+                continue
+
+            entry = _get_unchanged_entry(
+                base_files.get(info.name), info, file_path, base
+            )
+            if entry is not None:
+                files[info.name] = entry
+                on_read(info.size)
+                continue
+
+            try:
+                f = open(file_path, 'rb')
+            except FileNotFoundError:
+                continue
+
+            name = info.name
+            entry = {'size': info.size, 'mtime': info.mtime}
+            digest = hashlib.sha256()
+            iter_file = _iter_stored if is_compressed(name) else _iter_gzipped
+            with f:
+                yield from iter_file(info, f, digest, on_read)
+            files[name] = {
+                **entry,
+                'sha256': digest.hexdigest(),
+                'archive': None,
+            }
+
+        manifest = json.dumps(
+            {
+                'version': MANIFEST_VERSION,
+                'created_at': time.time(),
+                'base': base,
+                'files': files,
+            }
+        ).encode()
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(manifest)
+        info.mtime = time.time()
+        info.mode = 0o644
+        yield _get_header(info)
+        yield manifest
+        yield _get_padding(info.size)
+
+    for chunk in iter_members():
+        written += len(chunk)
+        yield chunk
+
+    # The end of the archive is two empty blocks, padded to a full record.
+    written += 2 * tarfile.BLOCKSIZE
+    remainder = written % tarfile.RECORDSIZE
+    yield tarfile.NUL * (
+        2 * tarfile.BLOCKSIZE
+        + (tarfile.RECORDSIZE - remainder if remainder else 0)
+    )
+
+
+def create_backup(
+    name: str = default_archive_name,
+    progress: Optional[ProgressCallback] = None,
+    base: Optional[str] = None,
+) -> str:
+    archive_name = get_archive_name(name)
+    file_path = path.join(get_backup_dir(), archive_name)
+    tmp_path = f'{file_path}.tmp'
+
+    makedirs(get_backup_dir(), exist_ok=True)
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter_backup(progress, base):
+                f.write(chunk)
+        replace(tmp_path, file_path)
+    except (IOError, BackupError) as e:
+        if path.isfile(tmp_path):
+            remove(tmp_path)
         raise e
 
     return archive_name
 
 
-def recover(file_path):
+def _get_file_name(member: tarfile.TarInfo) -> str:
+    if member.pax_headers.get(COMPRESSION_HEADER) == 'gzip':
+        return member.name[: -len('.gz')]
+    return member.name
+
+
+def _check_name(name: str) -> str:
+    """
+    Returns the backed up directory a file belongs to, and rejects
+    anything that doesn't belong to one.
+    """
+    parts = name.split('/')
+    if (
+        parts[0] not in directories
+        or '..' in parts
+        or parts[1:2] in ([STAGING_DIR], [PREVIOUS_DIR])
+    ):
+        raise BackupError('Archive is wrong.')
+    return parts[0]
+
+
+def _check_member(member: tarfile.TarInfo) -> str:
+    return _check_name(member.name)
+
+
+def _get_staging_dir(home: str, directory: str) -> str:
+    return path.join(home, directory, STAGING_DIR)
+
+
+def _extract(tar: tarfile.TarFile, member: tarfile.TarInfo, target: str):
+    if member.pax_headers.get(COMPRESSION_HEADER) != 'gzip':
+        tar.extract(member, path=target, **EXTRACT_OPTIONS)
+        return
+
+    file_path = path.join(target, _get_file_name(member))
+    makedirs(path.dirname(file_path), exist_ok=True)
+    with tar.extractfile(member) as f, gzip.GzipFile(fileobj=f) as source:
+        with open(file_path, 'wb') as destination:
+            shutil.copyfileobj(source, destination, CHUNK_SIZE)
+    tar.chmod(member, file_path)
+    tar.utime(member, file_path)
+
+
+def _link_or_copy(source: str, destination: str):
+    makedirs(path.dirname(destination), exist_ok=True)
+    try:
+        link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def _is_on_disk(home: str, name: str, entry: dict) -> bool:
+    """
+    Tells whether the file on disk already has the content recorded in
+    the manifest, trusting the size and mtime when they match.
+    """
+    file_path = path.join(home, name)
+    try:
+        if path.getsize(file_path) != entry['size']:
+            return False
+        if path.getmtime(file_path) == entry['mtime']:
+            return True
+        return _hash_file(file_path) == entry['sha256']
+    except FileNotFoundError:
+        return False
+
+
+def _extract_stream(
+    file_path: str,
+    home: str,
+    progress: Optional[ProgressCallback] = None,
+) -> Optional[dict]:
+    """
+    Extracts the archive into the staging directories in a single pass,
+    and returns its manifest. Stored files that are on disk already, with
+    the same size and mtime, are linked from there rather than written
+    again.
+    """
+    total = path.getsize(file_path)
+    found = set()
+    manifest = None
+
+    # Archives made before the assets were stored uncompressed are gzipped
+    # as a whole.
+    with (
+        open(file_path, 'rb') as f,
+        tarfile.open(fileobj=f, mode='r|*') as tar,
+    ):
+        for member in tar:
+            if member.name == MANIFEST_NAME:
+                with tar.extractfile(member) as manifest_file:
+                    manifest = json.load(manifest_file)
+                continue
+
+            directory = _check_member(member)
+            found.add(directory)
+            if member.name == directory:
+                # The directories themselves stay where they are.
+                continue
+
+            staging_dir = _get_staging_dir(home, directory)
+            on_disk = path.join(home, member.name)
+            member.name = path.relpath(member.name, directory)
+            if (
+                member.isreg()
+                and COMPRESSION_HEADER not in member.pax_headers
+                and path.isfile(on_disk)
+                and path.getsize(on_disk) == member.size
+                and path.getmtime(on_disk) == member.mtime
+            ):
+                _link_or_copy(on_disk, path.join(staging_dir, member.name))
+            else:
+                _extract(tar, member, staging_dir)
+
+            if progress:
+                progress(f.tell(), total)
+
+    if found != set(directories):
+        raise BackupError('Archive is wrong.')
+    return manifest
+
+
+def _extract_files(file_path: str, names: Dict[str, dict], home: str):
+    with tarfile.open(file_path, 'r:') as tar:
+        for member in tar:
+            entry = names.get(_get_file_name(member))
+            if entry is None or not member.isreg():
+                continue
+            directory = _check_member(member)
+            staging_dir = _get_staging_dir(home, directory)
+            member.name = path.relpath(member.name, directory)
+            _extract(tar, member, staging_dir)
+            file_path = path.join(staging_dir, _get_file_name(member))
+            utime(file_path, (entry['mtime'], entry['mtime']))
+
+
+def _add_unchanged_files(manifest: dict, home: str):
+    """
+    Adds the files that an incremental backup only refers to, linking
+    them from disk when they're there, or else extracting them from the
+    earlier backups that hold them.
+    """
+    missing = {}
+    for name, entry in manifest['files'].items():
+        archive_name = entry['archive']
+        if archive_name is None:
+            continue
+        # The manifest comes with the upload, and may only refer to the
+        # backups kept in the backup directory.
+        if (
+            not isinstance(archive_name, str)
+            or path.basename(archive_name) != archive_name
+            or not archive_name.endswith('.tar')
+        ):
+            raise BackupError('Archive is wrong.')
+        directory = _check_name(name)
+        if _is_on_disk(home, name, entry):
+            _link_or_copy(
+                path.join(home, name),
+                path.join(
+                    _get_staging_dir(home, directory),
+                    path.relpath(name, directory),
+                ),
+            )
+        else:
+            missing.setdefault(archive_name, {})[name] = entry
+
+    for archive_name in missing:
+        if not path.isfile(path.join(get_backup_dir(), archive_name)):
+            raise BackupError(
+                f'{archive_name} is needed to recover this backup.'
+            )
+
+    for archive_name, names in missing.items():
+        _extract_files(path.join(get_backup_dir(), archive_name), names, home)
+
+
+def _swap(home: str):
+    """
+    Moves the entries of the backed up directories aside and the staged
+    ones in their place, and puts everything back if that fails midway.
+    Processes that hold one of the old files open, like the databases,
+    keep it until they reopen it.
+    """
+    moved = []
+
+    def move_entries(source, destination):
+        for name in listdir(source):
+            if name in (STAGING_DIR, PREVIOUS_DIR):
+                continue
+            replace(path.join(source, name), path.join(destination, name))
+            moved.append(
+                (path.join(source, name), path.join(destination, name))
+            )
+
+    try:
+        for directory in directories:
+            root_dir = path.join(home, directory)
+            previous_dir = path.join(root_dir, PREVIOUS_DIR)
+            makedirs(previous_dir)
+            move_entries(root_dir, previous_dir)
+            move_entries(_get_staging_dir(home, directory), root_dir)
+    except OSError:
+        for source, destination in reversed(moved):
+            replace(destination, source)
+        raise
+
+
+def _clean_up(home: str):
+    for directory in directories:
+        for name in (STAGING_DIR, PREVIOUS_DIR):
+            shutil.rmtree(path.join(home, directory, name), ignore_errors=True)
+
+
+def recover(file_path, progress: Optional[ProgressCallback] = None):
+    """
+    Restores a backup. The archive is read once, into staging directories
+    inside the backed up ones, whose contents are only replaced once it's
+    all there. The archive is removed either way.
+    """
     home = getenv('HOME')
     if not home:
         logging.error('No HOME variable')
@@ -45,11 +637,16 @@ def recover(file_path):
         # or we can create a new class that extends Exception.
         sys.exit(1)
 
-    with tarfile.open(file_path, 'r:gz') as tar:
-        for directory in directories:
-            if directory not in tar.getnames():
-                raise Exception('Archive is wrong.')
+    _clean_up(home)
+    for directory in directories:
+        makedirs(_get_staging_dir(home, directory))
 
-        tar.extractall(path=getenv('HOME'))
-
-    remove(file_path)
+    try:
+        manifest = _extract_stream(file_path, home, progress)
+        if manifest is not None:
+            _add_unchanged_files(manifest, home)
+        _swap(home)
+    finally:
+        _clean_up(home)
+        if path.isfile(file_path):
+            remove(file_path)
@@ -0,0 +1,366 @@
+"""
+Device information shown by the info endpoints.
+
+Some of the values are slow to get: finding the IP address can wait for
+the host agent for up to a minute, and the throttle state spawns
+`vcgencmd`. They are sampled in the background, each on its own cadence,
+into a Redis hash, so the endpoints only have to read that snapshot.
+
+Each field of the hash is the JSON of {'value': ..., 'time': ...}, the
+time being when the value was sampled.
+
+The health metrics (temperature, CPU usage, throttling and memory) are
+also kept as a day of history, in a round-robin file. The throttle state
+is a bitmask, so it's kept as a 0/1 series per flag: the max over a
+period tells whether the flag was raised, the average for how long.
+"""
+
+import ipaddress
+import json
+import logging
+import subprocess
+import time
+from datetime import timedelta
+from os import getenv, path, statvfs
+from platform import machine
+from typing import Iterable, Optional
+
+import psutil
+from hurry.filesize import size
+
+from lib import device_helper, diagnostics
+from lib.github import is_up_to_date
+from lib.timeseries import TimeSeries
+from lib.utils import get_node_ip, get_node_mac_address
+
+REDIS_KEY = 'device_info'
+CPU_TIMES_KEY = 'device_info_cpu_times'
+COLLECT_INTERVAL = 5  # seconds
+# The first CPU usage sample is measured over this long.
+CPU_USAGE_INTERVAL = 0.5  # seconds
+
+HISTORY_STEP = 5  # seconds
+HISTORY_SLOTS = 24 * 3600 // HISTORY_STEP
+# The bits of `vcgencmd get_throttled` that are set while it lasts.
+THROTTLE_FLAGS = {
+    'under_voltage': 0x1,
+    'freq_capped': 0x2,
+    'throttled': 0x4,
+    'soft_temp_limit': 0x8,
+}
+HISTORY_METRICS = [
+    'cpu_temp',
+    'cpu_usage',
+    *THROTTLE_FLAGS,
+    'memory_used',
+    'memory_available',
+]
+
+# How often each value is sampled, in seconds. The ones with history are
+# sampled at every step of it.
+INTERVALS = {
+    'cpu_usage': HISTORY_STEP,
+    'cpu_temp': HISTORY_STEP,
+    'memory': HISTORY_STEP,
+    'throttle_state': HISTORY_STEP,
+    'loadavg': 15,
+    'cpu_freq': 15,
+    'free_space': 60,
+    'disk_usage': 60,
+    'uptime': 60,
+    'ip_addresses': 300,
+    'mac_address': 3600,
+    'up_to_date': 3600,
+    'anthias_version': 3600,
+    'device_model': 86400,
+}
+
+
+def get_loadavg():
+    return diagnostics.get_load_avg()['15 min']
+
+
+def get_free_space():
+    slash = statvfs('/')
+    return size(slash.f_bavail * slash.f_frsize)
+
+
+def get_anthias_version():
+    app_version = getenv('APP_VERSION', '')
+    git_short_hash = diagnostics.get_git_short_hash() or 'unknown'
+
+    if app_version and app_version != 'dev':
+        return 'v{}@{}'.format(app_version, git_short_hash)
+
+    git_branch = diagnostics.get_git_branch() or 'dev'
+    return '{}@{}'.format(git_branch, git_short_hash)
+
+
+def get_device_model():
+    device_model = device_helper.parse_cpu_info().get('model')
+
+    if device_model is None and machine() == 'x86_64':
+        device_model = 'Generic x86_64 Device'
+
+    return device_model
+
+
+def get_uptime():
+    system_uptime = timedelta(seconds=diagnostics.get_uptime())
+    return {
+        'days': system_uptime.days,
+        'hours': round(system_uptime.seconds / 3600, 2),
+    }
+
+
+def get_memory():
+    virtual_memory = psutil.virtual_memory()
+    return {
+        'total': virtual_memory.total >> 20,
+        'used': virtual_memory.used >> 20,
+        'free': virtual_memory.free >> 20,
+        'shared': virtual_memory.shared >> 20,
+        'buff': virtual_memory.buffers >> 20,
+        'available': virtual_memory.available >> 20,
+    }
+
+
+def get_ip_addresses():
+    ip_addresses = []
+    node_ip = get_node_ip()
+
+    if node_ip == 'Unable to retrieve IP.':
+        return []
+
+    for ip_address in node_ip.split():
+        ip_address_object = ipaddress.ip_address(ip_address)
+
+        if isinstance(ip_address_object, ipaddress.IPv6Address):
+            ip_addresses.append(f'http://[{ip_address}]')
+        else:
+            ip_addresses.append(f'http://{ip_address}')
+
+    return ip_addresses
+
+
+def get_cpu_temp():
+    try:
+        temps = psutil.sensors_temperatures()
+        if 'cpu_thermal' in temps and temps['cpu_thermal']:
+            return round(temps['cpu_thermal'][0].current, 1)
+    except Exception:
+        pass
+    try:
+        with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
+            return round(int(f.read().strip()) / 1000, 1)
+    except Exception:
+        return None
+
+
+def _get_cpu_times():
+    """
+    Returns the (busy, total) CPU time, counted the way `psutil.cpu_percent`
+    does.
+    """
+    times = psutil.cpu_times()
+    total = sum(times)
+    # Guest time is counted in the user time already.
+    total -= getattr(times, 'guest', 0) + getattr(times, 'guest_nice', 0)
+    busy = total - times.idle - getattr(times, 'iowait', 0)
+    return busy, total
+
+
+def get_cpu_usage(r):
+    """
+    Returns the CPU usage since the previous sample. The CPU times of each
+    sample are kept in Redis, as the samples are taken by whichever worker
+    process runs the task, and `psutil.cpu_percent` only compares with the
+    previous call in the same process.
+    """
+    busy, total = _get_cpu_times()
+    previous = r.getset(CPU_TIMES_KEY, json.dumps([busy, total]))
+    try:
+        previous_busy, previous_total = json.loads(previous)
+    except (TypeError, ValueError):
+        previous_busy = previous_total = None
+
+    if previous_total is None or total <= previous_total:
+        # Nothing to compare with, or the counters were reset.
+        return psutil.cpu_percent(interval=CPU_USAGE_INTERVAL)
+    usage = (busy - previous_busy) / (total - previous_total) * 100
+    return round(max(0.0, min(100.0, usage)), 1)
+
+
+def get_cpu_freq():
+    try:
+        freq = psutil.cpu_freq()
+        if freq:
+            return {
+                'current': int(freq.current),
+                'max': int(freq.max) if freq.max else int(freq.current),
+            }
+    except Exception:
+        pass
+    return None
+
+
+def get_throttle_state():
+    try:
+        result = subprocess.run(
+            ['vcgencmd', 'get_throttled'],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        if result.returncode == 0:
+            # Output: throttled=0x50000
+            val = result.stdout.strip().split('=')[-1]
+            return int(val, 16)
+    except Exception:
+        pass
+    return None
+
+
+def get_disk_usage():
+    try:
+        usage = psutil.disk_usage('/')
+        return {
+            'total_gb': round(usage.total / (1024**3), 1),
+            'used_gb': round(usage.used / (1024**3), 1),
+            'free_gb': round(usage.free / (1024**3), 1),
+            'percent': usage.percent,
+        }
+    except Exception:
+        return None
+
+
+COLLECTORS = {
+    'loadavg': get_loadavg,
+    'free_space': get_free_space,
+    'up_to_date': is_up_to_date,
+    'anthias_version': get_anthias_version,
+    'device_model': get_device_model,
+    'uptime': get_uptime,
+    'memory': get_memory,
+    'ip_addresses': get_ip_addresses,
+    'mac_address': get_node_mac_address,
+    'cpu_temp': get_cpu_temp,
+    'cpu_usage': get_cpu_usage,
+    'cpu_freq': get_cpu_freq,
+    'throttle_state': get_throttle_state,
+    'disk_usage': get_disk_usage,
+}
+# These keep their state between samples in Redis.
+REDIS_COLLECTORS = {'cpu_usage'}
+# These can block for a minute or more, e.g. while the network is down, so
+# they're sampled apart from the rest.
+SLOW_COLLECTORS = {'ip_addresses', 'mac_address', 'up_to_date'}
+
+
+def _read_samples(r, names: Iterable[str]) -> dict:
+    names = list(names)
+    samples = {}
+    for name, raw in zip(names, r.hmget(REDIS_KEY, names)):
+        try:
+            samples[name] = json.loads(raw)
+        except (TypeError, ValueError):
+            continue
+    return samples
+
+
+def collect(
+    r,
+    now: Optional[float] = None,
+    force: bool = False,
+    names: Optional[Iterable[str]] = None,
+) -> dict:
+    """
+    Samples the values that are due, out of `names` (all of them by
+    default), and stores them in the snapshot. Returns the values that
+    were sampled.
+    """
+    now = now or time.time()
+    names = list(COLLECTORS if names is None else names)
+    samples = _read_samples(r, names)
+
+    collected = {}
+    for name in names:
+        collector = COLLECTORS[name]
+        # Runs are COLLECT_INTERVAL apart give or take some jitter, which
+        # shouldn't make a value wait for the run after.
+        sample = samples.get(name)
+        due_at = INTERVALS[name] - COLLECT_INTERVAL / 2
+        if not force and sample and now - sample['time'] < due_at:
+            continue
+
+        try:
+            value = collector(r) if name in REDIS_COLLECTORS else collector()
+        except Exception as e:
+            # Keep serving the previous value rather than none at all.
+            logging.warning('Failed to get %s: %s', name, e)
+            continue
+
+        collected[name] = value
+
+    if collected:
+        r.hset(
+            REDIS_KEY,
+            mapping={
+                name: json.dumps({'value': value, 'time': now})
+                for name, value in collected.items()
+            },
+        )
+
+    return collected
+
+
+def get_snapshot(r, names: Iterable[str], now: Optional[float] = None):
+    """
+    Returns the (values, ages) of the given names, the ages being in
+    seconds. Values that haven't been sampled yet are None, with a None
+    age.
+    """
+    now = now or time.time()
+    samples = _read_samples(r, names)
+
+    values = {}
+    ages = {}
+    for name in names:
+        sample = samples.get(name)
+        values[name] = sample['value'] if sample else None
+        ages[name] = round(max(now - sample['time'], 0), 1) if sample else None
+
+    return values, ages
+
+
+def get_history() -> TimeSeries:
+    return TimeSeries(
+        path.join(getenv('HOME'), '.screenly', 'health.rrd'),
+        HISTORY_METRICS,
+        HISTORY_STEP,
+        HISTORY_SLOTS,
+    )
+
+
+def record_history(values: dict, now: Optional[float] = None):
+    """
+    Adds the health metrics among freshly sampled `values` to the history.
+    """
+    memory = values.get('memory') or {}
+    throttle_state = values.get('throttle_state')
+    with get_history() as history:
+        history.add(
+            {
+                'cpu_temp': values.get('cpu_temp'),
+                'cpu_usage': values.get('cpu_usage'),
+                **{
+                    name: None
+                    if throttle_state is None
+                    else int(bool(throttle_state & bit))
+                    for name, bit in THROTTLE_FLAGS.items()
+                },
+                'memory_used': memory.get('used'),
+                'memory_available': memory.get('available'),
+            },
+            now or time.time(),
+        )
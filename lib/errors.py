@@ -7,3 +7,27 @@ class SigalrmError(Exception):
 
 class ZmqCollectorTimeoutError(Exception):
     pass
+
+
+class FramebufferUnavailableError(Exception):
+    pass
+
+
+class UploadSessionError(Exception):
+    pass
+
+
+class UploadSessionNotFoundError(UploadSessionError):
+    pass
+
+
+class BackupError(Exception):
+    pass
+
+
+class MediaProbeError(Exception):
+    pass
+
+
+class IngestError(Exception):
+    pass
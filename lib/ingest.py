@@ -0,0 +1,193 @@
+"""
+Ingestion of new assets.
+
+Creating an asset only checks the request and stores the asset with
+`is_processing` set. The slow work is left to the `ingest_asset` task,
+which runs the asset through these stages:
+
+    validate   check that the URL responds, or get the YouTube metadata
+    transcode  download YouTube videos as H.264
+    hash       move local files into the asset store, and point the
+               asset at them
+    probe      store the media info of videos, and take their duration
+    thumbnail  render the thumbnail of images and videos
+    publish    save the asset and clear `is_processing`
+
+The asset keeps `is_processing` until the last stage, so that the viewer
+never plays a file which is still being moved around.
+"""
+
+import logging
+from os import path
+
+from django.db import transaction
+
+from anthias_app.models import Asset
+from lib import asset_store, media_info, thumbnails, uploads
+from lib.errors import IngestError, MediaProbeError
+from lib.utils import (
+    fetch_youtube_video,
+    get_youtube_info,
+    get_youtube_location,
+    url_fails,
+)
+from settings import settings
+
+STAGES = ['validate', 'transcode', 'hash', 'probe', 'thumbnail', 'publish']
+YOUTUBE_MIMETYPE = 'youtube_asset'
+YOUTUBE_TIMEOUT = 3600  # seconds
+INGEST_TIMEOUT = YOUTUBE_TIMEOUT + 600  # seconds
+
+
+class Ingest:
+    def __init__(self, asset, ext=''):
+        self.asset = asset
+        self.ext = ext
+
+    def run(self, progress=None):
+        """
+        Runs the stages in order. `progress` is called with the fraction
+        done and the name of the stage about to run.
+        """
+        for index, stage in enumerate(STAGES):
+            if progress is not None:
+                progress(index / len(STAGES), stage)
+            getattr(self, stage)()
+
+        if progress is not None:
+            progress(1, 'done')
+
+    def validate(self):
+        asset = self.asset
+
+        if asset.mimetype == YOUTUBE_MIMETYPE:
+            try:
+                info = get_youtube_info(asset.uri)
+            except Exception as e:
+                raise IngestError(
+                    f'Could not get the YouTube video: {e}'
+                ) from e
+            asset.name = info.get('title') or asset.name
+            asset.duration = info.get('duration') or asset.duration
+        elif asset.uri.startswith('/'):
+            if not path.isfile(asset.uri):
+                raise IngestError('Invalid file path. Failed to add asset.')
+        elif not asset.skip_asset_check and url_fails(asset.uri):
+            raise IngestError('Could not retrieve file. Check the asset URL.')
+
+    def transcode(self):
+        asset = self.asset
+        if asset.mimetype != YOUTUBE_MIMETYPE:
+            return
+
+        location = get_youtube_location(asset.asset_id)
+        fetch_youtube_video(asset.uri, location, timeout=YOUTUBE_TIMEOUT)
+        if not path.isfile(location):
+            raise IngestError('Could not download the YouTube video.')
+
+        asset.uri = location
+        asset.mimetype = 'video'
+        self.ext = '.mp4'
+
+    def hash(self):
+        asset = self.asset
+        if not asset.uri.startswith('/'):
+            return
+
+        # The file may already belong to another asset, then it's shared.
+        md5 = (
+            Asset.objects.filter(uri=asset.uri)
+            .exclude(asset_id=asset.asset_id)
+            .exclude(md5=None)
+            .values_list('md5', flat=True)
+            .first()
+        )
+        stored_path = asset.uri
+        if md5 is None:
+            md5 = uploads.read_md5(asset.uri) or asset_store.file_md5(
+                asset.uri
+            )
+            stored_path = asset_store.blob_path(
+                settings['assetdir'], md5, self.ext
+            )
+
+        # The asset points at the stored file before it's moved there, in
+        # one transaction. The update takes the write lock first, so the
+        # last asset using that file can't be deleted along with it in the
+        # meantime: the delete, which removes the file in its own
+        # transaction, either sees this asset or is done before the move.
+        with transaction.atomic():
+            Asset.objects.filter(asset_id=asset.asset_id).update(
+                uri=stored_path, md5=md5
+            )
+            if stored_path != asset.uri:
+                asset_store.add_file(
+                    asset.uri, settings['assetdir'], self.ext, md5
+                )
+            elif not path.isfile(stored_path):
+                # The assets it was shared with are gone, and the file
+                # with them.
+                raise IngestError('Invalid file path. Failed to add asset.')
+
+        asset.uri, asset.md5 = stored_path, md5
+
+    def probe(self):
+        asset = self.asset
+        if 'video' not in asset.mimetype:
+            return
+
+        try:
+            duration = media_info.get_media_info(asset.uri).duration
+        except MediaProbeError as e:
+            raise IngestError('Bad video format') from e
+
+        asset.duration = duration or asset.duration
+        if not asset.duration:
+            raise IngestError('Bad video format')
+
+    def thumbnail(self):
+        asset = self.asset
+        if not ('image' in asset.mimetype or 'video' in asset.mimetype):
+            return
+        if not path.isfile(asset.uri) or path.isfile(
+            thumbnails.thumbnail_path(asset.uri)
+        ):
+            return
+
+        # Assets without thumbnails get one later, from the thumbnail
+        # endpoint, so this is no reason to reject the asset.
+        try:
+            thumbnails.generate_thumbnail(asset.uri, asset.mimetype)
+        except Exception as e:
+            logging.warning(
+                'Failed to generate thumbnail for %s: %s', asset.uri, e
+            )
+
+    def publish(self):
+        asset = self.asset
+        asset.is_processing = False
+
+        # Updated rather than saved, as saving an asset that was deleted
+        # in the meantime would bring it back.
+        updated = Asset.objects.filter(asset_id=asset.asset_id).update(
+            name=asset.name,
+            uri=asset.uri,
+            md5=asset.md5,
+            duration=asset.duration,
+            mimetype=asset.mimetype,
+            is_processing=False,
+        )
+        if not updated:
+            raise IngestError('The asset was deleted.')
+
+
+def discard(asset):
+    """
+    Deletes an asset which failed to go through the pipeline, along with
+    its file unless another asset uses it.
+    """
+    # Imported here, as the API helpers depend on the Celery tasks.
+    from api.helpers import remove_asset_files
+
+    Asset.objects.filter(asset_id=asset.asset_id).delete()
+    remove_asset_files(asset.uri)
@@ -0,0 +1,109 @@
+"""
+Background jobs, for the work too slow to do in a request.
+
+A view creates the job and hands its id to a Celery task, and the
+client polls the job until it's done. Each job is a Redis hash, so
+that the web server and the Celery worker both see it, and it expires
+a day after its last update.
+"""
+
+import json
+import time
+import uuid
+from typing import Optional
+
+KEY_PREFIX = 'job:'
+TTL = 24 * 3600  # seconds
+# Progress is only written when it has moved by at least this much, so
+# that reporting it on every chunk of a file doesn't flood Redis.
+PROGRESS_STEP = 0.01
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class Job:
+    def __init__(self, r, job_id: str):
+        self.r = r
+        self.id = job_id
+        self._is_finished = False
+        self._progress = None
+
+    @property
+    def key(self) -> str:
+        return f'{KEY_PREFIX}{self.id}'
+
+    @classmethod
+    def create(cls, r, kind: str) -> 'Job':
+        job = cls(r, uuid.uuid4().hex)
+        now = time.time()
+        job._update(kind=kind, state=PENDING, progress=0, created_at=now)
+        return job
+
+    @classmethod
+    def get(cls, r, job_id: str) -> Optional[dict]:
+        """
+        Returns the job as a dict, or None if there's no such job.
+        """
+        fields = r.hgetall(f'{KEY_PREFIX}{job_id}')
+        if not fields:
+            return None
+        return {'id': job_id, **{k: json.loads(v) for k, v in fields.items()}}
+
+    def _update(self, **fields):
+        fields['updated_at'] = time.time()
+        pipeline = self.r.pipeline()
+        pipeline.hset(
+            self.key,
+            mapping={k: json.dumps(v) for k, v in fields.items()},
+        )
+        pipeline.expire(self.key, TTL)
+        pipeline.execute()
+
+    def start(self):
+        self._update(state=RUNNING)
+
+    def set_progress(self, progress: float, message: Optional[str] = None):
+        """
+        Reports how much of the job is done, from 0 to 1.
+        """
+        progress = round(min(max(progress, 0), 1), 3)
+        if (
+            message is None
+            and self._progress is not None
+            and progress - self._progress < PROGRESS_STEP
+        ):
+            return
+
+        self._progress = progress
+        fields = {'progress': progress}
+        if message is not None:
+            fields['message'] = message
+        self._update(**fields)
+
+    def track(self, done: int, total: int):
+        """
+        Reports progress as `done` out of `total`, for use as a progress
+        callback.
+        """
+        self.set_progress(done / total if total else 1)
+
+    def succeed(self, result=None):
+        self._update(state=SUCCEEDED, progress=1, result=result)
+        self._is_finished = True
+
+    def fail(self, error: str):
+        self._update(state=FAILED, error=error)
+        self._is_finished = True
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.fail(str(exc) or exc_type.__name__)
+        elif not self._is_finished:
+            self.succeed()
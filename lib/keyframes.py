@@ -0,0 +1,163 @@
+"""
+Keyframe index for video assets.
+
+Each video asset gets a sprite file next to it (`<video>.keyframes`) with
+small JPEG frames taken every `interval` seconds, so that a screenshot of a
+playing video is a seek-and-slice into that file instead of an ffmpeg run.
+
+File layout (little-endian):
+
+    header   magic (4s) | version (H) | interval (H) | width (H) | count (I)
+    entries  count * (offset (Q) | length (I))
+    frames   the JPEG frames, back to back
+"""
+
+import logging
+import shutil
+import struct
+import subprocess
+import tempfile
+from os import listdir, path, remove, replace
+from typing import Iterable, Optional
+
+MAGIC = b'AKFI'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHI')
+ENTRY = struct.Struct('<QI')
+
+KEYFRAME_INTERVAL = 5  # seconds
+KEYFRAME_WIDTH = 640
+KEYFRAME_SUFFIX = '.keyframes'
+BUILD_TIMEOUT = 3600  # seconds
+
+
+def index_path(video_path: str) -> str:
+    return f'{video_path}{KEYFRAME_SUFFIX}'
+
+
+def write_index(
+    output_path: str,
+    frames: Iterable,
+    interval: int = KEYFRAME_INTERVAL,
+    width: int = KEYFRAME_WIDTH,
+) -> int:
+    """
+    Packs JPEG frames, given as bytes or as paths to JPEG files, into an
+    index file. Frames are read one at a time, and the file is renamed into
+    place once complete, so readers never see a partial index. Returns the
+    number of frames written.
+    """
+    frames = list(frames)
+    tmp_path = f'{output_path}.tmp'
+
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, interval, width, len(frames)))
+        f.seek(HEADER.size + ENTRY.size * len(frames))
+
+        entries = []
+        for frame in frames:
+            if not isinstance(frame, bytes):
+                with open(frame, 'rb') as frame_file:
+                    frame = frame_file.read()
+            entries.append(ENTRY.pack(f.tell(), len(frame)))
+            f.write(frame)
+
+        f.seek(HEADER.size)
+        f.write(b''.join(entries))
+
+    replace(tmp_path, output_path)
+    return len(frames)
+
+
+def read_header(f) -> Optional[tuple]:
+    data = f.read(HEADER.size)
+    if len(data) < HEADER.size:
+        return None
+
+    magic, version, interval, width, count = HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION or not interval or not count:
+        return None
+
+    return interval, width, count
+
+
+def read_frame(video_path: str, seconds: float) -> Optional[tuple]:
+    """
+    Returns (jpeg_bytes, frame_width) for the frame closest to `seconds`
+    into the video, or None if the video has no usable index.
+    """
+    try:
+        with open(index_path(video_path), 'rb') as f:
+            header = read_header(f)
+            if header is None:
+                return None
+            interval, width, count = header
+
+            index = min(max(0, int(seconds // interval)), count - 1)
+            f.seek(HEADER.size + ENTRY.size * index)
+            offset, length = ENTRY.unpack(f.read(ENTRY.size))
+
+            f.seek(offset)
+            frame = f.read(length)
+    except (OSError, struct.error):
+        return None
+
+    if len(frame) != length:
+        return None
+
+    return frame, width
+
+
+def build_index(
+    video_path: str,
+    interval: int = KEYFRAME_INTERVAL,
+    width: int = KEYFRAME_WIDTH,
+) -> int:
+    """
+    Decodes the video once with ffmpeg, grabbing a frame every `interval`
+    seconds, and packs the frames into the index file next to the video.
+    Returns the number of frames in the index.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix='keyframes-')
+
+    try:
+        subprocess.run(
+            [
+                'ffmpeg',
+                '-nostdin',
+                '-loglevel',
+                'error',
+                '-i',
+                video_path,
+                '-an',
+                '-vf',
+                f'fps=1/{interval},scale={width}:-2',
+                '-q:v',
+                '5',
+                path.join(tmp_dir, '%06d.jpg'),
+            ],
+            check=True,
+            capture_output=True,
+            timeout=BUILD_TIMEOUT,
+        )
+
+        frame_files = sorted(listdir(tmp_dir))
+        if not frame_files:
+            logging.warning('No frames extracted from %s', video_path)
+            return 0
+
+        return write_index(
+            index_path(video_path),
+            [path.join(tmp_dir, frame_file) for frame_file in frame_files],
+            interval,
+            width,
+        )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def remove_index(video_path: str):
+    try:
+        remove(index_path(video_path))
+    except OSError:
+        pass
@@ -0,0 +1,128 @@
+"""
+Media probing with ffprobe's JSON output.
+
+The results are kept in the `media_info` table, keyed by the URI of the
+media, so a file is probed once however many assets share it.
+"""
+
+import json
+import subprocess
+from fractions import Fraction
+from typing import Optional
+
+from anthias_app.models import MediaInfo
+from lib.errors import MediaProbeError
+
+PROBE_TIMEOUT = 30  # seconds
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_frame_rate(value) -> Optional[float]:
+    # Frame rates are fractions, like '30000/1001', and '0/0' when unknown.
+    try:
+        return float(Fraction(value))
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def _find_stream(streams: list, codec_type: str) -> Optional[dict]:
+    for stream in streams:
+        # Cover art of audio files shows up as a one frame video stream.
+        if stream.get('disposition', {}).get('attached_pic'):
+            continue
+        if stream.get('codec_type') == codec_type:
+            return stream
+    return None
+
+
+def parse(output: dict) -> dict:
+    """
+    Picks the fields of `MediaInfo` out of the output of
+    `ffprobe -show_format -show_streams`.
+    """
+    media_format = output.get('format', {})
+    streams = output.get('streams', [])
+    video = _find_stream(streams, 'video') or {}
+    audio = _find_stream(streams, 'audio') or {}
+
+    return {
+        'format_name': media_format.get('format_name'),
+        'duration': _to_float(media_format.get('duration'))
+        or _to_float(video.get('duration'))
+        or _to_float(audio.get('duration')),
+        'bit_rate': _to_int(media_format.get('bit_rate'))
+        or _to_int(video.get('bit_rate')),
+        'video_codec': video.get('codec_name'),
+        'width': _to_int(video.get('width')),
+        'height': _to_int(video.get('height')),
+        'frame_rate': _to_frame_rate(video.get('avg_frame_rate'))
+        or _to_frame_rate(video.get('r_frame_rate')),
+        'audio_codec': audio.get('codec_name'),
+    }
+
+
+def probe(uri: str) -> dict:
+    """
+    Runs ffprobe on a file or a URL, and returns the fields of `MediaInfo`.
+    """
+    try:
+        result = subprocess.run(
+            [
+                'ffprobe',
+                '-v',
+                'error',
+                '-print_format',
+                'json',
+                '-show_format',
+                '-show_streams',
+                uri,
+            ],
+            capture_output=True,
+            timeout=PROBE_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as err:
+        raise MediaProbeError(f'Could not probe {uri}: {err}') from err
+
+    if result.returncode != 0:
+        raise MediaProbeError(
+            f'Could not probe {uri}: '
+            f'{result.stderr.decode(errors="replace").strip()}'
+        )
+
+    try:
+        return parse(json.loads(result.stdout))
+    except ValueError as err:
+        raise MediaProbeError(f'Could not probe {uri}: {err}') from err
+
+
+def get_media_info(uri: str) -> MediaInfo:
+    """
+    Returns the stored media info of `uri`, probing it the first time.
+    """
+    media_info = get_stored_media_info(uri)
+    if media_info is None:
+        media_info, _ = MediaInfo.objects.update_or_create(
+            uri=uri, defaults=probe(uri)
+        )
+    return media_info
+
+
+def get_stored_media_info(uri: str) -> Optional[MediaInfo]:
+    return MediaInfo.objects.filter(uri=uri).first()
+
+
+def remove_media_info(uri: str):
+    MediaInfo.objects.filter(uri=uri).delete()
@@ -0,0 +1,197 @@
+"""
+Performance metrics, exposed in the OpenMetrics text format.
+
+Request metrics are recorded in memory by the web server process, which
+is cheap enough to do on every request: a bisect and a few additions
+under a lock. Celery tasks run in other processes, so their durations
+are accumulated in Redis instead.
+"""
+
+import bisect
+import json
+import math
+import threading
+from typing import Iterable, List, Optional, Sequence
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+REDIS_KEY_PREFIX = 'metrics:'
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    20,
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+TASK_DURATION_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+
+def _escape(value) -> str:
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket, the last one being +Inf, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(labels)
+            if values is None:
+                values = self._values[labels] = [
+                    [0] * (len(self.buckets) + 1),
+                    0,
+                ]
+            values[0][index] += 1
+            values[1] += value
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+
+    def _items(self):
+        with self._lock:
+            return [
+                (labels, list(counts), total)
+                for labels, (counts, total) in self._values.items()
+            ]
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# TYPE {self.name} histogram',
+            f'# HELP {self.name} {self.documentation}',
+        ]
+        for labels, counts, total in sorted(self._items()):
+            cumulative = 0
+            bounds = list(self.buckets) + [math.inf]
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    self.labelnames + ('le',),
+                    labels + (_format_value(float(bound)),),
+                )
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+
+            series_labels = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_count{series_labels} {cumulative}')
+            lines.append(
+                f'{self.name}_sum{series_labels} {_format_value(total)}'
+            )
+        return lines
+
+
+class RedisHistogram(Histogram):
+    """
+    A histogram shared by processes, kept in a Redis hash. Observations go
+    straight to Redis, and `load` reads them back before rendering.
+    """
+
+    @property
+    def redis_key(self) -> str:
+        return f'{REDIS_KEY_PREFIX}{self.name}'
+
+    def observe_to(self, r, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        field = json.dumps(labels)
+        pipeline = r.pipeline(transaction=False)
+        pipeline.hincrby(self.redis_key, f'{field}|{index}', 1)
+        pipeline.hincrbyfloat(self.redis_key, f'{field}|sum', value)
+        pipeline.execute()
+
+    def load(self, r):
+        values = {}
+        for field, value in (r.hgetall(self.redis_key) or {}).items():
+            labels, _, index = field.rpartition('|')
+            try:
+                labels = tuple(json.loads(labels))
+            except ValueError:
+                continue
+
+            counts = values.setdefault(
+                labels, [[0] * (len(self.buckets) + 1), 0]
+            )[0]
+            if index == 'sum':
+                values[labels][1] = float(value)
+            elif index.isdigit() and int(index) < len(counts):
+                counts[int(index)] = int(value)
+
+        with self._lock:
+            self._values = values
+
+
+def render_gauge(
+    name: str, documentation: str, value: Optional[float]
+) -> List[str]:
+    lines = [
+        f'# TYPE {name} gauge',
+        f'# HELP {name} {documentation}',
+    ]
+    if value is not None:
+        lines.append(f'{name} {_format_value(value)}')
+    return lines
+
+
+def render(families: Iterable[List[str]]) -> str:
+    lines = [line for family in families for line in family]
+    return '\n'.join(lines + ['# EOF']) + '\n'
+
+
+REQUEST_DURATION = Histogram(
+    'anthias_http_request_duration_seconds',
+    'Time spent handling API requests.',
+    ['view', 'method', 'status'],
+    LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'anthias_http_request_db_queries',
+    'Number of database queries made by API requests.',
+    ['view', 'method'],
+    QUERY_COUNT_BUCKETS,
+)
+TASK_DURATION = RedisHistogram(
+    'anthias_celery_task_duration_seconds',
+    'Time spent running Celery tasks.',
+    ['task', 'state'],
+    TASK_DURATION_BUCKETS,
+)
@@ -0,0 +1,73 @@
+"""
+Messages to the web interface from outside the server.
+
+The websocket server only listens to the ZeroMQ publisher of the server,
+so other processes, like the Celery worker, publish their messages on a
+Redis channel, and a thread of the server relays them with
+`ZmqPublisher.send_to_ws_server`.
+"""
+
+import json
+import logging
+import threading
+import time
+
+import redis
+
+CHANNEL = 'ws_server'
+RETRY_INTERVAL = 5  # seconds
+
+_relay_thread = None
+_relay_lock = threading.Lock()
+
+
+def send_to_ws_server(r, message):
+    """
+    Sends a message to the web interface. Anything but a string is sent as
+    JSON, without spaces, as the websocket server splits the topic off at
+    the first one.
+    """
+    if not isinstance(message, str):
+        message = json.dumps(message, separators=(',', ':'))
+    r.publish(CHANNEL, message)
+
+
+def relay(r, publisher):
+    """
+    Forwards the messages of the channel to the publisher, until the Redis
+    connection fails.
+    """
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(CHANNEL)
+    try:
+        for message in pubsub.listen():
+            publisher.send_to_ws_server(message['data'])
+    finally:
+        pubsub.close()
+
+
+def _run_relay():
+    # Imported here, as these need Django to be set up.
+    from lib.utils import connect_to_redis
+    from settings import ZmqPublisher
+
+    while True:
+        try:
+            relay(connect_to_redis(), ZmqPublisher.get_instance())
+        except redis.RedisError as e:
+            logging.warning('Websocket relay lost Redis: %s', e)
+        time.sleep(RETRY_INTERVAL)
+
+
+def start_relay():
+    """
+    Starts relaying the messages in a background thread, once per process.
+    """
+    global _relay_thread
+
+    with _relay_lock:
+        if _relay_thread is None:
+            _relay_thread = threading.Thread(
+                target=_run_relay, name='ws-relay', daemon=True
+            )
+            _relay_thread.start()
@@ -0,0 +1,305 @@
+import io
+import logging
+import mmap
+import queue
+import threading
+import time
+from collections import OrderedDict
+from os import path
+from typing import Any, Callable, Hashable, Optional
+
+from lib.errors import FramebufferUnavailableError
+
+FB_DEVICE = '/dev/fb0'
+FB_SYSFS_DIR = '/sys/class/graphics/fb0'
+FB_GEOMETRY_TTL = 60  # seconds
+
+# Pillow raw decoders that unpack straight into RGB, so the frame is
+# decoded once instead of going through an intermediate RGBA image.
+RAW_MODES = {
+    4: 'BGRX',
+    3: 'BGR',
+    2: 'BGR;16',
+}
+
+_geometry = None
+_geometry_time = 0
+_geometry_lock = threading.Lock()
+
+
+def _read_sysfs(name: str) -> str:
+    with open(path.join(FB_SYSFS_DIR, name)) as f:
+        return f.read().strip()
+
+
+def get_framebuffer_geometry(force: bool = False) -> tuple:
+    """
+    Returns (width, height, bytes_per_pixel, line_length) of the
+    framebuffer. The values are read from sysfs once and cached, as they
+    only change when the display mode changes.
+    """
+    global _geometry, _geometry_time
+
+    with _geometry_lock:
+        now = time.monotonic()
+        if (
+            not force
+            and _geometry is not None
+            and now - _geometry_time < FB_GEOMETRY_TTL
+        ):
+            return _geometry
+
+        width, height = [
+            int(x) for x in _read_sysfs('virtual_size').split(',')
+        ]
+        bytes_per_pixel = int(_read_sysfs('bits_per_pixel')) // 8
+
+        try:
+            line_length = int(_read_sysfs('stride'))
+        except (OSError, ValueError):
+            line_length = 0
+        if line_length < width * bytes_per_pixel:
+            line_length = width * bytes_per_pixel
+
+        _geometry = (width, height, bytes_per_pixel, line_length)
+        _geometry_time = now
+        return _geometry
+
+
+def _scale(img, width: Optional[int]):
+    from PIL import Image
+
+    if not width or width >= img.width:
+        return img
+
+    height = max(1, int(img.height * width / img.width))
+
+    # A box reduction by an integer factor is much cheaper than a
+    # resampling filter over the full-size frame, so shrink first and only
+    # let the filter do the remaining fractional step.
+    factor = img.width // width
+    if factor >= 2:
+        img = img.reduce(factor)
+
+    return img.resize((width, height), Image.BILINEAR)
+
+
+def resize_jpeg(jpeg_bytes: bytes, width: int, quality: int = 70) -> bytes:
+    """
+    Scales a JPEG down to `width` pixels wide. The JPEG decoder is asked to
+    decode at a reduced scale up front, so most of the shrinking is done
+    while decoding rather than on the full-size image.
+    """
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(jpeg_bytes))
+    height = max(1, int(img.height * width / img.width))
+    img.draft('RGB', (width, height))
+    img = _scale(img.convert('RGB'), width)
+
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=quality)
+    return output.getvalue()
+
+
+def capture_framebuffer(width: Optional[int] = None, quality: int = 70):
+    """
+    Captures the framebuffer as JPEG bytes, optionally scaled down to
+    `width` pixels wide.
+
+    The framebuffer is memory-mapped instead of being read into a bytes
+    object, and decoded directly into an RGB image.
+    """
+    from PIL import Image
+
+    if not path.exists(FB_DEVICE):
+        raise FramebufferUnavailableError(
+            f'Framebuffer {FB_DEVICE} not available'
+        )
+
+    fb_w, fb_h, bytes_per_pixel, line_length = get_framebuffer_geometry()
+    rawmode = RAW_MODES.get(bytes_per_pixel)
+    if rawmode is None:
+        raise ValueError(f'Unsupported bits_per_pixel: {bytes_per_pixel * 8}')
+
+    frame_size = line_length * fb_h
+
+    with open(FB_DEVICE, 'rb') as fb:
+        try:
+            buf = mmap.mmap(fb.fileno(), frame_size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Some framebuffer drivers don't support mmap.
+            buf = fb.read(frame_size)
+
+    try:
+        img = Image.frombuffer(
+            'RGB', (fb_w, fb_h), buf, 'raw', rawmode, line_length, 1
+        )
+        img.load()
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+
+    img = _scale(img, width)
+
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=quality)
+    return output.getvalue()
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlightCache:
+    """
+    A small LRU cache with a time-to-live, where concurrent misses for the
+    same key are coalesced: the first caller computes the value and
+    everybody else waits for that result instead of computing it again.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 8):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            return self._get_fresh(key)
+
+    def _get_fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        created, value = entry
+        if time.monotonic() - created >= self.ttl:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]):
+        with self._lock:
+            value = self._get_fresh(key)
+            if value is not None:
+                return value
+
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if call.value is not None:
+                    self._store(key, call.value)
+                del self._calls[key]
+            call.event.set()
+
+        return call.value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FrameBroadcaster:
+    """
+    Runs a single capture loop and fans its frames out to any number of
+    subscribers. Each subscriber gets a small bounded queue, and when a
+    slow client falls behind its oldest frame is dropped, so it never holds
+    up the producer or the other clients. The producer thread only runs
+    while somebody is subscribed.
+    """
+
+    def __init__(
+        self,
+        capture: Callable[[], Optional[bytes]],
+        interval: float,
+        buffer_size: int = 2,
+    ):
+        self.capture = capture
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self) -> queue.Queue:
+        frames = queue.Queue(maxsize=self.buffer_size)
+
+        with self._lock:
+            self._subscribers.add(frames)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+        return frames
+
+    def unsubscribe(self, frames: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(frames)
+
+    @staticmethod
+    def _offer(frames: queue.Queue, frame: bytes):
+        try:
+            frames.put_nowait(frame)
+        except queue.Full:
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                frames.put_nowait(frame)
+            except queue.Full:
+                pass
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+                subscribers = list(self._subscribers)
+
+            started = time.monotonic()
+            try:
+                frame = self.capture()
+            except Exception as e:
+                logging.warning('Frame capture failed: %s', e)
+                frame = None
+
+            if frame is not None:
+                for frames in subscribers:
+                    self._offer(frames, frame)
+
+            time.sleep(max(0, self.interval - (time.monotonic() - started)))
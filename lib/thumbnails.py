@@ -0,0 +1,104 @@
+"""
+Thumbnails for image and video assets.
+
+Thumbnails are small JPEGs stored next to the asset file
+(`<asset>.thumb.jpg`): a downscaled copy for images, and a poster frame
+for videos.
+"""
+
+import subprocess
+from os import path, remove, replace
+from typing import Optional
+
+THUMBNAIL_SUFFIX = '.thumb.jpg'
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_QUALITY = 75
+POSTER_SEEK = 1  # seconds
+POSTER_TIMEOUT = 60  # seconds
+
+
+def thumbnail_path(asset_path: str) -> str:
+    return f'{asset_path}{THUMBNAIL_SUFFIX}'
+
+
+def make_image_thumbnail(image_path: str, output_path: str):
+    from PIL import Image, ImageOps
+
+    with Image.open(image_path) as img:
+        # Let the JPEG decoder skip most of the pixels up front.
+        img.draft('RGB', THUMBNAIL_SIZE)
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(THUMBNAIL_SIZE)
+        img.convert('RGB').save(
+            output_path, format='JPEG', quality=THUMBNAIL_QUALITY
+        )
+
+
+def make_video_poster(video_path: str, output_path: str):
+    # Videos shorter than POSTER_SEEK yield no frame, so retry with the
+    # very first one.
+    for seek in (POSTER_SEEK, 0):
+        subprocess.run(
+            [
+                'ffmpeg',
+                '-nostdin',
+                '-loglevel',
+                'error',
+                '-y',
+                '-ss',
+                str(seek),
+                '-i',
+                video_path,
+                '-frames:v',
+                '1',
+                '-vf',
+                (
+                    f'scale={THUMBNAIL_SIZE[0]}:{THUMBNAIL_SIZE[1]}'
+                    ':force_original_aspect_ratio=decrease'
+                ),
+                '-q:v',
+                '5',
+                '-f',
+                'image2',
+                output_path,
+            ],
+            check=True,
+            capture_output=True,
+            timeout=POSTER_TIMEOUT,
+        )
+        if path.getsize(output_path):
+            return
+
+
+def generate_thumbnail(asset_path: str, mimetype: str) -> Optional[str]:
+    """
+    Renders the thumbnail of an image or video asset and returns its path,
+    or None for other kinds of assets. The thumbnail is written to a
+    temporary file first, so it is never served half-written.
+    """
+    if 'image' in mimetype:
+        make_thumbnail = make_image_thumbnail
+    elif 'video' in mimetype:
+        make_thumbnail = make_video_poster
+    else:
+        return None
+
+    output_path = thumbnail_path(asset_path)
+    tmp_path = f'{output_path}.tmp'
+
+    try:
+        open(tmp_path, 'wb').close()
+        make_thumbnail(asset_path, tmp_path)
+        replace(tmp_path, output_path)
+    finally:
+        if path.exists(tmp_path):
+            remove(tmp_path)
+
+    return output_path
+
+
+def remove_thumbnail(asset_path: str):
+    try:
+        remove(thumbnail_path(asset_path))
+    except OSError:
+        pass
@@ -0,0 +1,204 @@
+"""
+Round-robin time series, in a fixed-size memory-mapped file.
+
+The file holds a header and one record per time step:
+
+    header  magic, version, step, slot count, metric count
+    names   the metric names, NUL-padded
+    records <timestamp:uint32> <value:float32> * metric count
+
+The record of a time t is at slot (t // step) % slots, so the file never
+grows: a new sample overwrites the one taken `step * slots` seconds
+earlier. The timestamp tells the current records from the overwritten
+ones, and missing values are stored as NaN.
+"""
+
+import math
+import mmap
+import struct
+from os import makedirs, path
+from typing import Dict, Iterable, List, Optional
+
+MAGIC = b'ATSR'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+NAME_SIZE = 32
+
+
+class TimeSeries:
+    def __init__(
+        self, file_path: str, metrics: List[str], step: int, slots: int
+    ):
+        self.file_path = file_path
+        self.metrics = list(metrics)
+        self.step = step
+        self.slots = slots
+        self.record = struct.Struct(f'<I{len(self.metrics)}f')
+        self.records_offset = HEADER.size + NAME_SIZE * len(self.metrics)
+        self._file = None
+        self._mmap = None
+
+    @property
+    def file_size(self) -> int:
+        return self.records_offset + self.record.size * self.slots
+
+    def _header(self) -> bytes:
+        header = HEADER.pack(
+            MAGIC, VERSION, self.step, self.slots, len(self.metrics)
+        )
+        names = b''.join(
+            name.encode().ljust(NAME_SIZE, b'\0') for name in self.metrics
+        )
+        return header + names
+
+    def open(self, writable: bool = False) -> bool:
+        """
+        Maps the file, creating it when writable if it is missing or was
+        made with other parameters. Returns False if there's no usable
+        file to read.
+        """
+        if self._mmap is not None:
+            return True
+
+        header = self._header()
+        try:
+            with open(self.file_path, 'rb') as f:
+                is_valid = f.read(len(header)) == header
+            is_valid = is_valid and path.getsize(self.file_path) == (
+                self.file_size
+            )
+        except OSError:
+            is_valid = False
+
+        if not is_valid:
+            if not writable:
+                return False
+            makedirs(path.dirname(self.file_path), exist_ok=True)
+            with open(self.file_path, 'wb') as f:
+                f.write(header)
+                f.truncate(self.file_size)
+
+        self._file = open(self.file_path, 'r+b' if writable else 'rb')
+        self._mmap = mmap.mmap(
+            self._file.fileno(),
+            0,
+            access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+        )
+        return True
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _offset(self, timestamp: int) -> int:
+        slot = (timestamp // self.step) % self.slots
+        return self.records_offset + slot * self.record.size
+
+    def add(self, values: Dict[str, Optional[float]], timestamp: float):
+        """
+        Stores the values taken at `timestamp`, a Unix time. Metrics that
+        are missing from `values`, or None, are stored as NaN.
+        """
+        self.open(writable=True)
+
+        timestamp = int(timestamp) // self.step * self.step
+        row = []
+        for name in self.metrics:
+            value = values.get(name)
+            row.append(math.nan if value is None else float(value))
+
+        self.record.pack_into(
+            self._mmap, self._offset(timestamp), timestamp, *row
+        )
+
+    def _iter_records(self, start: int, end: int):
+        """
+        Yields the (timestamp, values) records of [start, end), reading
+        only the slots of that range.
+        """
+        # Older records have been overwritten already.
+        start = max(start, end - self.step * self.slots)
+        start = -(-start // self.step) * self.step
+        count = max(0, math.ceil((end - start) / self.step))
+
+        first_slot = (start // self.step) % self.slots
+        # The range may wrap around the end of the file.
+        runs = [(first_slot, min(count, self.slots - first_slot))]
+        if count > runs[0][1]:
+            runs.append((0, count - runs[0][1]))
+
+        expected = start
+        for slot, length in runs:
+            offset = self.records_offset + slot * self.record.size
+            data = self._mmap[offset : offset + length * self.record.size]
+            for record in self.record.iter_unpack(data):
+                # Skip what is left from the previous round.
+                if record[0] == expected:
+                    yield record[0], record[1:]
+                expected += self.step
+
+    def query(
+        self,
+        start: float,
+        end: float,
+        buckets: int,
+        metrics: Optional[Iterable[str]] = None,
+    ) -> dict:
+        """
+        Downsamples the records of [start, end) into `buckets` buckets of
+        equal length, with the min, avg and max of each metric per bucket.
+        Empty buckets have None values.
+        """
+        metrics = self.metrics if metrics is None else list(metrics)
+        columns = [self.metrics.index(name) for name in metrics]
+
+        start, end = int(start), int(end)
+        bucket_size = max(self.step, math.ceil((end - start) / buckets))
+        buckets = max(1, math.ceil((end - start) / bucket_size))
+
+        # (count, total, min, max) per metric and bucket
+        stats = [
+            [[0, 0.0, math.inf, -math.inf] for _ in columns]
+            for _ in range(buckets)
+        ]
+
+        if self.open():
+            for timestamp, values in self._iter_records(start, end):
+                if timestamp < start:
+                    continue
+                bucket = stats[(timestamp - start) // bucket_size]
+                for stat, column in zip(bucket, columns):
+                    value = values[column]
+                    if math.isnan(value):
+                        continue
+                    stat[0] += 1
+                    stat[1] += value
+                    stat[2] = min(stat[2], value)
+                    stat[3] = max(stat[3], value)
+
+        result = {
+            'step': self.step,
+            'bucket_size': bucket_size,
+            'time': [start + i * bucket_size for i in range(buckets)],
+            'metrics': {},
+        }
+        for i, name in enumerate(metrics):
+            series = {'min': [], 'avg': [], 'max': []}
+            for bucket in stats:
+                count, total, low, high = bucket[i]
+                series['min'].append(round(low, 2) if count else None)
+                series['avg'].append(
+                    round(total / count, 2) if count else None
+                )
+                series['max'].append(round(high, 2) if count else None)
+            result['metrics'][name] = series
+
+        return result
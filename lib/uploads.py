@@ -0,0 +1,293 @@
+"""
+Resumable upload sessions.
+
+An upload session is a set of files in the upload directory:
+
+    <upload_id>.json   the session state (file name, size, received ranges)
+    <upload_id>.part   the file being uploaded, preallocated to its size
+    <upload_id>.lock   serializes state updates between requests
+
+Chunks can be written in any order, and concurrently. The MD5 of the file
+is computed incrementally, over the part of the file that has been
+received without gaps, so finalizing doesn't need to read the file again.
+"""
+
+import fcntl
+import hashlib
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from os import listdir, makedirs, path, remove, replace
+from typing import BinaryIO, List, Optional
+
+from lib.errors import UploadSessionError, UploadSessionNotFoundError
+
+CHUNK_SIZE = 8 * 1024 * 1024  # bytes, suggested to clients
+READ_SIZE = 64 * 1024  # bytes
+SESSION_MAX_AGE = 24 * 3600  # seconds
+MD5_SUFFIX = '.md5'
+
+# The MD5 objects can't be stored along with the session state, so they are
+# kept in memory as (hashed_up_to, md5). If they are lost, e.g. after a
+# restart, hashing starts over from the beginning of the file.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def merge_ranges(ranges: List[list]) -> List[list]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def read_md5(file_path: str) -> Optional[str]:
+    """
+    Returns the MD5 recorded for an uploaded file, if there is one.
+    """
+    try:
+        with open(f'{file_path}{MD5_SUFFIX}') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def write_md5(file_path: str, md5: str):
+    with open(f'{file_path}{MD5_SUFFIX}', 'w') as f:
+        f.write(md5)
+
+
+def remove_md5(file_path: str):
+    try:
+        remove(f'{file_path}{MD5_SUFFIX}')
+    except OSError:
+        pass
+
+
+class UploadSession:
+    def __init__(self, upload_dir: str, upload_id: str):
+        self.upload_dir = upload_dir
+        self.upload_id = upload_id
+        self.state = {}
+
+    @property
+    def state_path(self) -> str:
+        return path.join(self.upload_dir, f'{self.upload_id}.json')
+
+    @property
+    def data_path(self) -> str:
+        return path.join(self.upload_dir, f'{self.upload_id}.part')
+
+    @property
+    def lock_path(self) -> str:
+        return path.join(self.upload_dir, f'{self.upload_id}.lock')
+
+    @property
+    def size(self) -> int:
+        return self.state['size']
+
+    @property
+    def filename(self) -> str:
+        return self.state['filename']
+
+    @property
+    def received(self) -> List[list]:
+        return self.state['received']
+
+    @property
+    def received_bytes(self) -> int:
+        return sum(end - start for start, end in self.received)
+
+    @property
+    def is_complete(self) -> bool:
+        return self.received == [[0, self.size]] or self.size == 0
+
+    @classmethod
+    def create(cls, upload_dir: str, filename: str, size: int):
+        if size < 0:
+            raise UploadSessionError('Size must not be negative.')
+
+        makedirs(upload_dir, exist_ok=True)
+        session = cls(upload_dir, uuid.uuid4().hex)
+        session.state = {
+            'filename': filename,
+            'size': size,
+            'received': [],
+            'created_at': time.time(),
+        }
+
+        with open(session.data_path, 'wb') as f:
+            f.truncate(size)
+
+        with session._lock():
+            session._save()
+
+        return session
+
+    @classmethod
+    def get(cls, upload_dir: str, upload_id: str):
+        # The id ends up in file names, so don't accept anything but hex.
+        try:
+            uuid.UUID(hex=upload_id)
+        except ValueError:
+            raise UploadSessionNotFoundError(upload_id)
+
+        session = cls(upload_dir, upload_id)
+        session._load()
+        return session
+
+    def _load(self):
+        try:
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            raise UploadSessionNotFoundError(self.upload_id)
+
+    def _save(self):
+        tmp_path = f'{self.state_path}.new'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        replace(tmp_path, self.state_path)
+
+    @contextmanager
+    def _lock(self):
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def write_chunk(self, start: int, end: int, stream: BinaryIO):
+        """
+        Streams the bytes [start, end) of the file from `stream` to disk.
+        The range only counts as received once all of it has been written.
+        """
+        if not 0 <= start < end <= self.size:
+            raise UploadSessionError(
+                f'Range {start}-{end - 1} is outside of the file.'
+            )
+
+        with open(self.data_path, 'r+b') as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                data = stream.read(min(READ_SIZE, remaining))
+                if not data:
+                    raise UploadSessionError(
+                        'Received fewer bytes than Content-Range announced.'
+                    )
+                f.write(data)
+                remaining -= len(data)
+
+        with self._lock():
+            self._load()
+            self.state['received'] = merge_ranges(
+                self.received + [[start, end]]
+            )
+            self._save()
+            self._update_md5()
+
+    def _update_md5(self):
+        """
+        Hashes whatever was received right after the part of the file that
+        has been hashed so far. Has to be called with the lock held.
+        """
+        received_up_to = 0
+        if self.received and self.received[0][0] == 0:
+            received_up_to = self.received[0][1]
+
+        with _hashers_lock:
+            offset, md5 = _hashers.get(self.upload_id, (0, hashlib.md5()))
+
+        if received_up_to > offset:
+            with open(self.data_path, 'rb') as f:
+                f.seek(offset)
+                while offset < received_up_to:
+                    data = f.read(min(READ_SIZE, received_up_to - offset))
+                    if not data:
+                        break
+                    md5.update(data)
+                    offset += len(data)
+
+        with _hashers_lock:
+            _hashers[self.upload_id] = (offset, md5)
+
+        return offset, md5
+
+    def finalize(self, output_path: str) -> str:
+        """
+        Moves the completed file to `output_path`, records its MD5 next to
+        it and removes the session. Returns the MD5.
+        """
+        with self._lock():
+            self._load()
+            if not self.is_complete:
+                raise UploadSessionError(
+                    f'Upload incomplete: {self.received_bytes} of '
+                    f'{self.size} bytes received.'
+                )
+
+            offset, md5 = self._update_md5()
+            if offset != self.size:
+                raise UploadSessionError('Could not hash the uploaded file.')
+
+            md5 = md5.hexdigest()
+            replace(self.data_path, output_path)
+            write_md5(output_path, md5)
+            self._remove_files()
+
+        return md5
+
+    def abort(self):
+        with self._lock():
+            self._remove_files()
+
+    def _remove_files(self):
+        with _hashers_lock:
+            _hashers.pop(self.upload_id, None)
+
+        for file_path in [self.data_path, self.state_path, self.lock_path]:
+            try:
+                remove(file_path)
+            except OSError:
+                pass
+
+    def to_dict(self) -> dict:
+        return {
+            'upload_id': self.upload_id,
+            'filename': self.filename,
+            'size': self.size,
+            'received': self.received,
+            'received_bytes': self.received_bytes,
+            'complete': self.is_complete,
+            'chunk_size': CHUNK_SIZE,
+        }
+
+
+def remove_stale_sessions(upload_dir: str, max_age: int = SESSION_MAX_AGE):
+    """
+    Removes the sessions that haven't received a chunk for `max_age`
+    seconds.
+    """
+    if not path.isdir(upload_dir):
+        return
+
+    now = time.time()
+    for file_name in listdir(upload_dir):
+        upload_id, ext = path.splitext(file_name)
+        if ext != '.json':
+            continue
+
+        session = UploadSession(upload_dir, upload_id)
+        try:
+            if now - path.getmtime(session.state_path) < max_age:
+                continue
+        except OSError:
+            continue
+        session.abort()
@@ -4,7 +4,6 @@ import json
 import logging
 import os
 import random
-import re
 import string
 from builtins import range, str
 from datetime import datetime, timedelta
@@ -20,7 +19,6 @@ import certifi
 import pytz
 import redis
 import requests
-import sh
 from future import standard_library
 from tenacity import (
     RetryError,
@@ -30,6 +28,8 @@ from tenacity import (
 )
 
 from anthias_app.models import Asset
+from lib.errors import MediaProbeError
+from lib.media_info import get_media_info
 from settings import ZmqPublisher, settings
 
 standard_library.install_aliases()
@@ -37,14 +37,6 @@ standard_library.install_aliases()
 
 arch = machine()
 
-# This will only work on the Raspberry Pi,
-# so let's wrap it in a try/except so that
-# Travis can run.
-try:
-    from sh import ffprobe
-except ImportError:
-    pass
-
 
 def string_to_bool(string):
     return bool(strtobool(str(string)))
@@ -322,28 +314,18 @@ def remove_connection(bus, uuid):
 
 def get_video_duration(file):
     """
-    Returns the duration of a video file in timedelta.
+    Returns the duration of a video file in timedelta. The file is probed
+    once, later calls use the stored media info.
     """
-    time = None
-
     try:
-        run_player = ffprobe('-i', file, _err_to_out=True)
-    except sh.ErrorReturnCode_1 as err:
+        duration = get_media_info(file).duration
+    except MediaProbeError as err:
         raise Exception('Bad video format') from err
 
-    for line in run_player.split('\n'):
-        if 'Duration' in line:
-            match = re.search(r'[0-9]+:[0-9]+:[0-9]+\.[0-9]+', line)
-            if match:
-                time_input = match.group()
-                time_split = time_input.split(':')
-                hours = int(time_split[0])
-                minutes = int(time_split[1])
-                seconds = float(time_split[2])
-                time = timedelta(hours=hours, minutes=minutes, seconds=seconds)
-            break
+    if duration is None:
+        raise Exception('Bad video format')
 
-    return time
+    return timedelta(seconds=duration)
 
 
 def handler(obj):
@@ -417,18 +399,43 @@ def url_fails(url):
     return True
 
 
+def get_youtube_info(uri):
+    """
+    Returns the metadata of a YouTube video, as printed by yt-dlp.
+    """
+    return json.loads(check_output(['yt-dlp', '-j', uri]))
+
+
+def get_youtube_location(asset_id):
+    return path.join(getenv('HOME'), 'screenly_assets', f'{asset_id}.mp4')
+
+
+def fetch_youtube_video(uri, location, timeout=None):
+    """
+    Downloads a YouTube video, preferring H.264 in at most 1080p.
+    """
+    return call(
+        [
+            'yt-dlp',
+            '-S',
+            'vcodec:h264,fps,res:1080,acodec:m4a',
+            '-o',
+            location,
+            uri,
+        ],
+        timeout=timeout,
+    )
+
+
 def download_video_from_youtube(uri, asset_id):
-    home = getenv('HOME')
-    name = check_output(['yt-dlp', '-O', 'title', uri])
-    info = json.loads(check_output(['yt-dlp', '-j', uri]))
-    duration = info['duration']
+    info = get_youtube_info(uri)
 
-    location = path.join(home, 'screenly_assets', f'{asset_id}.mp4')
+    location = get_youtube_location(asset_id)
     thread = YoutubeDownloadThread(location, uri, asset_id)
     thread.daemon = True
     thread.start()
 
-    return location, str(name.decode('utf-8')), duration
+    return location, info['title'], info['duration']
 
 
 class YoutubeDownloadThread(Thread):
@@ -440,16 +447,7 @@ class YoutubeDownloadThread(Thread):
 
     def run(self):
         publisher = ZmqPublisher.get_instance()
-        call(
-            [
-                'yt-dlp',
-                '-S',
-                'vcodec:h264,fps,res:1080,acodec:m4a',
-                '-o',
-                self.location,
-                self.uri,
-            ]
-        )
+        fetch_youtube_video(self.uri, self.location)
 
         try:
             asset = Asset.objects.get(asset_id=self.asset_id)
@@ -461,6 +459,12 @@ class YoutubeDownloadThread(Thread):
 
         publisher.send_to_ws_server(self.asset_id)
 
+        # Imported here, as celery_tasks itself depends on this module.
+        from celery_tasks import build_keyframe_index, generate_thumbnail
+
+        generate_thumbnail.delay(self.location, 'video')
+        build_keyframe_index.delay(self.location)
+
 
 def template_handle_unicode(value):
     return str(value)
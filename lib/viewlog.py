@@ -0,0 +1,457 @@
+"""
+Playback log, written by the viewer each time an asset is shown.
+
+It is kept in its own SQLite database, so that logging never waits on
+the main one. The log grows for as long as the device runs, so it is
+read in batches by id: each batch is a short query of its own, which
+keeps memory constant and doesn't hold a lock the viewer would wait on
+while a slow client consumes the entries.
+
+Along with the entries, the play count and on-screen seconds of each
+asset are rolled up per hour, in the same transactions that write the
+entries, so that reports never have to read the log itself.
+
+Entries past their retention are moved into gzipped NDJSON segments in
+the archive directory, which keeps the log small on devices that run for
+years. The rollups are kept.
+"""
+
+import gzip
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from os import fsync, listdir, makedirs, path, remove, replace
+from typing import Iterator, List, Optional
+
+FIELDS = [
+    'id',
+    'asset_id',
+    'asset_name',
+    'mimetype',
+    'started_at',
+    'ended_at',
+    'duration',
+]
+BATCH_SIZE = 500
+ARCHIVE_SEGMENT_SIZE = 10000
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS viewlog '
+    '(id INTEGER PRIMARY KEY AUTOINCREMENT, asset_id TEXT, '
+    'asset_name TEXT, mimetype TEXT, started_at TEXT, ended_at TEXT, '
+    'duration REAL)',
+    'CREATE INDEX IF NOT EXISTS viewlog_started_at ON viewlog (started_at)',
+    'CREATE TABLE IF NOT EXISTS viewlog_archive '
+    '(segment TEXT PRIMARY KEY, entries INTEGER NOT NULL, '
+    'first_started_at TEXT NOT NULL, last_started_at TEXT NOT NULL)',
+]
+# Columns added since the table was first created.
+COLUMNS = {'ended_at': 'TEXT', 'duration': 'REAL'}
+ROLLUP_SCHEMA = (
+    'CREATE TABLE viewlog_hourly '
+    '(hour TEXT NOT NULL, asset_id TEXT NOT NULL, '
+    'plays INTEGER NOT NULL DEFAULT 0, seconds REAL NOT NULL DEFAULT 0, '
+    'PRIMARY KEY (hour, asset_id)) WITHOUT ROWID'
+)
+
+# The databases whose schema is known to be up to date.
+_initialized = set()
+
+
+def get_db_path() -> str:
+    return path.join(path.expanduser('~'), '.screenly', 'viewlog.db')
+
+
+def get_archive_dir() -> str:
+    return path.join(path.dirname(get_db_path()), 'viewlog_archive')
+
+
+def _migrate(conn: sqlite3.Connection):
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(viewlog)')}
+    for name, column_type in COLUMNS.items():
+        if name not in columns:
+            conn.execute(
+                f'ALTER TABLE viewlog ADD COLUMN {name} {column_type}'
+            )
+
+    has_rollup = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'viewlog_hourly'"
+    ).fetchone()
+    if not has_rollup:
+        conn.execute(ROLLUP_SCHEMA)
+        # Entries logged before durations were recorded only count as
+        # plays.
+        conn.execute(
+            'INSERT INTO viewlog_hourly (hour, asset_id, plays) '
+            "SELECT substr(started_at, 1, 13) || ':00:00+00:00', asset_id, "
+            'COUNT(*) FROM viewlog GROUP BY 1, 2'
+        )
+
+
+def connect(timeout: float = 5) -> sqlite3.Connection:
+    db_path = get_db_path()
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    if db_path not in _initialized:
+        # This only applies to new databases, and can't be done in a
+        # transaction. `vacuum` converts the others.
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        with conn:
+            # The viewer and the server may both be the first to connect.
+            conn.execute('BEGIN IMMEDIATE')
+            _migrate(conn)
+        _initialized.add(db_path)
+    return conn
+
+
+def format_time(moment: datetime) -> str:
+    """
+    Returns `moment` the way entries store it: ISO 8601 in UTC, so that
+    the times compare as strings.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat()
+
+
+def parse_time(value: str) -> str:
+    """
+    Normalizes an ISO 8601 time to the format of `format_time`. Raises
+    ValueError if it isn't one.
+    """
+    return format_time(datetime.fromisoformat(value))
+
+
+def get_hour(moment: datetime) -> datetime:
+    """
+    Returns the start of the UTC hour of `moment`.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+def _add_to_rollup(
+    conn: sqlite3.Connection,
+    asset_id: str,
+    hour: datetime,
+    plays: int = 0,
+    seconds: float = 0,
+):
+    conn.execute(
+        'INSERT INTO viewlog_hourly (hour, asset_id, plays, seconds) '
+        'VALUES (?, ?, ?, ?) ON CONFLICT (hour, asset_id) DO UPDATE SET '
+        'plays = plays + excluded.plays, seconds = seconds + excluded.seconds',
+        (format_time(hour), asset_id, plays, seconds),
+    )
+
+
+def log_playback(
+    asset_id: str,
+    asset_name: str,
+    mimetype: str,
+    started_at: Optional[datetime] = None,
+) -> int:
+    """
+    Logs the start of a playback, and returns the id of its entry.
+    """
+    started_at = started_at or datetime.now(timezone.utc)
+    conn = connect()
+    try:
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO viewlog '
+                '(asset_id, asset_name, mimetype, started_at) '
+                'VALUES (?, ?, ?, ?)',
+                (asset_id, asset_name, mimetype, format_time(started_at)),
+            )
+            _add_to_rollup(conn, asset_id, get_hour(started_at), plays=1)
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def end_playback(entry_id: int, ended_at: Optional[datetime] = None):
+    """
+    Logs the end of a playback, adding its on-screen time to the hours it
+    spans.
+    """
+    ended_at = ended_at or datetime.now(timezone.utc)
+    conn = connect()
+    try:
+        with conn:
+            row = conn.execute(
+                'SELECT asset_id, started_at FROM viewlog '
+                'WHERE id = ? AND ended_at IS NULL',
+                (entry_id,),
+            ).fetchone()
+            if not row:
+                return
+
+            asset_id, started_at = row
+            started_at = datetime.fromisoformat(started_at)
+            # The clock may have been set back while playing.
+            ended_at = max(ended_at, started_at)
+            conn.execute(
+                'UPDATE viewlog SET ended_at = ?, duration = ? WHERE id = ?',
+                (
+                    format_time(ended_at),
+                    (ended_at - started_at).total_seconds(),
+                    entry_id,
+                ),
+            )
+
+            hour = get_hour(started_at)
+            while hour < ended_at:
+                next_hour = hour + timedelta(hours=1)
+                seconds = (
+                    min(ended_at, next_hour) - max(started_at, hour)
+                ).total_seconds()
+                if seconds > 0:
+                    _add_to_rollup(conn, asset_id, hour, seconds=seconds)
+                hour = next_hour
+    finally:
+        conn.close()
+
+
+def get_latest() -> Optional[dict]:
+    if not path.exists(get_db_path()):
+        return None
+
+    conn = connect(timeout=3)
+    try:
+        row = conn.execute(
+            f'SELECT {", ".join(FIELDS)} FROM viewlog ORDER BY id DESC LIMIT 1'
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(FIELDS, row)) if row else None
+
+
+def iter_entries(
+    after: int = 0,
+    since: Optional[str] = None,
+    limit: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator[dict]:
+    """
+    Yields the entries with an id above `after`, started after `since`,
+    in id order. `since` is in the format of `format_time`.
+    """
+    if not path.exists(get_db_path()):
+        return
+
+    conn = connect(timeout=3)
+    try:
+        if since:
+            # Find where to start with the index, which SQLite would
+            # otherwise skip for a scan by id. The times aren't quite in id
+            # order, the clock of a device without RTC jumps when it syncs,
+            # so the rows after that are still filtered by time.
+            (first_id,) = conn.execute(
+                'SELECT MIN(id) FROM viewlog '
+                'INDEXED BY viewlog_started_at WHERE started_at > ?',
+                (since,),
+            ).fetchone()
+            if first_id is None:
+                return
+            after = max(after, first_id - 1)
+
+        while limit is None or limit > 0:
+            size = batch_size if limit is None else min(batch_size, limit)
+            # The unary + keeps SQLite on the id range rather than the
+            # started_at index, which would make it sort every batch.
+            rows = conn.execute(
+                f'SELECT {", ".join(FIELDS)} FROM viewlog '
+                'WHERE id > ? AND (? IS NULL OR +started_at > ?) '
+                'ORDER BY id LIMIT ?',
+                (after, since, since, size),
+            ).fetchall()
+
+            for row in rows:
+                yield dict(zip(FIELDS, row))
+
+            if len(rows) < size:
+                return
+            after = rows[-1][0]
+            if limit is not None:
+                limit -= len(rows)
+    finally:
+        conn.close()
+
+
+def get_report(
+    start: datetime, end: datetime, asset_id: Optional[str] = None
+) -> dict:
+    """
+    Returns the play count and on-screen seconds of each asset over the
+    hours that overlap [start, end), from the hourly rollups, along with
+    the bounds of those hours.
+    """
+    start = get_hour(start)
+    end_hour = get_hour(end)
+    end = end_hour if end_hour == end else end_hour + timedelta(hours=1)
+    report = {'start': format_time(start), 'end': format_time(end)}
+
+    if not path.exists(get_db_path()):
+        return {**report, 'assets': []}
+
+    query = (
+        'SELECT asset_id, SUM(plays), SUM(seconds) FROM viewlog_hourly '
+        'WHERE hour >= ? AND hour < ?'
+    )
+    params = [report['start'], report['end']]
+    if asset_id is not None:
+        query += ' AND asset_id = ?'
+        params.append(asset_id)
+    query += ' GROUP BY asset_id ORDER BY asset_id'
+
+    conn = connect(timeout=3)
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    report['assets'] = [
+        {'asset_id': row[0], 'plays': row[1], 'seconds': round(row[2], 1)}
+        for row in rows
+    ]
+    return report
+
+
+def _remove_orphan_segments(conn: sqlite3.Connection, archive_dir: str):
+    """
+    Removes the segments written by an archiving that didn't get to
+    delete their entries from the log, as those are still there.
+    """
+    segments = {
+        row[0] for row in conn.execute('SELECT segment FROM viewlog_archive')
+    }
+    for name in listdir(archive_dir):
+        if name not in segments:
+            remove(path.join(archive_dir, name))
+
+
+def _write_segment(file_path: str, entries: List[dict]):
+    tmp_path = f'{file_path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        with gzip.GzipFile(fileobj=f, mode='wb') as gz:
+            for entry in entries:
+                gz.write((json.dumps(entry) + '\n').encode())
+        f.flush()
+        fsync(f.fileno())
+    replace(tmp_path, file_path)
+
+
+def archive(before: datetime, segment_size: int = ARCHIVE_SEGMENT_SIZE) -> int:
+    """
+    Moves the entries started before `before` from the log to archive
+    segments of up to `segment_size` entries. Returns how many entries
+    were moved.
+    """
+    if not path.exists(get_db_path()):
+        return 0
+
+    archive_dir = get_archive_dir()
+    makedirs(archive_dir, exist_ok=True)
+
+    conn = connect()
+    try:
+        _remove_orphan_segments(conn, archive_dir)
+
+        moved = 0
+        while True:
+            rows = conn.execute(
+                f'SELECT {", ".join(FIELDS)} FROM viewlog '
+                'INDEXED BY viewlog_started_at WHERE started_at < ? '
+                'ORDER BY started_at LIMIT ?',
+                (format_time(before), segment_size),
+            ).fetchall()
+            if not rows:
+                return moved
+
+            entries = [dict(zip(FIELDS, row)) for row in rows]
+            first, last = entries[0], entries[-1]
+            segment = (
+                f'viewlog-{first["started_at"][:10]}-{first["id"]}.ndjson.gz'
+            )
+            # The segment is complete on disk before its entries are
+            # deleted, and it's recorded in the same transaction as the
+            # deletion.
+            _write_segment(path.join(archive_dir, segment), entries)
+            with conn:
+                conn.executemany(
+                    'DELETE FROM viewlog WHERE id = ?',
+                    [(entry['id'],) for entry in entries],
+                )
+                conn.execute(
+                    'INSERT INTO viewlog_archive VALUES (?, ?, ?, ?)',
+                    (
+                        segment,
+                        len(entries),
+                        first['started_at'],
+                        last['started_at'],
+                    ),
+                )
+            moved += len(entries)
+    finally:
+        conn.close()
+
+
+def prune_archive(before: datetime) -> int:
+    """
+    Removes the archive segments whose entries all started before
+    `before`. Returns how many segments were removed.
+    """
+    if not path.exists(get_db_path()):
+        return 0
+
+    conn = connect()
+    try:
+        segments = [
+            row[0]
+            for row in conn.execute(
+                'SELECT segment FROM viewlog_archive '
+                'WHERE last_started_at < ?',
+                (format_time(before),),
+            )
+        ]
+        for segment in segments:
+            with conn:
+                conn.execute(
+                    'DELETE FROM viewlog_archive WHERE segment = ?',
+                    (segment,),
+                )
+            try:
+                remove(path.join(get_archive_dir(), segment))
+            except FileNotFoundError:
+                pass
+    finally:
+        conn.close()
+    return len(segments)
+
+
+def vacuum():
+    """
+    Returns the pages freed by deleted entries to the file system.
+    """
+    if not path.exists(get_db_path()):
+        return
+
+    conn = connect()
+    try:
+        (auto_vacuum,) = conn.execute('PRAGMA auto_vacuum').fetchone()
+        if auto_vacuum == 2:
+            # Each step of the pragma frees a page.
+            conn.execute('PRAGMA incremental_vacuum').fetchall()
+        else:
+            # Databases created before incremental vacuum need one full
+            # vacuum to switch to it.
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+    finally:
+        conn.close()
@@ -1,16 +1,54 @@
+from os import getenv
+
 from gunicorn.app.base import Application
 
 from anthias_django import wsgi
+from lib import notifications
+from lib.device_helper import get_device_type
 from settings import LISTEN, PORT
 
+# Request threads per device type. A slow request, like a screenshot
+# stream or an upload, holds its thread until it's done, so the more
+# threads the less those hold up the rest. There's a single process, as
+# the caches, the screenshot broadcaster and the metrics live in its
+# memory.
+THREADS = {
+    'pi1': 2,
+    'pi2': 4,
+    'pi3': 4,
+    'pi4': 8,
+    'pi5': 12,
+    'x86': 16,
+}
+TIMEOUT = 30  # seconds
+
+
+def get_options(device_type=None):
+    """
+    Returns the server options for the device, which the GUNICORN_THREADS
+    and GUNICORN_TIMEOUT environment variables override.
+    """
+    threads = THREADS.get(device_type or get_device_type(), 4)
+    return {
+        'bind': f'{LISTEN}:{PORT}',
+        'worker_class': 'gthread',
+        'workers': 1,
+        'threads': int(getenv('GUNICORN_THREADS', threads)),
+        # The threads run the requests, this only restarts a worker whose
+        # main loop is stuck.
+        'timeout': int(getenv('GUNICORN_TIMEOUT', TIMEOUT)),
+        'keepalive': 5,
+    }
+
+
+def post_worker_init(worker):
+    # Relays the messages of the Celery worker to the websocket server.
+    notifications.start_relay()
+
 
 class GunicornApplication(Application):
     def init(self, parser, opts, args):
-        return {
-            'bind': f'{LISTEN}:{PORT}',
-            'threads': 2,
-            'timeout': 20,
-        }
+        return {**get_options(), 'post_worker_init': post_worker_init}
 
     def load(self):
         return wsgi.application
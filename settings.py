@@ -6,10 +6,14 @@ import configparser
 import hashlib
 import json
 import logging
+import threading
 from builtins import object, str
 from collections import UserDict
-from os import getenv, path
+from os import fchmod, fsync, getenv, path, remove, replace, stat
+from stat import S_IMODE
+from tempfile import mkstemp
 from time import sleep
+from types import MappingProxyType
 
 import zmq
 
@@ -29,6 +33,10 @@ DEFAULTS = {
         'auth_backend': '',
         'websocket_port': '9999',
         'django_secret_key': '',
+        # Days before viewlog entries are archived, and before the
+        # archives are deleted. 0 keeps them forever.
+        'viewlog_retention_days': 30,
+        'viewlog_archive_days': 365,
     },
     'viewer': {
         'audio_output': 'hdmi',
@@ -71,9 +79,20 @@ logging.debug('Starting viewer')
 
 
 class AnthiasSettings(UserDict):
-    """Anthias' Settings."""
+    """
+    Anthias' Settings.
+
+    screenly.conf is only parsed again when it has changed, so `load` is
+    cheap enough to call before every read.
+    """
 
     def __init__(self, *args, **kwargs):
+        self._lock = threading.Lock()
+        # The (inode, mtime, size) of screenly.conf when it was last read.
+        self._signature = None
+        # Whether there are changes that haven't been saved.
+        self._dirty = False
+        self._snapshot = None
         UserDict.__init__(self, *args, **kwargs)
         self.home = getenv('HOME')
         self.conf_file = self.get_configfile()
@@ -129,15 +148,58 @@ class AnthiasSettings(UserDict):
         else:
             config.set(section, field, str(self.get(field, default)))
 
-    def load(self):
-        """Loads the latest settings from screenly.conf into memory."""
-        logging.debug('Reading config-file...')
-        config = configparser.ConfigParser()
-        config.read(self.conf_file)
+    def __setitem__(self, key, value):
+        UserDict.__setitem__(self, key, value)
+        self._dirty = True
+        self._snapshot = None
 
-        for section, defaults in list(DEFAULTS.items()):
-            for field, default in list(defaults.items()):
-                self._get(config, section, field, default)
+    def _get_signature(self):
+        try:
+            st = stat(self.conf_file)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def load(self, force=False):
+        """
+        Loads the latest settings from screenly.conf into memory, unless
+        the file hasn't changed since the last load. Unsaved changes are
+        discarded.
+        """
+        # Taken before reading, so that a change made while reading is
+        # picked up by the next load.
+        signature = self._get_signature()
+
+        with self._lock:
+            if (
+                not force
+                and not self._dirty
+                and signature is not None
+                and signature == self._signature
+            ):
+                return
+
+            logging.debug('Reading config-file...')
+            config = configparser.ConfigParser()
+            config.read(self.conf_file)
+
+            for section, defaults in list(DEFAULTS.items()):
+                for field, default in list(defaults.items()):
+                    self._get(config, section, field, default)
+
+            self._signature = signature
+            self._dirty = False
+
+    def snapshot(self):
+        """
+        Returns the saved settings as a read-only mapping, which is shared
+        by the callers until screenly.conf changes.
+        """
+        self.load()
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = MappingProxyType(dict(self.data))
+            return self._snapshot
 
     def use_defaults(self):
         for defaults in list(DEFAULTS.items()):
@@ -145,15 +207,40 @@ class AnthiasSettings(UserDict):
                 self[field] = default
 
     def save(self):
-        # Write new settings to disk.
+        # Write new settings to disk. They're written to a temporary file
+        # that replaces screenly.conf, so that readers never see it half
+        # written.
         config = configparser.ConfigParser()
         for section, defaults in list(DEFAULTS.items()):
             config.add_section(section)
             for field, default in list(defaults.items()):
                 self._set(config, section, field, default)
-        with open(self.conf_file, 'w') as f:
-            config.write(f)
-        self.load()
+
+        # Each save gets its own temporary file, so that concurrent saves
+        # don't write to the same one.
+        fd, tmp_file = mkstemp(
+            prefix=CONFIG_FILE + '.',
+            suffix='.tmp',
+            dir=path.dirname(self.conf_file),
+        )
+        try:
+            with open(fd, 'w') as f:
+                config.write(f)
+                f.flush()
+                # mkstemp only lets the owner read the file.
+                fchmod(f.fileno(), self._get_conf_mode())
+                fsync(f.fileno())
+            replace(tmp_file, self.conf_file)
+        except BaseException:
+            remove(tmp_file)
+            raise
+        self.load(force=True)
+
+    def _get_conf_mode(self):
+        try:
+            return S_IMODE(stat(self.conf_file).st_mode)
+        except OSError:
+            return 0o644
 
     def get_configdir(self):
         return path.join(self.home, CONFIG_DIR)
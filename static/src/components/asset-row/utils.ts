@@ -189,42 +189,12 @@ export const handleDelete = async (
   }
 }
 
-export const handleDownload = async (
+export const handleDownload = (
   event: React.MouseEvent,
   assetId: string,
-): Promise<void> => {
+): void => {
   event.preventDefault()
 
-  try {
-    const response = await fetch(`/api/v2/assets/${assetId}/content`)
-    const result = await response.json()
-
-    if (result.type === 'url') {
-      window.open(result.url)
-    } else if (result.type === 'file') {
-      // Convert base64 to byte array
-      const content = atob(result.content)
-      const bytes = new Uint8Array(content.length)
-      for (let i = 0; i < content.length; i++) {
-        bytes[i] = content.charCodeAt(i)
-      }
-
-      const mimetype = result.mimetype
-      const filename = result.filename
-
-      // Create blob and download
-      const blob = new Blob([bytes], { type: mimetype })
-      const url = URL.createObjectURL(blob)
-
-      const a = document.createElement('a')
-      document.body.appendChild(a)
-      a.download = filename
-      a.href = url
-      a.click()
-
-      // Clean up
-      URL.revokeObjectURL(url)
-      a.remove()
-    }
-  } catch {}
+  // Files are sent as attachments, URL assets redirect to the URL itself.
+  window.open(`/api/v2/assets/${assetId}/download`)
 }
@@ -14,29 +14,16 @@ import {
 export const Backup = () => {
   const { t } = useTranslation()
   const dispatch = useDispatch<AppDispatch>()
-  const { isUploading, uploadProgress } = useSelector(
+  const { isUploading, uploadProgress, backupProgress } = useSelector(
     (state: RootState) => state.settings,
   )
+  const isBackingUp = backupProgress !== null
 
   const handleBackup = async () => {
-    const backupButton = document.getElementById(
-      'btn-backup',
-    ) as HTMLButtonElement | null
-    const uploadButton = document.getElementById(
-      'btn-upload',
-    ) as HTMLButtonElement | null
-
-    if (!backupButton || !uploadButton) return
-
-    const originalText = backupButton.textContent
-    backupButton.textContent = t('backup.preparingArchive')
-    backupButton.disabled = true
-    uploadButton.disabled = true
-
     try {
       const result = await dispatch(createBackup()).unwrap()
       if (result) {
-        window.location.href = `/static_with_mime/${result}?mime=application/x-tgz`
+        window.location.href = `/static_with_mime/${result}?mime=application/x-tar`
       }
     } catch (err) {
       await Swal.fire({
@@ -51,14 +38,6 @@ export const Backup = () => {
           confirmButton: 'swal2-confirm',
         },
       })
-    } finally {
-      if (backupButton) {
-        backupButton.textContent = originalText
-        backupButton.disabled = false
-      }
-      if (uploadButton) {
-        uploadButton.disabled = false
-      }
     }
   }
 
@@ -157,16 +136,18 @@ export const Backup = () => {
               id="btn-backup"
               className="btn btn-long btn-info me-2"
               onClick={handleBackup}
-              disabled={isUploading}
+              disabled={isUploading || isBackingUp}
             >
-              {t('backup.getBackup')}
+              {isBackingUp
+                ? `${t('backup.preparingArchive')} ${backupProgress}%`
+                : t('backup.getBackup')}
             </button>
             <button
               id="btn-upload"
               className="btn btn-primary btn-long"
               type="button"
               onClick={handleUpload}
-              disabled={isUploading}
+              disabled={isUploading || isBackingUp}
             >
               {isUploading ? t('backup.uploading') : t('backup.uploadAndRecover')}
             </button>
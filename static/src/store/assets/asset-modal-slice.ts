@@ -1,5 +1,8 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit'
+import Swal from 'sweetalert2'
 import { addAsset } from './assets-list-slice'
+import { fetchAssets } from './assets-thunks'
+import { waitForJob } from '@/store/settings/index'
 import {
   UploadFileParams,
   SaveAssetParams,
@@ -9,6 +12,111 @@ import {
 } from '@/types'
 import { getMimetype } from '@/components/add-asset-modal/file-upload-utils'
 
+interface UploadSession {
+  upload_id: string
+  size: number
+  received: number[][]
+  received_bytes: number
+  chunk_size: number
+}
+
+const UPLOAD_RETRIES = 5
+const UPLOAD_RETRY_DELAY = 2000 // milliseconds
+
+// Splits the byte ranges the server hasn't received yet into chunks.
+const getMissingChunks = (session: UploadSession): number[][] => {
+  const chunks: number[][] = []
+  let offset = 0
+
+  for (const [start, end] of [...session.received, [session.size, 0]]) {
+    for (let from = offset; from < start; from += session.chunk_size) {
+      chunks.push([from, Math.min(from + session.chunk_size, start)])
+    }
+    offset = Math.max(offset, end)
+  }
+
+  return chunks
+}
+
+const fetchJson = async (url: string, init?: RequestInit) => {
+  const response = await fetch(url, init)
+  if (!response.ok) {
+    throw new Error(`Upload failed with status ${response.status}`)
+  }
+  return response.json()
+}
+
+const sendChunk = (
+  uploadId: string,
+  file: File,
+  [start, end]: number[],
+  onProgress: (loaded: number) => void,
+): Promise<UploadSession> =>
+  new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest()
+
+    xhr.upload.addEventListener('progress', (e) => onProgress(e.loaded))
+    xhr.addEventListener('load', () => {
+      if (xhr.status >= 200 && xhr.status < 300) {
+        try {
+          resolve(JSON.parse(xhr.responseText))
+        } catch {
+          reject(new Error('Invalid JSON response'))
+        }
+      } else {
+        reject(new Error(`Upload failed with status ${xhr.status}`))
+      }
+    })
+    xhr.addEventListener('error', () => {
+      reject(new Error('Network error during upload'))
+    })
+    xhr.addEventListener('abort', () => {
+      reject(new Error('Upload aborted'))
+    })
+
+    xhr.open('PUT', `/api/v2/uploads/${uploadId}`)
+    xhr.setRequestHeader(
+      'Content-Range',
+      `bytes ${start}-${end - 1}/${file.size}`,
+    )
+    xhr.send(file.slice(start, end))
+  })
+
+// Uploads the file through a resumable upload session. When a chunk fails,
+// the upload picks up from whatever the server has received so far.
+const uploadInChunks = async (
+  file: File,
+  onProgress: (progress: number) => void,
+): Promise<FileData> => {
+  let session: UploadSession = await fetchJson('/api/v2/uploads', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ filename: file.name, size: file.size }),
+  })
+  const uploadId = session.upload_id
+  const reportProgress = (loaded: number) => {
+    const total = Math.max(file.size, 1)
+    onProgress(Math.round(((session.received_bytes + loaded) / total) * 100))
+  }
+
+  for (let attempt = 0; ; attempt++) {
+    try {
+      for (const chunk of getMissingChunks(session)) {
+        session = await sendChunk(uploadId, file, chunk, reportProgress)
+      }
+      break
+    } catch (error) {
+      if (attempt >= UPLOAD_RETRIES) {
+        throw error
+      }
+      await new Promise((resolve) => setTimeout(resolve, UPLOAD_RETRY_DELAY))
+      session = await fetchJson(`/api/v2/uploads/${uploadId}`)
+    }
+  }
+
+  return fetchJson(`/api/v2/uploads/${uploadId}/finalize`, { method: 'POST' })
+}
+
 // Async thunks for API operations
 export const uploadFile = createAsyncThunk(
   'assetModal/uploadFile',
@@ -17,48 +125,9 @@ export const uploadFile = createAsyncThunk(
     { dispatch, getState, rejectWithValue },
   ) => {
     try {
-      const formData = new FormData()
-      formData.append('file_upload', file)
-
-      // Create XMLHttpRequest for progress tracking
-      const xhr = new XMLHttpRequest()
-
-      const uploadPromise = new Promise((resolve, reject) => {
-        xhr.upload.addEventListener('progress', (e) => {
-          if (e.lengthComputable) {
-            const progress = Math.round((e.loaded / e.total) * 100)
-            dispatch(setUploadProgress(progress))
-          }
-        })
-
-        xhr.addEventListener('load', () => {
-          if (xhr.status >= 200 && xhr.status < 300) {
-            try {
-              const response = JSON.parse(xhr.responseText)
-              resolve(response)
-            } catch {
-              reject(new Error('Invalid JSON response'))
-            }
-          } else {
-            reject(new Error(`Upload failed with status ${xhr.status}`))
-          }
-        })
-
-        xhr.addEventListener('error', () => {
-          reject(new Error('Network error during upload'))
-        })
-
-        xhr.addEventListener('abort', () => {
-          reject(new Error('Upload aborted'))
-        })
-      })
-
-      // Start the upload
-      xhr.open('POST', '/api/v2/file_asset')
-      xhr.send(formData)
-
-      // Wait for upload to complete
-      const response = await uploadPromise
+      const response = await uploadInChunks(file, (progress) =>
+        dispatch(setUploadProgress(progress)),
+      )
 
       // Get mimetype and duration
       const mimetype = getMimetype(file.name)
@@ -72,7 +141,7 @@ export const uploadFile = createAsyncThunk(
       const dates = getDefaultDates()
 
       return {
-        fileData: response as FileData,
+        fileData: response,
         filename: file.name,
         skipAssetCheck,
         mimetype: mimetypeString,
@@ -85,6 +154,36 @@ export const uploadFile = createAsyncThunk(
   },
 )
 
+// New assets are checked and stored by a background job, which deletes the
+// asset when it fails. The modal is closed by then, so the error is shown
+// in an alert.
+export const watchIngest = createAsyncThunk(
+  'assetModal/watchIngest',
+  async (
+    { jobId, name }: { jobId: string; name: string },
+    { dispatch, rejectWithValue },
+  ) => {
+    try {
+      return await waitForJob(jobId)
+    } catch (error) {
+      const message = (error as Error).message
+      dispatch(fetchAssets())
+      Swal.fire({
+        title: 'Error!',
+        text: `Failed to add ${name}: ${message}`,
+        icon: 'error',
+        customClass: {
+          popup: 'swal2-popup',
+          title: 'swal2-title',
+          htmlContainer: 'swal2-html-container',
+          confirmButton: 'swal2-confirm',
+        },
+      })
+      return rejectWithValue(message)
+    }
+  },
+)
+
 export const saveAsset = createAsyncThunk(
   'assetModal/saveAsset',
   async ({ assetData }: SaveAssetParams, { dispatch, rejectWithValue }) => {
@@ -113,6 +212,10 @@ export const saveAsset = createAsyncThunk(
       // Dispatch the addAsset action to update the assets list
       dispatch(addAsset(completeAsset))
 
+      if (response.status === 202 && data.job_id) {
+        dispatch(watchIngest({ jobId: data.job_id, name: completeAsset.name }))
+      }
+
       return completeAsset
     } catch (error) {
       return rejectWithValue((error as Error).message)
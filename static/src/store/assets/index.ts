@@ -14,6 +14,7 @@ import assetModalReducer from './asset-modal-slice'
 import {
   uploadFile,
   saveAsset,
+  watchIngest,
   setActiveTab,
   updateFormData,
   setValid,
@@ -38,6 +39,7 @@ export {
   assetModalReducer,
   uploadFile,
   saveAsset,
+  watchIngest,
   setActiveTab,
   updateFormData,
   setValid,
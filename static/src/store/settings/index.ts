@@ -111,9 +111,41 @@ export const updateSettings = createAsyncThunk(
   },
 )
 
+const JOB_POLL_INTERVAL = 1000 // ms
+
+type Job = {
+  state: 'pending' | 'running' | 'succeeded' | 'failed'
+  progress: number
+  result?: unknown
+  error?: string
+}
+
+export const waitForJob = async (
+  jobId: string,
+  onProgress?: (progress: number) => void,
+): Promise<Job> => {
+  for (;;) {
+    const response = await fetch(`/api/v2/jobs/${jobId}`)
+    const job = (await response.json()) as Job
+
+    if (!response.ok) {
+      throw new Error('Failed to get job status')
+    }
+    if (job.state === 'failed') {
+      throw new Error(job.error || 'Job failed')
+    }
+    if (job.state === 'succeeded') {
+      return job
+    }
+
+    onProgress?.(job.progress)
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL))
+  }
+}
+
 export const createBackup = createAsyncThunk(
   'settings/createBackup',
-  async (_, { rejectWithValue }) => {
+  async (_, { dispatch, rejectWithValue }) => {
     try {
       const response = await fetch('/api/v2/backup', {
         method: 'POST',
@@ -123,8 +155,11 @@ export const createBackup = createAsyncThunk(
         throw new Error('Failed to create backup')
       }
 
-      const data = await response.json()
-      return data
+      const { job_id: jobId } = await response.json()
+      const job = await waitForJob(jobId, (progress) => {
+        dispatch(setBackupProgress(Math.round(progress * 100)))
+      })
+      return (job.result as { filename: string }).filename
     } catch (error) {
       return rejectWithValue((error as Error).message)
     }
@@ -133,7 +168,7 @@ export const createBackup = createAsyncThunk(
 
 export const uploadBackup = createAsyncThunk(
   'settings/uploadBackup',
-  async (file: File, { rejectWithValue }) => {
+  async (file: File, { dispatch, rejectWithValue }) => {
     try {
       const formData = new FormData()
       formData.append('backup_upload', file)
@@ -149,7 +184,9 @@ export const uploadBackup = createAsyncThunk(
         throw new Error(data.error || 'Failed to upload backup')
       }
 
-      return data
+      return await waitForJob(data.job_id, (progress) => {
+        dispatch(setUploadProgress(Math.round(progress * 100)))
+      })
     } catch (error) {
       return rejectWithValue((error as Error).message)
     }
@@ -212,6 +249,7 @@ const initialState = {
   isLoading: false,
   isUploading: false,
   uploadProgress: 0,
+  backupProgress: null as number | null,
   error: null as string | null,
 }
 
@@ -234,6 +272,9 @@ const settingsSlice = createSlice({
     setUploadProgress: (state, action) => {
       state.uploadProgress = action.payload
     },
+    setBackupProgress: (state, action) => {
+      state.backupProgress = action.payload
+    },
     resetUploadState: (state) => {
       state.isUploading = false
       state.uploadProgress = 0
@@ -282,7 +323,15 @@ const settingsSlice = createSlice({
         state.error = action.payload as string | null
       })
       // Create Backup
+      .addCase(createBackup.pending, (state) => {
+        state.backupProgress = 0
+        state.error = null
+      })
+      .addCase(createBackup.fulfilled, (state) => {
+        state.backupProgress = null
+      })
       .addCase(createBackup.rejected, (state, action) => {
+        state.backupProgress = null
         state.error = action.payload as string | null
       })
       // Upload Backup
@@ -307,6 +356,7 @@ const settingsSlice = createSlice({
 export const {
   updateSetting,
   setUploadProgress,
+  setBackupProgress,
   resetUploadState,
   clearError,
 } = settingsSlice.actions
@@ -62,6 +62,7 @@ const createMockStore = (preloadedState: Partial<RootState> = {}) => {
         hasSavedBasicAuth: false,
         isUploading: false,
         uploadProgress: 0,
+        backupProgress: null,
         error: null,
         ...(preloadedState.settings || {}),
       },
@@ -207,6 +208,7 @@ describe('Settings Component', () => {
         hasSavedBasicAuth: false,
         isUploading: false,
         uploadProgress: 0,
+        backupProgress: null,
         error: null,
       },
     })
@@ -171,6 +171,7 @@ export function getInitialState(): RootState {
       isLoading: false,
       isUploading: false,
       uploadProgress: 0,
+      backupProgress: null,
       error: null,
     },
     websocket: {
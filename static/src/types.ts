@@ -206,6 +206,7 @@ export interface RootState {
     isLoading: boolean
     isUploading: boolean
     uploadProgress: number
+    backupProgress: number | null
     error: string | null
   }
   websocket: WebSocketState
@@ -0,0 +1,89 @@
+import hashlib
+import shutil
+import tempfile
+import unittest
+from os import listdir, path, remove
+
+import mock
+
+from lib import asset_store, uploads
+
+
+class AssetStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+        self.content = b'image content'
+        self.md5 = hashlib.md5(self.content).hexdigest()
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir)
+
+    def make_upload(self, name):
+        file_path = path.join(self.store_dir, name)
+        with open(file_path, 'wb') as f:
+            f.write(self.content)
+        return file_path
+
+    def test_add_file_is_stored_by_content(self):
+        stored_path, md5 = asset_store.add_file(
+            self.make_upload('upload.tmp'), self.store_dir, '.png'
+        )
+
+        self.assertEqual(md5, self.md5)
+        self.assertEqual(
+            stored_path, path.join(self.store_dir, f'{self.md5}.png')
+        )
+        self.assertEqual(listdir(self.store_dir), [f'{self.md5}.png'])
+
+    def test_add_duplicate_file_reuses_stored_file(self):
+        first_path, _ = asset_store.add_file(
+            self.make_upload('first.tmp'), self.store_dir, '.png'
+        )
+        second_path, _ = asset_store.add_file(
+            self.make_upload('second.tmp'), self.store_dir, '.png'
+        )
+
+        self.assertEqual(first_path, second_path)
+        self.assertEqual(listdir(self.store_dir), [f'{self.md5}.png'])
+
+    def test_add_file_while_stored_file_is_removed(self):
+        stored_path, _ = asset_store.add_file(
+            self.make_upload('first.tmp'), self.store_dir, '.png'
+        )
+        isfile = path.isfile
+
+        def remove_stored_file(file_path):
+            # The last asset using the file is deleted in the meantime.
+            found = isfile(file_path)
+            if file_path == stored_path and found:
+                remove(stored_path)
+            return found
+
+        with mock.patch('os.path.isfile', side_effect=remove_stored_file):
+            second_path, _ = asset_store.add_file(
+                self.make_upload('second.tmp'), self.store_dir, '.png'
+            )
+
+        self.assertEqual(second_path, stored_path)
+        with open(stored_path, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(listdir(self.store_dir), [f'{self.md5}.png'])
+
+    def test_add_file_uses_recorded_md5(self):
+        upload_path = self.make_upload('upload.tmp')
+        uploads.write_md5(upload_path, 'f' * 32)
+
+        stored_path, md5 = asset_store.add_file(upload_path, self.store_dir)
+
+        self.assertEqual(md5, 'f' * 32)
+        self.assertEqual(listdir(self.store_dir), ['f' * 32])
+
+    def test_find_blob(self):
+        self.assertIsNone(asset_store.find_blob(self.store_dir, self.md5))
+
+        asset_store.add_file(self.make_upload('upload.tmp'), self.store_dir)
+
+        self.assertEqual(
+            asset_store.find_blob(self.store_dir, self.md5),
+            path.join(self.store_dir, self.md5),
+        )
@@ -1,11 +1,19 @@
+import errno
+import io
+import json
+import os
 import shutil
+import tarfile
+import tempfile
 import unittest
 from datetime import datetime
 from os import getenv, path
 
 import mock
 
+from lib import backup_helper
 from lib.backup_helper import create_backup, recover, static_dir
+from lib.errors import BackupError
 
 home = getenv('HOME')
 
@@ -13,9 +21,7 @@ home = getenv('HOME')
 class BackupHelperTest(unittest.TestCase):
     def setUp(self):
         self.dt = datetime(2016, 7, 19, 12, 42, 12)
-        self.expected_archive_name = (
-            'anthias-backup-2016-07-19T12-42-12.tar.gz'
-        )
+        self.expected_archive_name = 'anthias-backup-2016-07-19T12-42-12.tar'
         self.assertFalse(path.isdir(path.join(home, static_dir)))
 
     def tearDown(self):
@@ -41,3 +47,290 @@ class BackupHelperTest(unittest.TestCase):
         self.assertTrue(path.isfile(file_path))
         recover(file_path)
         self.assertFalse(path.isfile(file_path))
+
+
+class BackupFormatTest(unittest.TestCase):
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.home)
+        env_patch = mock.patch.dict(os.environ, {'HOME': self.home})
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+
+        self.files = {
+            '.screenly/screenly.conf': b'[main]\n' * 1000,
+            'screenly_assets/video.mp4': os.urandom(3000),
+            'screenly_assets/empty.png': b'',
+        }
+        for name, content in self.files.items():
+            self._write(name, content)
+        os.makedirs(path.join(self.home, 'screenly_assets', 'empty_dir'))
+
+    def _write(self, name, content):
+        file_path = path.join(self.home, name)
+        os.makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+
+    def _read(self, name):
+        with open(path.join(self.home, name), 'rb') as f:
+            return f.read()
+
+    def _remove_sources(self):
+        for directory in backup_helper.directories:
+            shutil.rmtree(path.join(self.home, directory))
+
+    def test_media_are_stored_and_the_rest_gzipped(self):
+        progress = mock.Mock()
+        archive_name = create_backup(progress=progress)
+        file_path = path.join(self.home, static_dir, archive_name)
+
+        with tarfile.open(file_path, 'r:') as tar:
+            members = {member.name: member for member in tar}
+
+        self.assertIn('.screenly', members)
+        self.assertIn('screenly_assets/empty_dir', members)
+        video = members['screenly_assets/video.mp4']
+        self.assertEqual(video.size, 3000)
+        self.assertNotIn(backup_helper.COMPRESSION_HEADER, video.pax_headers)
+        conf = members['.screenly/screenly.conf.gz']
+        self.assertEqual(
+            conf.pax_headers[backup_helper.COMPRESSION_HEADER], 'gzip'
+        )
+        self.assertLess(conf.size, 1000)
+
+        total = sum(len(content) for content in self.files.values())
+        progress.assert_called_with(total, total)
+
+    def test_recover(self):
+        archive_name = create_backup()
+        self._remove_sources()
+
+        recover(path.join(self.home, static_dir, archive_name))
+
+        for name, content in self.files.items():
+            self.assertEqual(self._read(name), content)
+        self.assertTrue(
+            path.isdir(path.join(self.home, 'screenly_assets', 'empty_dir'))
+        )
+
+    def test_recover_gzipped_archive(self):
+        file_path = path.join(self.home, 'old-backup.tar.gz')
+        with tarfile.open(file_path, 'w:gz') as tar:
+            for directory in backup_helper.directories:
+                tar.add(path.join(self.home, directory), arcname=directory)
+        self._remove_sources()
+
+        recover(file_path)
+
+        for name, content in self.files.items():
+            self.assertEqual(self._read(name), content)
+
+    def _create_backups(self, change):
+        """
+        Creates a full backup, calls `change` and creates an incremental
+        one, returning both names.
+        """
+        with mock.patch('lib.backup_helper.datetime') as datetime_mock:
+            datetime_mock.now.return_value = datetime(2024, 1, 1)
+            full = create_backup()
+            change()
+            datetime_mock.now.return_value = datetime(2024, 1, 2)
+            incremental = create_backup(base=full)
+        return full, incremental
+
+    def _change_files(self):
+        self.files['.screenly/screenly.conf'] = b'[viewer]\n'
+        self._write('.screenly/screenly.conf', b'[viewer]\n')
+        # Touched, but the same.
+        video_path = path.join(self.home, 'screenly_assets/video.mp4')
+        os.utime(video_path, (1, 1))
+
+    def test_incremental_backup_stores_changes_only(self):
+        full, incremental = self._create_backups(self._change_files)
+        self.assertEqual(backup_helper.get_latest_backup(), incremental)
+
+        file_path = path.join(self.home, static_dir, incremental)
+        with tarfile.open(file_path, 'r:') as tar:
+            names = tar.getnames()
+        self.assertIn('.screenly/screenly.conf.gz', names)
+        self.assertNotIn('screenly_assets/video.mp4', names)
+
+        files = backup_helper.read_manifest(file_path)['files']
+        self.assertEqual(files['screenly_assets/video.mp4']['archive'], full)
+        self.assertEqual(files['screenly_assets/video.mp4']['mtime'], 1)
+        self.assertIsNone(files['.screenly/screenly.conf']['archive'])
+
+    def test_recover_incremental_backup(self):
+        _, incremental = self._create_backups(self._change_files)
+        self._remove_sources()
+
+        recover(path.join(self.home, static_dir, incremental))
+
+        for name, content in self.files.items():
+            self.assertEqual(self._read(name), content)
+
+    def test_recover_needs_base_backup(self):
+        full, incremental = self._create_backups(self._change_files)
+        os.remove(path.join(self.home, static_dir, full))
+        self._remove_sources()
+
+        with self.assertRaises(BackupError):
+            recover(path.join(self.home, static_dir, incremental))
+
+    def test_recover_extracts_changed_files_only(self):
+        archive_name = create_backup()
+        self._write('.screenly/screenly.conf', b'changed')
+
+        with mock.patch(
+            'lib.backup_helper._extract', wraps=backup_helper._extract
+        ) as extract_mock:
+            recover(path.join(self.home, static_dir, archive_name))
+
+        extracted = [call.args[1] for call in extract_mock.call_args_list]
+        self.assertEqual(
+            [member.name for member in extracted if member.isreg()],
+            ['screenly.conf.gz'],
+        )
+        self.assertEqual(
+            self._read('.screenly/screenly.conf'),
+            self.files['.screenly/screenly.conf'],
+        )
+
+    def _create_archive(self, members):
+        file_path = path.join(self.home, 'backup.tar')
+        with tarfile.open(file_path, 'w') as tar:
+            for name, content in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        return file_path
+
+    def test_recover_rejects_wrong_archive(self):
+        for members in [
+            {'screenly_assets/video.mp4': b'video'},
+            {
+                '.screenly/screenly.conf': b'conf',
+                'screenly_assets/../../evil': b'evil',
+            },
+            {'.screenly/screenly.conf': b'conf', 'elsewhere': b'file'},
+        ]:
+            file_path = self._create_archive(members)
+
+            with self.assertRaises(BackupError):
+                recover(file_path)
+
+            for name, content in self.files.items():
+                self.assertEqual(self._read(name), content)
+            self.assertFalse(path.exists(file_path))
+            self.assertEqual(
+                sorted(os.listdir(path.join(self.home, '.screenly'))),
+                ['screenly.conf'],
+            )
+
+    def test_recover_rejects_manifest_outside_backup_dir(self):
+        # Archives that would be found, if the names weren't rejected.
+        backup_dir = backup_helper.get_backup_dir()
+        os.makedirs(path.join(backup_dir, 'sub'))
+        for name in ['../../evil.tar', 'sub/backup.tar', 'notes']:
+            with tarfile.open(path.join(backup_dir, name), 'w'):
+                pass
+
+        for archive_name in ['../../evil.tar', 'sub/backup.tar', 'notes']:
+            manifest = {
+                'version': backup_helper.MANIFEST_VERSION,
+                'files': {
+                    'screenly_assets/video.mp4': {
+                        'archive': archive_name,
+                        'size': 1,
+                        'mtime': 1,
+                        'sha256': '0' * 64,
+                    }
+                },
+            }
+            file_path = self._create_archive(
+                {
+                    backup_helper.MANIFEST_NAME: json.dumps(manifest).encode(),
+                    '.screenly/screenly.conf': b'conf',
+                    'screenly_assets/empty.png': b'',
+                }
+            )
+
+            with self.assertRaises(BackupError):
+                recover(file_path)
+
+            for name, content in self.files.items():
+                self.assertEqual(self._read(name), content)
+
+    def test_recover_replaces_directories(self):
+        archive_name = create_backup()
+        self._write('screenly_assets/new.mp4', b'added since')
+
+        progress = mock.Mock()
+        recover(path.join(self.home, static_dir, archive_name), progress)
+
+        self.assertFalse(
+            path.exists(path.join(self.home, 'screenly_assets/new.mp4'))
+        )
+        for name, content in self.files.items():
+            self.assertEqual(self._read(name), content)
+        self.assertTrue(progress.called)
+
+    def test_recover_keeps_directories_in_place(self):
+        # On a device the backed up directories are volumes, which can't
+        # be renamed.
+        archive_name = create_backup()
+        self._write('screenly_assets/new.mp4', b'added since')
+        roots = {
+            path.join(self.home, directory)
+            for directory in backup_helper.directories
+        }
+        inodes = {root: os.stat(root).st_ino for root in roots}
+
+        def replace(source, destination):
+            if source in roots or destination in roots:
+                raise OSError(errno.EBUSY, 'Device or resource busy')
+            os.replace(source, destination)
+
+        with (
+            mock.patch('lib.backup_helper.replace', side_effect=replace),
+            mock.patch('os.rename', side_effect=replace),
+        ):
+            recover(path.join(self.home, static_dir, archive_name))
+
+        for root in roots:
+            self.assertEqual(os.stat(root).st_ino, inodes[root])
+        self.assertFalse(
+            path.exists(path.join(self.home, 'screenly_assets/new.mp4'))
+        )
+        for name, content in self.files.items():
+            self.assertEqual(self._read(name), content)
+        self.assertEqual(
+            sorted(os.listdir(path.join(self.home, 'screenly_assets'))),
+            ['empty.png', 'empty_dir', 'video.mp4'],
+        )
+
+    def test_failed_swap_puts_files_back(self):
+        archive_name = create_backup()
+        self._write('screenly_assets/new.mp4', b'added since')
+        os.remove(path.join(self.home, 'screenly_assets/video.mp4'))
+
+        def replace(source, destination):
+            if path.basename(source) == 'video.mp4':
+                raise OSError(errno.EIO, 'Input/output error')
+            os.replace(source, destination)
+
+        with (
+            mock.patch('lib.backup_helper.replace', side_effect=replace),
+            self.assertRaises(OSError),
+        ):
+            recover(path.join(self.home, static_dir, archive_name))
+
+        self.assertEqual(self._read('screenly_assets/new.mp4'), b'added since')
+        self.assertFalse(
+            path.exists(path.join(self.home, 'screenly_assets/video.mp4'))
+        )
+        self.assertEqual(
+            sorted(os.listdir(path.join(self.home, 'screenly_assets'))),
+            ['empty.png', 'empty_dir', 'new.mp4'],
+        )
@@ -1,39 +1,144 @@
 from __future__ import unicode_literals
 
-import unittest
-from os import getenv, listdir, path, system
+import time
+from os import getenv, listdir, makedirs, path, remove, utime
+from unittest import mock
 
-from celery_tasks import celery as celeryapp
-from celery_tasks import cleanup
+from django.test import TestCase
 
+from anthias_app.models import Asset, MediaInfo
+from celery_tasks import (
+    STALE_FILE_AGE,
+    backfill_media_info,
+    cleanup,
+    collect_device_info,
+    collect_slow_device_info,
+    record_failed_task_duration,
+    record_task_duration,
+    record_task_start,
+)
+from celery_tasks import celery as celeryapp
+from tests.test_jobs import FakeRedis
 
-class CeleryTasksTestCase(unittest.TestCase):
-    REPO_URL = 'https://github.com/Screenly/screenly-ose'
 
+class CeleryTasksTestCase(TestCase):
     def setUp(self):
-        self.image_url = f'{self.REPO_URL}/raw/master/static/img/standby.png'
         celeryapp.conf.update(
             CELERY_ALWAYS_EAGER=True,
             CELERY_RESULT_BACKEND='',
             CELERY_BROKER_URL='',
         )
 
-    def download_image(self, image_url, image_path):
-        system('curl {} > {}'.format(image_url, image_path))
-
 
 class TestCleanup(CeleryTasksTestCase):
     def setUp(self):
         super(TestCleanup, self).setUp()
         self.assets_path = path.join(getenv('HOME'), 'screenly_assets')
-        self.image_path = path.join(self.assets_path, 'image.tmp')
+        makedirs(self.assets_path, exist_ok=True)
+
+    def create_file(self, name, age=STALE_FILE_AGE + 60):
+        file_path = path.join(self.assets_path, name)
+        with open(file_path, 'wb') as f:
+            f.write(b'image')
+        mtime = time.time() - age
+        utime(file_path, (mtime, mtime))
+        return file_path
 
     def test_cleanup(self):
+        self.create_file('image.tmp')
         cleanup.apply()
         tmp_files = [
             x for x in listdir(self.assets_path) if x.endswith('.tmp')
         ]
         self.assertEqual(len(tmp_files), 0)
 
-    def tearDown(self):
-        self.download_image(self.image_url, self.image_path)
+    def test_files_being_written_are_kept(self):
+        file_path = self.create_file('image.png.thumb.jpg.tmp', age=0)
+        self.addCleanup(lambda: path.exists(file_path) and remove(file_path))
+
+        cleanup.apply()
+
+        self.assertTrue(path.isfile(file_path))
+
+    def test_pending_uploads_are_kept(self):
+        file_path = self.create_file('upload.tmp')
+        asset = Asset.objects.create(
+            name='upload', uri=file_path, is_processing=True
+        )
+
+        cleanup.apply()
+
+        self.assertTrue(path.isfile(file_path))
+        asset.is_processing = False
+        asset.save()
+        cleanup.apply()
+        self.assertFalse(path.exists(file_path))
+
+
+@mock.patch('celery_tasks.device_info.record_history')
+@mock.patch('celery_tasks.device_info.collect', return_value={})
+@mock.patch('celery_tasks.r')
+class TestCollectDeviceInfo(CeleryTasksTestCase):
+    def test_slow_values_are_sampled_apart(
+        self, redis_mock, collect_mock, record_history_mock
+    ):
+        collect_device_info.apply()
+        names = collect_mock.call_args.kwargs['names']
+        self.assertIn('cpu_usage', names)
+        self.assertNotIn('ip_addresses', names)
+        record_history_mock.assert_called_once()
+
+        collect_slow_device_info.apply()
+        self.assertEqual(
+            set(collect_mock.call_args.kwargs['names']),
+            {'ip_addresses', 'mac_address', 'up_to_date'},
+        )
+
+    def test_samples_are_not_held_up_by_slow_values(
+        self, redis_mock, collect_mock, record_history_mock
+    ):
+        # The slow values are still being sampled.
+        redis_mock.set.side_effect = lambda key, *args, **kwargs: (
+            key != 'device_info_slow_lock'
+        )
+
+        collect_device_info.apply()
+        collect_slow_device_info.apply()
+
+        collect_mock.assert_called_once()
+        record_history_mock.assert_called_once()
+
+
+class TestBackfillMediaInfo(CeleryTasksTestCase):
+    @mock.patch('celery_tasks.probe_media')
+    def test_videos_without_media_info_are_probed(self, probe_media_mock):
+        for name in ['probed', 'unprobed', 'shared']:
+            Asset.objects.create(
+                name=name,
+                uri='/data/probed.mp4' if name == 'probed' else '/data/a.mp4',
+                mimetype='video',
+                duration=10,
+            )
+        Asset.objects.create(
+            name='image', uri='/data/image.png', mimetype='image', duration=10
+        )
+        MediaInfo.objects.create(uri='/data/probed.mp4')
+
+        backfill_media_info.apply()
+
+        probe_media_mock.delay.assert_called_once_with('/data/a.mp4')
+
+
+@mock.patch('celery_tasks.metrics.TASK_DURATION')
+@mock.patch('celery_tasks.r', new_callable=FakeRedis)
+class TestTaskDuration(CeleryTasksTestCase):
+    def test_task_killed_by_time_limit_is_recorded(self, redis, duration_mock):
+        record_task_start(task_id='task-id')
+        # Reported by the main worker process, without task_postrun.
+        record_failed_task_duration(sender=cleanup, task_id='task-id')
+        record_task_duration(task_id='task-id', task=cleanup, state='FAILURE')
+
+        duration_mock.observe_to.assert_called_once_with(
+            redis, mock.ANY, cleanup.name, 'FAILURE'
+        )
+        self.assertEqual(redis.values, {})
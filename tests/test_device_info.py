@@ -0,0 +1,145 @@
+import shutil
+import tempfile
+from collections import namedtuple
+from os import path
+from unittest import TestCase, mock
+
+from lib import device_info
+from lib.timeseries import TimeSeries
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.values = {}
+
+    def getset(self, key, value):
+        previous = self.values.get(key)
+        self.values[key] = value
+        return previous
+
+    def hmget(self, key, names):
+        return [self.hashes.get(key, {}).get(name) for name in names]
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+
+class DeviceInfoTest(TestCase):
+    def setUp(self):
+        self.r = FakeRedis()
+        self.collectors = {
+            'cpu_usage': mock.Mock(return_value=12.5),
+            'ip_addresses': mock.Mock(return_value=['http://10.0.0.2']),
+        }
+        intervals_patch = mock.patch.dict(
+            device_info.INTERVALS, {'cpu_usage': 5, 'ip_addresses': 300}
+        )
+        intervals_patch.start()
+        self.addCleanup(intervals_patch.stop)
+
+        collectors_patch = mock.patch.object(
+            device_info, 'COLLECTORS', self.collectors
+        )
+        collectors_patch.start()
+        self.addCleanup(collectors_patch.stop)
+
+    def test_values_are_sampled_on_their_own_cadence(self):
+        self.assertEqual(
+            device_info.collect(self.r, now=1000),
+            {'cpu_usage': 12.5, 'ip_addresses': ['http://10.0.0.2']},
+        )
+        self.assertEqual(device_info.collect(self.r, now=1002), {})
+        self.assertEqual(
+            device_info.collect(self.r, now=1010), {'cpu_usage': 12.5}
+        )
+        self.assertEqual(self.collectors['ip_addresses'].call_count, 1)
+
+        values, ages = device_info.get_snapshot(
+            self.r, ['cpu_usage', 'ip_addresses'], now=1012
+        )
+        self.assertEqual(
+            values,
+            {'cpu_usage': 12.5, 'ip_addresses': ['http://10.0.0.2']},
+        )
+        self.assertEqual(ages, {'cpu_usage': 2, 'ip_addresses': 12})
+
+    def test_failing_collector_keeps_previous_value(self):
+        device_info.collect(self.r, now=1000)
+        self.collectors['cpu_usage'].side_effect = OSError('no /proc')
+
+        self.assertEqual(
+            list(device_info.collect(self.r, now=1010, force=True)),
+            ['ip_addresses'],
+        )
+        values, ages = device_info.get_snapshot(
+            self.r, ['cpu_usage'], now=1010
+        )
+        self.assertEqual(values, {'cpu_usage': 12.5})
+        self.assertEqual(ages, {'cpu_usage': 10})
+
+    def test_only_the_given_values_are_sampled(self):
+        self.assertEqual(
+            device_info.collect(self.r, now=1000, names=['cpu_usage']),
+            {'cpu_usage': 12.5},
+        )
+        self.collectors['ip_addresses'].assert_not_called()
+
+    def test_missing_values_have_no_age(self):
+        values, ages = device_info.get_snapshot(self.r, ['memory'])
+        self.assertEqual(values, {'memory': None})
+        self.assertEqual(ages, {'memory': None})
+
+
+class CpuUsageTest(TestCase):
+    def cpu_times(self, user, idle, iowait=0):
+        return mock.Mock(
+            return_value=namedtuple('scputimes', ['user', 'idle', 'iowait'])(
+                user, idle, iowait
+            )
+        )
+
+    @mock.patch('psutil.cpu_percent', return_value=7.0)
+    def test_usage_between_samples(self, cpu_percent_mock):
+        r = FakeRedis()
+
+        with mock.patch('psutil.cpu_times', self.cpu_times(10, 90)):
+            self.assertEqual(device_info.get_cpu_usage(r), 7.0)
+        with mock.patch('psutil.cpu_times', self.cpu_times(40, 150, 10)):
+            self.assertEqual(device_info.get_cpu_usage(r), 30.0)
+
+        cpu_percent_mock.assert_called_once_with(
+            interval=device_info.CPU_USAGE_INTERVAL
+        )
+
+
+class RecordHistoryTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.history = TimeSeries(
+            path.join(self.tmp_dir, 'health.rrd'),
+            device_info.HISTORY_METRICS,
+            device_info.HISTORY_STEP,
+            device_info.HISTORY_SLOTS,
+        )
+        self.addCleanup(self.history.close)
+
+        history_patch = mock.patch.object(
+            device_info, 'get_history', return_value=self.history
+        )
+        history_patch.start()
+        self.addCleanup(history_patch.stop)
+
+    def test_throttle_state_is_recorded_as_flags(self):
+        # Under-voltage, then throttled, then under-voltage in the past.
+        for i, state in enumerate([0x1, 0x4, 0x10000, None]):
+            device_info.record_history({'throttle_state': state}, 1000 + i * 5)
+
+        metrics = self.history.query(1000, 1020, buckets=1)['metrics']
+        self.assertEqual(
+            metrics['under_voltage'],
+            {'min': [0], 'avg': [0.33], 'max': [1]},
+        )
+        self.assertEqual(metrics['throttled']['max'], [1])
+        self.assertEqual(metrics['freq_capped']['max'], [0])
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import shutil
+import tempfile
+from os import listdir, path
+
+import mock
+from django.test import TestCase
+from PIL import Image
+
+from anthias_app.models import Asset, MediaInfo
+from api.helpers import remove_asset_files
+from celery_tasks import ingest_asset
+from lib import asset_store, ingest, jobs, notifications, thumbnails
+from lib.errors import IngestError
+from settings import settings
+from tests.test_jobs import FakeRedis
+from tests.test_media_info import ffprobe_result
+
+
+class IngestTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+        settings_patch = mock.patch.dict(settings, {'assetdir': self.tmp_dir})
+        settings_patch.start()
+        self.addCleanup(settings_patch.stop)
+
+        self.redis = FakeRedis()
+        redis_patch = mock.patch('celery_tasks.r', self.redis)
+        redis_patch.start()
+        self.addCleanup(redis_patch.stop)
+
+    def create_asset(self, **fields):
+        return Asset.objects.create(
+            **{
+                'name': 'Asset',
+                'mimetype': 'image',
+                'duration': 10,
+                'is_enabled': True,
+                'is_processing': True,
+                'skip_asset_check': True,
+                **fields,
+            }
+        )
+
+    def upload_image(self):
+        upload_path = path.join(self.tmp_dir, 'upload.tmp')
+        Image.new('RGB', (64, 48), 'red').save(upload_path, 'PNG')
+        with open(upload_path, 'rb') as f:
+            md5 = hashlib.md5(f.read()).hexdigest()
+        return upload_path, md5
+
+    def run_job(self, asset, ext=''):
+        job = jobs.Job.create(self.redis, 'ingest')
+        try:
+            ingest_asset(job.id, asset.asset_id, ext)
+        except Exception:
+            pass
+        return jobs.Job.get(self.redis, job.id)
+
+    def test_upload_is_stored_and_published(self):
+        upload_path, md5 = self.upload_image()
+        asset = self.create_asset(uri=upload_path)
+
+        job = self.run_job(asset, '.png')
+
+        self.assertEqual(job['state'], jobs.SUCCEEDED)
+        self.assertEqual(job['result'], {'asset_id': asset.asset_id})
+        asset.refresh_from_db()
+        self.assertFalse(asset.is_processing)
+        self.assertEqual(asset.md5, md5)
+        self.assertEqual(asset.uri, path.join(self.tmp_dir, f'{md5}.png'))
+        self.assertTrue(path.isfile(thumbnails.thumbnail_path(asset.uri)))
+
+        messages = [message for _, message in self.redis.published]
+        stages = [
+            json.loads(message)['data']['stage'] for message in messages[:-1]
+        ]
+        self.assertEqual(stages, ingest.STAGES + ['done'])
+        self.assertEqual(messages[-1], asset.asset_id)
+        self.assertNotIn(' ', messages[0])
+
+    def test_shared_file_is_not_stored_again(self):
+        upload_path, md5 = self.upload_image()
+        first = self.create_asset(uri=upload_path)
+        self.run_job(first, '.png')
+        first.refresh_from_db()
+        second = self.create_asset(uri=first.uri)
+
+        self.run_job(second, '.png')
+
+        second.refresh_from_db()
+        self.assertEqual(second.uri, first.uri)
+        self.assertEqual(second.md5, md5)
+
+    def test_stored_file_is_kept_when_last_asset_is_deleted(self):
+        upload_path, md5 = self.upload_image()
+        first = self.create_asset(uri=upload_path)
+        self.run_job(first, '.png')
+        first.refresh_from_db()
+        upload_path, _ = self.upload_image()
+        second = self.create_asset(uri=upload_path)
+        add_file = asset_store.add_file
+
+        def add_file_while_deleting(*args, **kwargs):
+            # The first asset, the last one using the stored file, is
+            # deleted right as the second one is stored.
+            stored = add_file(*args, **kwargs)
+            first.delete()
+            remove_asset_files(first.uri)
+            return stored
+
+        with mock.patch(
+            'lib.ingest.asset_store.add_file',
+            side_effect=add_file_while_deleting,
+        ):
+            job = self.run_job(second, '.png')
+
+        self.assertEqual(job['state'], jobs.SUCCEEDED)
+        second.refresh_from_db()
+        self.assertEqual(second.uri, first.uri)
+        self.assertTrue(path.isfile(second.uri))
+
+    @mock.patch('lib.ingest.url_fails', return_value=True)
+    def test_failing_url_discards_asset(self, url_fails_mock):
+        asset = self.create_asset(
+            uri='https://example.com', mimetype='webpage', skip_asset_check=0
+        )
+
+        job = self.run_job(asset)
+
+        self.assertEqual(job['state'], jobs.FAILED)
+        self.assertIn('Check the asset URL', job['error'])
+        self.assertFalse(Asset.objects.exists())
+        self.assertEqual(self.redis.published[-1][1], asset.asset_id)
+
+    @mock.patch('celery_tasks.build_keyframe_index')
+    @mock.patch('lib.ingest.thumbnails.generate_thumbnail')
+    @mock.patch('subprocess.run', return_value=ffprobe_result())
+    def test_video_duration_is_probed(self, run_mock, thumbnail_mock, _):
+        video_path = path.join(self.tmp_dir, 'video.mp4')
+        with open(video_path, 'wb') as f:
+            f.write(b'video')
+        asset = self.create_asset(uri=video_path, mimetype='video', duration=0)
+
+        self.run_job(asset, '.mp4')
+
+        asset.refresh_from_db()
+        self.assertEqual(asset.duration, 12)
+        self.assertEqual(MediaInfo.objects.get(uri=asset.uri).width, 1920)
+
+    @mock.patch('lib.ingest.fetch_youtube_video')
+    @mock.patch(
+        'lib.ingest.get_youtube_info',
+        return_value={'title': 'A video', 'duration': 42},
+    )
+    def test_youtube_video_is_downloaded(self, info_mock, fetch_mock):
+        asset = self.create_asset(
+            uri='https://www.youtube.com/watch?v=1', mimetype='youtube_asset'
+        )
+        location = path.join(self.tmp_dir, 'download.mp4')
+
+        def fetch(uri, output_path, timeout):
+            with open(output_path, 'wb') as f:
+                f.write(b'video')
+
+        fetch_mock.side_effect = fetch
+
+        with (
+            mock.patch(
+                'lib.ingest.get_youtube_location', return_value=location
+            ),
+            mock.patch.object(ingest.Ingest, 'probe'),
+            mock.patch.object(ingest.Ingest, 'thumbnail'),
+        ):
+            ingest.Ingest(asset).run()
+
+        asset.refresh_from_db()
+        self.assertEqual(asset.name, 'A video')
+        self.assertEqual(asset.mimetype, 'video')
+        self.assertEqual(asset.duration, 42)
+        self.assertEqual(
+            asset.uri, path.join(self.tmp_dir, f'{asset.md5}.mp4')
+        )
+
+    def test_deleted_asset_is_not_brought_back(self):
+        upload_path, _ = self.upload_image()
+        asset = self.create_asset(uri=upload_path)
+        pipeline = ingest.Ingest(asset, '.png')
+        Asset.objects.all().delete()
+
+        with self.assertRaises(IngestError):
+            pipeline.run()
+        self.assertFalse(Asset.objects.exists())
+
+    def test_missing_upload(self):
+        asset = self.create_asset(uri=path.join(self.tmp_dir, 'missing'))
+
+        with self.assertRaisesRegex(IngestError, 'Invalid file path'):
+            ingest.Ingest(asset).validate()
+
+        self.assertEqual(listdir(self.tmp_dir), [])
+
+
+class NotificationsTest(TestCase):
+    def test_relay(self):
+        r = mock.MagicMock()
+        r.pubsub.return_value.listen.return_value = [
+            {'type': 'message', 'data': 'abc'}
+        ]
+        publisher = mock.MagicMock()
+
+        notifications.relay(r, publisher)
+
+        r.pubsub.return_value.subscribe.assert_called_once_with(
+            notifications.CHANNEL
+        )
+        publisher.send_to_ws_server.assert_called_once_with('abc')
@@ -0,0 +1,95 @@
+import unittest
+
+from lib import jobs
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.values = {}
+        self.ttls = {}
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        if ex is not None:
+            self.ttls[key] = ex
+        return True
+
+    def getdel(self, key):
+        self.ttls.pop(key, None)
+        return self.values.pop(key, None)
+
+    def expire(self, key, ttl):
+        self.ttls[key] = ttl
+
+    def execute(self):
+        pass
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class JobTest(unittest.TestCase):
+    def setUp(self):
+        self.r = FakeRedis()
+
+    def test_create(self):
+        job = jobs.Job.create(self.r, 'backup')
+
+        data = jobs.Job.get(self.r, job.id)
+        self.assertEqual(data['id'], job.id)
+        self.assertEqual(data['kind'], 'backup')
+        self.assertEqual(data['state'], jobs.PENDING)
+        self.assertEqual(data['progress'], 0)
+        self.assertEqual(self.r.ttls[job.key], jobs.TTL)
+
+    def test_missing_job(self):
+        self.assertIsNone(jobs.Job.get(self.r, 'nope'))
+
+    def test_succeeds(self):
+        job = jobs.Job.create(self.r, 'backup')
+
+        with jobs.Job(self.r, job.id) as running:
+            self.assertEqual(
+                jobs.Job.get(self.r, job.id)['state'], jobs.RUNNING
+            )
+            running.set_progress(1.5, 'Almost')
+            self.assertEqual(jobs.Job.get(self.r, job.id)['progress'], 1)
+            running.succeed({'file': 'backup.tar'})
+
+        data = jobs.Job.get(self.r, job.id)
+        self.assertEqual(data['state'], jobs.SUCCEEDED)
+        self.assertEqual(data['message'], 'Almost')
+        self.assertEqual(data['result'], {'file': 'backup.tar'})
+
+    def test_fails_on_exception(self):
+        job = jobs.Job.create(self.r, 'backup')
+
+        with self.assertRaises(OSError):
+            with jobs.Job(self.r, job.id):
+                raise OSError('No space left on device')
+
+        data = jobs.Job.get(self.r, job.id)
+        self.assertEqual(data['state'], jobs.FAILED)
+        self.assertEqual(data['error'], 'No space left on device')
+
+    def test_progress_is_throttled(self):
+        job = jobs.Job.create(self.r, 'backup')
+        job.set_progress(0.5)
+        job.set_progress(0.505)
+        self.assertEqual(jobs.Job.get(self.r, job.id)['progress'], 0.5)
+
+        job.set_progress(0.505, 'Compressing')
+        self.assertEqual(jobs.Job.get(self.r, job.id)['progress'], 0.505)
@@ -0,0 +1,59 @@
+import shutil
+import tempfile
+import unittest
+from os import path
+
+from lib import keyframes
+
+
+class KeyframeIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.video_path = path.join(self.tmp_dir, 'video.mp4')
+        self.frames = [b'frame-%d' % i for i in range(4)]
+        keyframes.write_index(
+            keyframes.index_path(self.video_path),
+            self.frames,
+            interval=5,
+            width=320,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_read_frame_picks_frame_for_position(self):
+        self.assertEqual(
+            keyframes.read_frame(self.video_path, 0), (b'frame-0', 320)
+        )
+        self.assertEqual(
+            keyframes.read_frame(self.video_path, 12.5), (b'frame-2', 320)
+        )
+
+    def test_read_frame_clamps_to_last_frame(self):
+        self.assertEqual(
+            keyframes.read_frame(self.video_path, 600), (b'frame-3', 320)
+        )
+
+    def test_write_index_accepts_frame_files(self):
+        frame_path = path.join(self.tmp_dir, '000001.jpg')
+        with open(frame_path, 'wb') as f:
+            f.write(b'from-file')
+
+        keyframes.write_index(
+            keyframes.index_path(self.video_path), [frame_path]
+        )
+
+        self.assertEqual(
+            keyframes.read_frame(self.video_path, 30),
+            (b'from-file', keyframes.KEYFRAME_WIDTH),
+        )
+
+    def test_read_frame_without_index(self):
+        keyframes.remove_index(self.video_path)
+        self.assertIsNone(keyframes.read_frame(self.video_path, 0))
+
+    def test_read_frame_rejects_foreign_file(self):
+        with open(keyframes.index_path(self.video_path), 'wb') as f:
+            f.write(b'not an index at all')
+
+        self.assertIsNone(keyframes.read_frame(self.video_path, 0))
@@ -0,0 +1,104 @@
+import multiprocessing
+import socket
+import time
+import unittest
+from os import getenv
+from unittest import mock
+
+import requests
+
+import run_gunicorn
+from tools import load_test
+
+SLOW_REQUEST_TIME = 0.5  # seconds
+
+
+def application(environ, start_response):
+    if environ['PATH_INFO'] == '/slow':
+        time.sleep(SLOW_REQUEST_TIME)
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'ok']
+
+
+class TestApplication(run_gunicorn.GunicornApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def init(self, parser, opts, args):
+        return self.options
+
+    def load(self):
+        return application
+
+
+def serve(options):
+    with mock.patch('sys.argv', ['gunicorn']):
+        TestApplication(options).run()
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# It starts real servers, and times them, so it depends on the machine.
+@unittest.skipUnless(
+    getenv('RUN_BENCHMARKS'), 'Set RUN_BENCHMARKS to run the benchmarks'
+)
+class LoadTest(unittest.TestCase):
+    def _run(self, options):
+        port = get_free_port()
+        url = f'http://127.0.0.1:{port}'
+        options = {**options, 'bind': f'127.0.0.1:{port}', 'loglevel': 'error'}
+        server = multiprocessing.Process(target=serve, args=(options,))
+        server.start()
+        self.addCleanup(server.join)
+        self.addCleanup(server.terminate)
+
+        for _ in range(100):
+            try:
+                requests.get(url + '/fast', timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+
+        return load_test.run(
+            url,
+            '/slow',
+            '/fast',
+            slow_clients=4,
+            fast_clients=4,
+            duration=3,
+        )
+
+    def test_slow_requests_do_not_hold_up_fast_ones(self):
+        with mock.patch.dict('os.environ', clear=False) as environ:
+            environ.pop('GUNICORN_THREADS', None)
+            options = run_gunicorn.get_options('pi4')
+        before = self._run({'threads': 2, 'timeout': 20})
+        after = self._run(options)
+
+        self.assertEqual(before['fast']['errors'], 0)
+        self.assertEqual(after['fast']['errors'], 0)
+        self.assertGreater(
+            after['fast']['throughput'], 3 * before['fast']['throughput']
+        )
+        self.assertLess(after['fast']['p95'], SLOW_REQUEST_TIME)
+
+
+class GetOptionsTest(unittest.TestCase):
+    def test_threads_depend_on_device(self):
+        with mock.patch.dict('os.environ', clear=False) as environ:
+            environ.pop('GUNICORN_THREADS', None)
+            self.assertEqual(run_gunicorn.get_options('pi1')['threads'], 2)
+            self.assertEqual(run_gunicorn.get_options('pi5')['threads'], 12)
+
+    def test_environment_overrides(self):
+        with mock.patch.dict(
+            'os.environ', {'GUNICORN_THREADS': '3', 'GUNICORN_TIMEOUT': '60'}
+        ):
+            options = run_gunicorn.get_options('pi4')
+        self.assertEqual(options['threads'], 3)
+        self.assertEqual(options['timeout'], 60)
@@ -0,0 +1,134 @@
+import json
+import subprocess
+import unittest
+from datetime import timedelta
+
+import mock
+from django.test import TestCase
+
+from anthias_app.models import MediaInfo
+from lib import media_info
+from lib.errors import MediaProbeError
+from lib.utils import get_video_duration
+
+FFPROBE_OUTPUT = {
+    'streams': [
+        {
+            'codec_type': 'video',
+            'codec_name': 'h264',
+            'width': 1920,
+            'height': 1080,
+            'avg_frame_rate': '30000/1001',
+            'r_frame_rate': '30000/1001',
+            'disposition': {'attached_pic': 0},
+        },
+        {
+            'codec_type': 'audio',
+            'codec_name': 'aac',
+            'disposition': {'attached_pic': 0},
+        },
+    ],
+    'format': {
+        'format_name': 'mov,mp4,m4a,3gp,3g2,mj2',
+        'duration': '12.512000',
+        'bit_rate': '2500000',
+    },
+}
+
+
+def ffprobe_result(output=FFPROBE_OUTPUT, returncode=0):
+    return subprocess.CompletedProcess(
+        [], returncode, json.dumps(output).encode(), b'Invalid data'
+    )
+
+
+class ParseTest(unittest.TestCase):
+    def test_video_with_audio(self):
+        self.assertEqual(
+            media_info.parse(FFPROBE_OUTPUT),
+            {
+                'format_name': 'mov,mp4,m4a,3gp,3g2,mj2',
+                'duration': 12.512,
+                'bit_rate': 2500000,
+                'video_codec': 'h264',
+                'width': 1920,
+                'height': 1080,
+                'frame_rate': 30000 / 1001,
+                'audio_codec': 'aac',
+            },
+        )
+
+    def test_cover_art_is_not_video(self):
+        output = {
+            'streams': [
+                {
+                    'codec_type': 'video',
+                    'codec_name': 'mjpeg',
+                    'avg_frame_rate': '0/0',
+                    'disposition': {'attached_pic': 1},
+                },
+                {
+                    'codec_type': 'audio',
+                    'codec_name': 'mp3',
+                    'duration': '3.5',
+                },
+            ],
+            'format': {'format_name': 'mp3'},
+        }
+
+        info = media_info.parse(output)
+
+        self.assertIsNone(info['video_codec'])
+        self.assertIsNone(info['frame_rate'])
+        self.assertEqual(info['audio_codec'], 'mp3')
+        self.assertEqual(info['duration'], 3.5)
+
+    def test_unknown_fields(self):
+        info = media_info.parse({})
+
+        self.assertEqual(set(info.values()), {None})
+
+
+class ProbeTest(unittest.TestCase):
+    @mock.patch('subprocess.run', return_value=ffprobe_result())
+    def test_probe_asks_for_json(self, run_mock):
+        self.assertEqual(
+            media_info.probe('/videos/a.mp4')['video_codec'], 'h264'
+        )
+        args = run_mock.call_args.args[0]
+        self.assertEqual(args[0], 'ffprobe')
+        self.assertIn('json', args)
+        self.assertEqual(args[-1], '/videos/a.mp4')
+
+    @mock.patch('subprocess.run', return_value=ffprobe_result(returncode=1))
+    def test_probe_failure(self, run_mock):
+        with self.assertRaisesRegex(MediaProbeError, 'Invalid data'):
+            media_info.probe('/videos/a.mp4')
+
+    @mock.patch('subprocess.run', side_effect=FileNotFoundError('ffprobe'))
+    def test_missing_ffprobe(self, run_mock):
+        with self.assertRaises(MediaProbeError):
+            media_info.probe('/videos/a.mp4')
+
+
+class GetMediaInfoTest(TestCase):
+    @mock.patch('subprocess.run', return_value=ffprobe_result())
+    def test_probed_once(self, run_mock):
+        info = media_info.get_media_info('/videos/a.mp4')
+
+        self.assertEqual(info.width, 1920)
+        self.assertTrue(info.has_video)
+        self.assertTrue(info.has_audio)
+        self.assertEqual(
+            get_video_duration('/videos/a.mp4'), timedelta(seconds=12.512)
+        )
+        self.assertEqual(run_mock.call_count, 1)
+
+        media_info.remove_media_info('/videos/a.mp4')
+        self.assertFalse(MediaInfo.objects.exists())
+
+    @mock.patch('subprocess.run', return_value=ffprobe_result(returncode=1))
+    def test_bad_video(self, run_mock):
+        with self.assertRaisesRegex(Exception, 'Bad video format'):
+            get_video_duration('/videos/a.mp4')
+        self.assertFalse(MediaInfo.objects.exists())
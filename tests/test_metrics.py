@@ -0,0 +1,76 @@
+import unittest
+
+from lib import metrics
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hash = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def hincrby(self, key, field, amount):
+        self.hash[field] = str(int(self.hash.get(field, 0)) + amount)
+
+    def hincrbyfloat(self, key, field, amount):
+        self.hash[field] = str(float(self.hash.get(field, 0)) + amount)
+
+    def execute(self):
+        pass
+
+    def hgetall(self, key):
+        return dict(self.hash)
+
+
+class HistogramTest(unittest.TestCase):
+    def test_render_cumulative_buckets(self):
+        histogram = metrics.Histogram(
+            'test_seconds', 'Test.', ['view'], [0.1, 1]
+        )
+        for value in [0.05, 0.5, 0.7, 3]:
+            histogram.observe(value, 'a"b')
+
+        self.assertEqual(
+            histogram.render(),
+            [
+                '# TYPE test_seconds histogram',
+                '# HELP test_seconds Test.',
+                'test_seconds_bucket{view="a\\"b",le="0.1"} 1',
+                'test_seconds_bucket{view="a\\"b",le="1.0"} 3',
+                'test_seconds_bucket{view="a\\"b",le="+Inf"} 4',
+                'test_seconds_count{view="a\\"b"} 4',
+                'test_seconds_sum{view="a\\"b"} 4.25',
+            ],
+        )
+
+    def test_redis_histogram_round_trip(self):
+        r = FakeRedis()
+        histogram = metrics.RedisHistogram(
+            'task_seconds', 'Test.', ['task', 'state'], [1, 10]
+        )
+        histogram.observe_to(r, 0.5, 'cleanup', 'SUCCESS')
+        histogram.observe_to(r, 20, 'cleanup', 'SUCCESS')
+
+        histogram.load(r)
+
+        self.assertIn(
+            'task_seconds_bucket{task="cleanup",state="SUCCESS",le="10.0"} 1',
+            histogram.render(),
+        )
+        self.assertIn(
+            'task_seconds_count{task="cleanup",state="SUCCESS"} 2',
+            histogram.render(),
+        )
+
+    def test_render_ends_with_eof(self):
+        text = metrics.render(
+            [metrics.render_gauge('test_gauge', 'Test.', 1.5)]
+        )
+        self.assertEqual(
+            text,
+            '# TYPE test_gauge gauge\n'
+            '# HELP test_gauge Test.\n'
+            'test_gauge 1.5\n'
+            '# EOF\n',
+        )
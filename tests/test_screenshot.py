@@ -0,0 +1,187 @@
+import io
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from os import path
+
+import mock
+from PIL import Image
+
+from lib import screenshot
+from lib.errors import FramebufferUnavailableError
+from lib.screenshot import (
+    FrameBroadcaster,
+    SingleFlightCache,
+    capture_framebuffer,
+)
+
+
+class SingleFlightCacheTest(unittest.TestCase):
+    def test_concurrent_misses_share_one_computation(self):
+        cache = SingleFlightCache(ttl=5)
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(1)
+            return b'jpeg'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    cache.get_or_compute('key', compute)
+                )
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b'jpeg'] * 8)
+
+    def test_entries_expire_after_ttl(self):
+        cache = SingleFlightCache(ttl=0)
+        cache.get_or_compute('key', lambda: b'first')
+        self.assertEqual(
+            cache.get_or_compute('key', lambda: b'second'), b'second'
+        )
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = SingleFlightCache(ttl=60, max_entries=2)
+        cache.get_or_compute('a', lambda: b'a')
+        cache.get_or_compute('b', lambda: b'b')
+        cache.get('a')
+        cache.get_or_compute('c', lambda: b'c')
+
+        self.assertEqual(cache.get('a'), b'a')
+        self.assertIsNone(cache.get('b'))
+
+    def test_errors_are_propagated_and_not_cached(self):
+        cache = SingleFlightCache(ttl=60)
+
+        def fail():
+            raise ValueError('capture failed')
+
+        with self.assertRaises(ValueError):
+            cache.get_or_compute('key', fail)
+        self.assertEqual(cache.get_or_compute('key', lambda: b'ok'), b'ok')
+
+
+class FrameBroadcasterTest(unittest.TestCase):
+    def setUp(self):
+        self.captures = []
+
+        def capture():
+            self.captures.append(1)
+            return b'frame-%d' % len(self.captures)
+
+        self.broadcaster = FrameBroadcaster(capture, interval=0.01)
+
+    def wait_for_producer_to_stop(self):
+        for _ in range(100):
+            if self.broadcaster._thread is None:
+                return
+            time.sleep(0.01)
+        self.fail('Producer thread did not stop')
+
+    def test_frames_are_fanned_out_to_all_subscribers(self):
+        first = self.broadcaster.subscribe()
+        second = self.broadcaster.subscribe()
+
+        self.assertTrue(first.get(timeout=1).startswith(b'frame-'))
+        self.assertTrue(second.get(timeout=1).startswith(b'frame-'))
+
+        self.broadcaster.unsubscribe(first)
+        self.broadcaster.unsubscribe(second)
+        self.wait_for_producer_to_stop()
+
+    def test_slow_subscriber_keeps_latest_frames(self):
+        frames = self.broadcaster.subscribe()
+        while len(self.captures) < 10:
+            time.sleep(0.01)
+        self.broadcaster.unsubscribe(frames)
+        self.wait_for_producer_to_stop()
+
+        self.assertEqual(frames.qsize(), 2)
+        self.assertEqual(
+            frames.get_nowait(), b'frame-%d' % (len(self.captures) - 1)
+        )
+
+    def test_producer_stops_without_subscribers(self):
+        frames = self.broadcaster.subscribe()
+        frames.get(timeout=1)
+        self.broadcaster.unsubscribe(frames)
+        self.wait_for_producer_to_stop()
+
+        captured = len(self.captures)
+        time.sleep(0.05)
+        self.assertEqual(len(self.captures), captured)
+        self.assertEqual(self.broadcaster.subscriber_count, 0)
+
+    def test_capture_errors_do_not_stop_producer(self):
+        attempts = []
+
+        def capture():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError('capture failed')
+            return b'frame'
+
+        broadcaster = FrameBroadcaster(capture, interval=0.01)
+        frames = broadcaster.subscribe()
+
+        self.assertEqual(frames.get(timeout=1), b'frame')
+        broadcaster.unsubscribe(frames)
+
+
+class CaptureFramebufferTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.fb_device = path.join(self.tmp_dir, 'fb0')
+        self.width, self.height = 64, 32
+
+        with open(path.join(self.tmp_dir, 'virtual_size'), 'w') as f:
+            f.write(f'{self.width},{self.height}')
+        with open(path.join(self.tmp_dir, 'bits_per_pixel'), 'w') as f:
+            f.write('32')
+        with open(self.fb_device, 'wb') as f:
+            # Solid red, in the BGRX layout of a 32bpp framebuffer.
+            f.write(bytes([0, 0, 255, 0]) * self.width * self.height)
+
+        patches = [
+            mock.patch.object(screenshot, 'FB_DEVICE', self.fb_device),
+            mock.patch.object(screenshot, 'FB_SYSFS_DIR', self.tmp_dir),
+            mock.patch.object(screenshot, '_geometry', None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_capture_full_size(self):
+        image = Image.open(io.BytesIO(capture_framebuffer(quality=90)))
+
+        self.assertEqual(image.size, (self.width, self.height))
+        red, green, blue = image.getpixel((10, 10))
+        self.assertGreater(red, 240)
+        self.assertLess(green + blue, 20)
+
+    def test_capture_scaled(self):
+        image = Image.open(io.BytesIO(capture_framebuffer(width=16)))
+        self.assertEqual(image.size, (16, 8))
+
+    def test_missing_framebuffer(self):
+        with mock.patch.object(screenshot, 'FB_DEVICE', '/nonexistent'):
+            with self.assertRaises(FramebufferUnavailableError):
+                capture_framebuffer()
@@ -2,9 +2,10 @@ from __future__ import unicode_literals
 
 import os
 import shutil
+import stat
 import sys
 from contextlib import contextmanager
-from unittest import TestCase
+from unittest import TestCase, mock
 
 user_home_dir = os.getenv('HOME')
 
@@ -50,6 +51,8 @@ def fake_settings(raw):
     with open(CONFIG_FILE, mode='w+') as f:
         f.write(raw)
 
+    # Import it anew, to read the fake config-file.
+    sys.modules.pop('settings', None)
     try:
         import settings
 
@@ -121,6 +124,9 @@ class SettingsTest(TestCase):
             settings['verify_ssl'] = True
             settings.save()
 
+        self.assertEqual(
+            stat.S_IMODE(os.stat(CONFIG_DIR + '/new.conf').st_mode), 0o644
+        )
         with open(CONFIG_DIR + '/new.conf') as f:
             saved = f.read()
             with fake_settings(saved) as (mod_settings, settings):
@@ -129,3 +135,63 @@ class SettingsTest(TestCase):
                 self.assertEqual(settings['verify_ssl'], True)
                 # no out of thin air changes?
                 self.assertEqual(settings['audio_output'], 'hdmi')
+
+    def test_unchanged_settings_are_not_parsed_again(self):
+        with fake_settings(settings1) as (mod_settings, settings):
+            with mock.patch.object(
+                mod_settings.configparser.ConfigParser,
+                'read',
+                autospec=True,
+            ) as read_mock:
+                settings.load()
+                self.assertEqual(read_mock.call_count, 0)
+
+                # Unsaved changes are discarded, as they always were.
+                settings['player_name'] = 'unsaved'
+                settings.load()
+                self.assertEqual(read_mock.call_count, 1)
+
+                settings.load(force=True)
+                self.assertEqual(read_mock.call_count, 2)
+
+    def test_changed_settings_are_reloaded(self):
+        with fake_settings(settings1) as (mod_settings, settings):
+            with open(CONFIG_FILE, 'w') as f:
+                f.write(settings1.replace('new player', 'other player'))
+            # The size is unchanged, but not the mtime.
+            os.utime(CONFIG_FILE, ns=(0, 0))
+
+            settings.load()
+            self.assertEqual(settings['player_name'], 'other player')
+
+    def test_snapshot_is_read_only_and_shared(self):
+        with fake_settings(settings1) as (mod_settings, settings):
+            snapshot = settings.snapshot()
+            self.assertEqual(snapshot['player_name'], 'new player')
+            self.assertIs(settings.snapshot(), snapshot)
+            with self.assertRaises(TypeError):
+                snapshot['player_name'] = 'changed'
+
+            settings['player_name'] = 'saved player'
+            settings.save()
+            self.assertEqual(
+                settings.snapshot()['player_name'], 'saved player'
+            )
+            self.assertEqual(snapshot['player_name'], 'new player')
+
+    def test_failed_save_leaves_the_file_intact(self):
+        with fake_settings(settings1) as (mod_settings, settings):
+            settings['player_name'] = 'lost player'
+            with mock.patch.object(
+                mod_settings.configparser.ConfigParser,
+                'write',
+                side_effect=OSError('No space left on device'),
+            ):
+                with self.assertRaises(OSError):
+                    settings.save()
+
+            with open(CONFIG_FILE) as f:
+                self.assertIn('new player', f.read())
+            self.assertFalse(
+                [name for name in os.listdir(CONFIG_DIR) if '.tmp' in name]
+            )
@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+import unittest
+from os import path
+
+from PIL import Image
+
+from lib import thumbnails
+
+
+class ImageThumbnailTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.image_path = path.join(self.tmp_dir, 'image.png')
+        Image.new('RGBA', (1920, 1080), (255, 0, 0, 255)).save(self.image_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_generate_image_thumbnail(self):
+        thumbnail_path = thumbnails.generate_thumbnail(
+            self.image_path, 'image'
+        )
+
+        self.assertEqual(
+            thumbnail_path, thumbnails.thumbnail_path(self.image_path)
+        )
+        with Image.open(thumbnail_path) as thumbnail:
+            self.assertEqual(thumbnail.format, 'JPEG')
+            self.assertEqual(thumbnail.size, (320, 180))
+        self.assertFalse(path.exists(f'{thumbnail_path}.tmp'))
+
+    def test_other_assets_have_no_thumbnail(self):
+        self.assertIsNone(
+            thumbnails.generate_thumbnail('https://example.com', 'webpage')
+        )
+
+    def test_remove_thumbnail(self):
+        thumbnail_path = thumbnails.generate_thumbnail(
+            self.image_path, 'image'
+        )
+        thumbnails.remove_thumbnail(self.image_path)
+        thumbnails.remove_thumbnail(self.image_path)
+
+        self.assertFalse(path.exists(thumbnail_path))
@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+import unittest
+from os import path
+
+from lib.timeseries import TimeSeries
+
+
+class TimeSeriesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = path.join(self.tmp_dir, 'health.rrd')
+        self.series = TimeSeries(
+            self.file_path, ['temp', 'usage'], step=5, slots=10
+        )
+
+    def tearDown(self):
+        self.series.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_file_size_is_fixed(self):
+        for i in range(100):
+            self.series.add({'temp': i, 'usage': i}, 1000 + i * 5)
+
+        self.assertEqual(path.getsize(self.file_path), self.series.file_size)
+
+    def test_query_downsamples_into_buckets(self):
+        for i, temp in enumerate([40, 50, 60, 70]):
+            self.series.add({'temp': temp, 'usage': None}, 1000 + i * 5)
+
+        result = self.series.query(1000, 1020, buckets=2)
+
+        self.assertEqual(result['time'], [1000, 1010])
+        self.assertEqual(
+            result['metrics']['temp'],
+            {'min': [40, 60], 'avg': [45, 65], 'max': [50, 70]},
+        )
+        self.assertEqual(
+            result['metrics']['usage'],
+            {'min': [None, None], 'avg': [None, None], 'max': [None, None]},
+        )
+
+    def test_overwritten_records_are_skipped(self):
+        self.series.add({'temp': 1}, 1000)
+        # Ten slots later, the same slot is reused.
+        self.series.add({'temp': 2}, 1050)
+
+        old = self.series.query(1000, 1005, buckets=1, metrics=['temp'])
+        new = self.series.query(1050, 1055, buckets=1, metrics=['temp'])
+
+        self.assertEqual(old['metrics']['temp']['max'], [None])
+        self.assertEqual(new['metrics']['temp']['max'], [2])
+
+    def test_gaps_are_empty(self):
+        self.series.add({'temp': 1}, 1000)
+        self.series.add({'temp': 3}, 1020)
+
+        result = self.series.query(1000, 1025, buckets=5, metrics=['temp'])
+
+        self.assertEqual(
+            result['metrics']['temp']['avg'], [1, None, None, None, 3]
+        )
+
+    def test_file_with_other_layout_is_recreated(self):
+        self.series.add({'temp': 1}, 1000)
+        self.series.close()
+
+        other = TimeSeries(self.file_path, ['temp'], step=5, slots=20)
+        self.assertFalse(other.open())
+
+        other.add({'temp': 2}, 1000)
+        result = other.query(1000, 1005, buckets=1)
+        other.close()
+
+        self.assertEqual(result['metrics']['temp']['avg'], [2])
+        self.assertEqual(path.getsize(self.file_path), other.file_size)
+
+    def test_query_without_file(self):
+        result = self.series.query(1000, 1010, buckets=2)
+        self.assertEqual(result['metrics']['temp']['avg'], [None, None])
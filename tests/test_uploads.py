@@ -0,0 +1,95 @@
+import hashlib
+import io
+import shutil
+import tempfile
+import unittest
+from os import listdir, path, utime
+
+from lib import uploads
+from lib.errors import UploadSessionError, UploadSessionNotFoundError
+from lib.uploads import UploadSession
+
+
+class UploadSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.upload_dir = path.join(self.tmp_dir, '.uploads')
+        self.content = bytes(range(256)) * 40
+        self.session = UploadSession.create(
+            self.upload_dir, 'video.mp4', len(self.content)
+        )
+        uploads._hashers.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, start, end, session=None):
+        session = session or UploadSession.get(
+            self.upload_dir, self.session.upload_id
+        )
+        session.write_chunk(start, end, io.BytesIO(self.content[start:end]))
+        return session
+
+    def test_out_of_order_chunks(self):
+        self.write(8000, len(self.content))
+        session = self.write(0, 4000)
+        self.assertEqual(
+            session.received, [[0, 4000], [8000, len(self.content)]]
+        )
+        self.assertFalse(session.is_complete)
+
+        session = self.write(4000, 8000)
+        self.assertTrue(session.is_complete)
+
+        output_path = path.join(self.tmp_dir, 'video.tmp')
+        md5 = session.finalize(output_path)
+
+        with open(output_path, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(md5, hashlib.md5(self.content).hexdigest())
+        self.assertEqual(uploads.read_md5(output_path), md5)
+        self.assertEqual(listdir(self.upload_dir), [])
+
+    def test_md5_survives_lost_hasher(self):
+        self.write(0, 5000)
+        uploads._hashers.clear()
+        session = self.write(5000, len(self.content))
+
+        md5 = session.finalize(path.join(self.tmp_dir, 'video.tmp'))
+        self.assertEqual(md5, hashlib.md5(self.content).hexdigest())
+
+    def test_finalize_incomplete_upload(self):
+        session = self.write(0, 100)
+        with self.assertRaises(UploadSessionError):
+            session.finalize(path.join(self.tmp_dir, 'video.tmp'))
+
+    def test_short_chunk_is_not_marked_received(self):
+        with self.assertRaises(UploadSessionError):
+            self.session.write_chunk(0, 100, io.BytesIO(b'short'))
+
+        session = UploadSession.get(self.upload_dir, self.session.upload_id)
+        self.assertEqual(session.received, [])
+
+    def test_chunk_outside_of_file(self):
+        with self.assertRaises(UploadSessionError):
+            self.write(0, len(self.content) + 1)
+
+    def test_unknown_session(self):
+        with self.assertRaises(UploadSessionNotFoundError):
+            UploadSession.get(self.upload_dir, '0' * 32)
+        with self.assertRaises(UploadSessionNotFoundError):
+            UploadSession.get(self.upload_dir, '../../etc/passwd')
+
+    def test_remove_stale_sessions(self):
+        fresh = UploadSession.create(self.upload_dir, 'image.png', 10)
+        utime(self.session.state_path, (0, 0))
+
+        uploads.remove_stale_sessions(self.upload_dir)
+
+        self.assertEqual(
+            sorted(listdir(self.upload_dir)),
+            sorted(
+                path.basename(p)
+                for p in [fresh.state_path, fresh.data_path, fresh.lock_path]
+            ),
+        )
@@ -0,0 +1,220 @@
+import gzip
+import json
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+from os import listdir, path
+from unittest import TestCase, mock
+
+from lib import viewlog
+
+
+class ViewLogTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        db_path_patch = mock.patch.object(
+            viewlog,
+            'get_db_path',
+            return_value=path.join(self.tmp_dir, 'viewlog.db'),
+        )
+        db_path_patch.start()
+        self.addCleanup(db_path_patch.stop)
+        viewlog._initialized.clear()
+
+        self.start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i in range(10):
+            viewlog.log_playback(
+                f'asset-{i}',
+                f'Asset {i}',
+                'image',
+                self.start + timedelta(minutes=i),
+            )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _ids(self, **kwargs):
+        return [entry['id'] for entry in viewlog.iter_entries(**kwargs)]
+
+    def test_entries_are_read_in_batches(self):
+        self.assertEqual(self._ids(batch_size=3), list(range(1, 11)))
+        self.assertEqual(self._ids(after=4, limit=3, batch_size=2), [5, 6, 7])
+
+    def test_entries_are_filtered_by_start_time(self):
+        since = viewlog.format_time(self.start + timedelta(minutes=6))
+        self.assertEqual(self._ids(since=since, batch_size=2), [8, 9, 10])
+
+        # An entry logged before the clock was set.
+        viewlog.log_playback('asset-x', 'Asset X', 'image', self.start)
+        self.assertEqual(self._ids(since=since), [8, 9, 10])
+
+    def test_start_time_is_indexed(self):
+        conn = viewlog.connect()
+        plan = conn.execute(
+            'EXPLAIN QUERY PLAN SELECT MIN(id) FROM viewlog '
+            'INDEXED BY viewlog_started_at WHERE started_at > ?',
+            ('2026',),
+        ).fetchall()
+        conn.close()
+
+        self.assertIn('viewlog_started_at', str(plan))
+
+    def test_times_are_normalized_to_utc(self):
+        self.assertEqual(
+            viewlog.parse_time('2026-01-01T02:00:00+02:00'),
+            '2026-01-01T00:00:00+00:00',
+        )
+        self.assertEqual(
+            viewlog.parse_time('2026-01-01T00:00:00Z'),
+            '2026-01-01T00:00:00+00:00',
+        )
+        with self.assertRaises(ValueError):
+            viewlog.parse_time('yesterday')
+
+    def test_latest_entry(self):
+        self.assertEqual(viewlog.get_latest()['asset_id'], 'asset-9')
+
+    def test_playbacks_are_rolled_up_per_hour(self):
+        start = datetime(2026, 2, 1, 9, 50, tzinfo=timezone.utc)
+        entry_id = viewlog.log_playback('asset-x', 'Asset X', 'video', start)
+        viewlog.end_playback(entry_id, start + timedelta(minutes=20))
+        # Ending it again doesn't count it twice.
+        viewlog.end_playback(entry_id, start + timedelta(minutes=30))
+
+        entry = list(viewlog.iter_entries(after=entry_id - 1))[0]
+        self.assertEqual(entry['duration'], 1200)
+        self.assertEqual(entry['ended_at'], '2026-02-01T10:10:00+00:00')
+
+        def report(start_hour, end_hour):
+            return viewlog.get_report(
+                datetime(2026, 2, 1, start_hour, tzinfo=timezone.utc),
+                datetime(2026, 2, 1, end_hour, tzinfo=timezone.utc),
+                'asset-x',
+            )['assets']
+
+        self.assertEqual(
+            report(9, 10),
+            [{'asset_id': 'asset-x', 'plays': 1, 'seconds': 600}],
+        )
+        self.assertEqual(
+            report(10, 11),
+            [{'asset_id': 'asset-x', 'plays': 0, 'seconds': 600}],
+        )
+        self.assertEqual(
+            report(0, 12),
+            [{'asset_id': 'asset-x', 'plays': 1, 'seconds': 1200}],
+        )
+
+    def test_report_covers_whole_hours(self):
+        report = viewlog.get_report(
+            self.start + timedelta(minutes=30),
+            self.start + timedelta(hours=1, minutes=1),
+        )
+
+        self.assertEqual(report['start'], '2026-01-01T00:00:00+00:00')
+        self.assertEqual(report['end'], '2026-01-01T02:00:00+00:00')
+        self.assertEqual(len(report['assets']), 10)
+
+    def test_old_entries_are_archived(self):
+        moved = viewlog.archive(
+            self.start + timedelta(minutes=5), segment_size=2
+        )
+
+        self.assertEqual(moved, 5)
+        self.assertEqual(self._ids(), [6, 7, 8, 9, 10])
+
+        archive_dir = viewlog.get_archive_dir()
+        segments = sorted(listdir(archive_dir))
+        self.assertEqual(len(segments), 3)
+        entries = []
+        for segment in segments:
+            with gzip.open(path.join(archive_dir, segment), 'rt') as f:
+                entries += [json.loads(line)['id'] for line in f]
+        self.assertEqual(sorted(entries), [1, 2, 3, 4, 5])
+
+        # The reports still count the archived entries.
+        report = viewlog.get_report(
+            self.start, self.start + timedelta(hours=1)
+        )
+        self.assertEqual(len(report['assets']), 10)
+
+    def test_unrecorded_segments_are_removed(self):
+        archive_dir = viewlog.get_archive_dir()
+        viewlog.archive(self.start + timedelta(minutes=2))
+        orphan = path.join(archive_dir, 'viewlog-2026-01-01-99.ndjson.gz')
+        open(orphan, 'wb').close()
+
+        viewlog.archive(self.start + timedelta(minutes=4))
+
+        self.assertNotIn(path.basename(orphan), listdir(archive_dir))
+        self.assertEqual(len(listdir(archive_dir)), 2)
+        self.assertEqual(self._ids()[0], 5)
+
+    def test_old_segments_are_pruned(self):
+        viewlog.archive(self.start + timedelta(minutes=2))
+        viewlog.archive(self.start + timedelta(minutes=8))
+
+        removed = viewlog.prune_archive(self.start + timedelta(minutes=3))
+
+        self.assertEqual(removed, 1)
+        self.assertEqual(
+            listdir(viewlog.get_archive_dir()),
+            ['viewlog-2026-01-01-3.ndjson.gz'],
+        )
+
+
+class ViewLogMigrationTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = path.join(self.tmp_dir, 'viewlog.db')
+        db_path_patch = mock.patch.object(
+            viewlog, 'get_db_path', return_value=self.db_path
+        )
+        db_path_patch.start()
+        self.addCleanup(db_path_patch.stop)
+        viewlog._initialized.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _create_first_schema(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            'CREATE TABLE viewlog '
+            '(id INTEGER PRIMARY KEY AUTOINCREMENT, asset_id TEXT, '
+            'asset_name TEXT, mimetype TEXT, started_at TEXT)'
+        )
+        return conn
+
+    def test_entries_of_the_first_schema_are_rolled_up(self):
+        conn = self._create_first_schema()
+        conn.executemany(
+            'INSERT INTO viewlog (asset_id, started_at) VALUES (?, ?)',
+            [
+                ('a', '2026-01-01T10:05:00.123456+00:00'),
+                ('a', '2026-01-01T10:55:00+00:00'),
+                ('a', '2026-01-01T11:05:00+00:00'),
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+        report = viewlog.get_report(
+            datetime(2026, 1, 1, 10, tzinfo=timezone.utc),
+            datetime(2026, 1, 1, 11, tzinfo=timezone.utc),
+        )
+
+        self.assertEqual(
+            report['assets'], [{'asset_id': 'a', 'plays': 2, 'seconds': 0}]
+        )
+        self.assertIsNone(viewlog.get_latest()['ended_at'])
+
+    def test_vacuum_switches_to_incremental(self):
+        self._create_first_schema().close()
+
+        viewlog.vacuum()
+
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute('PRAGMA auto_vacuum').fetchone(), (2,))
+        conn.close()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+Load test of the web server, with slow requests mixed in with fast ones.
+
+Some clients keep requesting a slow endpoint, like the screenshot, while
+others request a fast one, and the throughput and latencies of each are
+reported. When the server has too few request threads, the fast requests
+wait behind the slow ones.
+
+    python -m tools.load_test --url http://127.0.0.1:8080 \\
+        --slow /api/v2/screenshot --fast /api/v2/assets
+"""
+
+import threading
+import time
+from typing import List, Optional
+
+import click
+import requests
+from requests.auth import HTTPBasicAuth
+from requests.exceptions import RequestException
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summarize(latencies: List[float], errors: int, duration: float) -> dict:
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / duration,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'max': max(latencies, default=None),
+    }
+
+
+def run(
+    url: str,
+    slow_path: str,
+    fast_path: str,
+    slow_clients: int = 4,
+    fast_clients: int = 4,
+    duration: float = 10,
+    auth=None,
+    timeout: float = 60,
+) -> dict:
+    """
+    Runs the clients for `duration` seconds, and returns the summary of
+    the `slow` and the `fast` requests.
+    """
+    deadline = time.monotonic() + duration
+    latencies = {'slow': [], 'fast': []}
+    errors = {'slow': 0, 'fast': 0}
+    lock = threading.Lock()
+
+    def client(kind, path):
+        session = requests.Session()
+        session.auth = auth
+        while time.monotonic() < deadline:
+            started_at = time.monotonic()
+            try:
+                response = session.get(url + path, timeout=timeout)
+                response.content
+                failed = not response.ok
+            except RequestException:
+                failed = True
+            with lock:
+                if failed:
+                    errors[kind] += 1
+                else:
+                    latencies[kind].append(time.monotonic() - started_at)
+
+    threads = [
+        threading.Thread(target=client, args=('slow', slow_path))
+        for _ in range(slow_clients)
+    ] + [
+        threading.Thread(target=client, args=('fast', fast_path))
+        for _ in range(fast_clients)
+    ]
+    started_at = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started_at
+
+    return {
+        kind: summarize(latencies[kind], errors[kind], elapsed)
+        for kind in latencies
+    }
+
+
+def format_seconds(value: Optional[float]) -> str:
+    return '-' if value is None else f'{value * 1000:.0f} ms'
+
+
+@click.command()
+@click.option('--url', default='http://127.0.0.1:8080', show_default=True)
+@click.option('--slow', 'slow_path', default='/api/v2/screenshot')
+@click.option('--fast', 'fast_path', default='/api/v2/assets')
+@click.option('--slow-clients', default=4, show_default=True)
+@click.option('--fast-clients', default=4, show_default=True)
+@click.option('--duration', default=10.0, show_default=True)
+@click.option('--user', default=None)
+@click.option('--password', default=None)
+def main(
+    url,
+    slow_path,
+    fast_path,
+    slow_clients,
+    fast_clients,
+    duration,
+    user,
+    password,
+):
+    auth = HTTPBasicAuth(user, password) if user else None
+    results = run(
+        url.rstrip('/'),
+        slow_path,
+        fast_path,
+        slow_clients,
+        fast_clients,
+        duration,
+        auth,
+    )
+    for kind, summary in results.items():
+        click.echo(
+            f'{kind}: {summary["requests"]} requests, '
+            f'{summary["errors"]} errors, '
+            f'{summary["throughput"]:.1f}/s, '
+            f'p50 {format_seconds(summary["p50"])}, '
+            f'p95 {format_seconds(summary["p95"])}, '
+            f'max {format_seconds(summary["max"])}'
+        )
+
+
+if __name__ == '__main__':
+    main()
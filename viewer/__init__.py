@@ -18,6 +18,7 @@ from future import standard_library
 from jinja2 import Template
 from tenacity import Retrying, stop_after_attempt, wait_fixed
 
+from lib import viewlog
 from settings import LISTEN, ZmqConsumer, settings
 from viewer.constants import (
     BALENA_IP_RETRY_DELAY,
@@ -27,6 +28,7 @@ from viewer.constants import (
     SERVER_WAIT_TIMEOUT,
     SPLASH_DELAY,
     SPLASH_PAGE_URL,
+    STANDBY_POLL_INTERVAL,
     STANDBY_SCREEN,
 )
 from viewer.cec_controller import CecController
@@ -46,6 +48,7 @@ try:
 
     # Place imports that uses Django in this block.
 
+    from lib.media_info import get_stored_media_info
     from lib.utils import (
         connect_to_redis,
         get_balena_device_info,
@@ -70,6 +73,7 @@ __license__ = 'Dual License: GPLv2 and Commercial License'
 current_browser_url = None
 browser = None
 loop_is_stopped = False
+standby_key = None
 browser_bus = None
 r = connect_to_redis()
 
@@ -108,6 +112,30 @@ def show_hotspot_page(data):
     view_webpage(uri)
 
 
+def show_standby(key):
+    """
+    Stops the playback, and shows the standby screen for as long as the
+    given Redis key exists, e.g. while a backup is being restored.
+    """
+    global loop_is_stopped, standby_key
+
+    standby_key = key
+    loop_is_stopped = stop_loop(scheduler)
+
+
+def wait_in_standby():
+    global loop_is_stopped, standby_key
+
+    view_image(STANDBY_SCREEN)
+    while r.exists(standby_key):
+        sleep(STANDBY_POLL_INTERVAL)
+
+    # The settings and the assets may have changed in the meantime.
+    standby_key = None
+    load_settings()
+    loop_is_stopped = play_loop()
+
+
 def setup_wifi(data):
     global load_screen_displayed, mq_data
     if not load_screen_displayed:
@@ -148,6 +176,7 @@ commands = {
         __import__('__main__'), 'loop_is_stopped', play_loop()
     ),
     'setup_wifi': lambda data: setup_wifi(data),
+    'standby': lambda key: show_standby(key),
     'show_splash': lambda data: show_splash(data),
     'unknown': lambda _: command_not_found(),
     'current_asset_id': lambda _: send_current_asset_id_to_server(),
@@ -192,7 +221,12 @@ def view_image(uri):
 
 def view_video(uri, duration, scheduler=None):
     logging.debug('Displaying video %s for %s ', uri, duration)
-    media_player = MediaPlayerProxy.get_instance()
+    try:
+        media_info = get_stored_media_info(uri)
+    except Exception as e:
+        logging.debug('Failed to read media info: %s', e)
+        media_info = None
+    media_player = MediaPlayerProxy.get_instance(media_info)
 
     media_player.set_asset(uri, duration)
     media_player.play()
@@ -234,28 +268,23 @@ def view_video(uri, duration, scheduler=None):
 
 
 def _log_playback(asset):
-    """Write a viewlog entry to viewlog.db (read by phone-home and screenshot API)."""
+    """Write a viewlog entry (read by phone-home and screenshot API)."""
     try:
-        import sqlite3
-        from datetime import datetime, timezone as tz
-        db_path = path.join(path.expanduser('~'), '.screenly', 'viewlog.db')
-        conn = sqlite3.connect(db_path, timeout=5)
-        conn.execute(
-            'CREATE TABLE IF NOT EXISTS viewlog '
-            '(id INTEGER PRIMARY KEY AUTOINCREMENT, asset_id TEXT, asset_name TEXT, '
-            'mimetype TEXT, started_at TEXT)'
-        )
-        conn.execute(
-            'INSERT INTO viewlog (asset_id, asset_name, mimetype, started_at) VALUES (?, ?, ?, ?)',
-            (
-                asset.get('asset_id', ''),
-                asset.get('name', ''),
-                asset.get('mimetype', ''),
-                datetime.now(tz.utc).isoformat(),
-            ),
+        return viewlog.log_playback(
+            asset.get('asset_id', ''),
+            asset.get('name', ''),
+            asset.get('mimetype', ''),
         )
-        conn.commit()
-        conn.close()
+    except Exception as e:
+        logging.debug('Failed to write viewlog: %s', e)
+
+
+def _end_playback(entry_id):
+    """Record when the asset of a viewlog entry stopped being shown."""
+    if entry_id is None:
+        return
+    try:
+        viewlog.end_playback(entry_id)
     except Exception as e:
         logging.debug('Failed to write viewlog: %s', e)
 
@@ -264,7 +293,7 @@ def load_settings():
     """
     Load settings and set the log level.
     """
-    settings.load()
+    settings.load(force=True)
     logging.getLogger().setLevel(
         logging.DEBUG if settings['debug_logging'] else logging.INFO
     )
@@ -358,6 +387,86 @@ def _cctv_keepalive(uri, stop_event):
             logging.warning('CCTV keepalive failed for %s', config_id)
 
 
+def _play_asset(asset, scheduler):
+    name, mime, uri = asset['name'], asset['mimetype'], asset['uri']
+
+    if 'image' in mime:
+        view_image(uri)
+    elif 'web' in mime:
+        if _is_cctv_url(uri):
+            cctv_mode = _request_cctv_start(uri)
+            if not cctv_mode:
+                logging.info(
+                    'CCTV stream %s unavailable, waiting 30s before retry', name
+                )
+                skip_event = get_skip_event()
+                skip_event.clear()
+                skip_event.wait(timeout=30)
+                return
+            if cctv_mode == 'grid':
+                # Grid mode — open CCTV page in WebEngine (hls.js handles per-camera streams)
+                logging.info('CCTV grid mode: opening webpage %s', uri)
+                keepalive_stop = threading.Event()
+                keepalive_thread = threading.Thread(
+                    target=_cctv_keepalive,
+                    args=(uri, keepalive_stop),
+                    daemon=True,
+                )
+                keepalive_thread.start()
+                try:
+                    view_webpage(uri)
+                finally:
+                    keepalive_stop.set()
+                    keepalive_thread.join(timeout=5)
+                return
+            # HLS mode — play single stream directly via ffplay
+            hls_url = _get_cctv_hls_url(uri)
+            if hls_url:
+                logging.info('Playing CCTV HLS stream: %s', hls_url)
+                keepalive_stop = threading.Event()
+                keepalive_thread = threading.Thread(
+                    target=_cctv_keepalive,
+                    args=(uri, keepalive_stop),
+                    daemon=True,
+                )
+                keepalive_thread.start()
+                try:
+                    view_video(hls_url, asset['duration'], scheduler)
+                finally:
+                    keepalive_stop.set()
+                    keepalive_thread.join(timeout=5)
+                return
+        view_webpage(uri)
+    elif 'video' or 'streaming' in mime:
+        view_video(uri, asset['duration'], scheduler)
+    else:
+        logging.error('Unknown MimeType %s', mime)
+
+    if 'image' in mime or 'web' in mime:
+        duration = int(asset['duration'])
+        infinite = (duration == 0)
+        if infinite:
+            logging.info('Infinite duration — playing until schedule change')
+        else:
+            logging.info('Sleeping for %s', duration)
+        skip_event = get_skip_event()
+        skip_event.clear()
+        remaining = duration if not infinite else None
+        while True:
+            wait_time = min(SCHEDULE_CHECK_INTERVAL, remaining) if remaining else SCHEDULE_CHECK_INTERVAL
+            if skip_event.wait(timeout=wait_time):
+                logging.info('Skip detected, moving to next asset immediately')
+                break
+            if remaining is not None:
+                remaining -= wait_time
+                if remaining <= 0:
+                    break  # duration elapsed
+            # Periodic schedule re-check
+            if scheduler.should_refresh():
+                logging.info('Schedule changed during playback, moving on')
+                break
+
+
 def asset_loop(scheduler, cec=None):
     asset = scheduler.get_next_asset()
 
@@ -382,83 +491,11 @@ def asset_loop(scheduler, cec=None):
         logging.info('Showing asset %s (%s)', name, mime)
         logging.debug('Asset URI %s', uri)
         watchdog()
-        _log_playback(asset)
-
-        if 'image' in mime:
-            view_image(uri)
-        elif 'web' in mime:
-            if _is_cctv_url(uri):
-                cctv_mode = _request_cctv_start(uri)
-                if not cctv_mode:
-                    logging.info(
-                        'CCTV stream %s unavailable, waiting 30s before retry', name
-                    )
-                    skip_event = get_skip_event()
-                    skip_event.clear()
-                    skip_event.wait(timeout=30)
-                    return
-                if cctv_mode == 'grid':
-                    # Grid mode — open CCTV page in WebEngine (hls.js handles per-camera streams)
-                    logging.info('CCTV grid mode: opening webpage %s', uri)
-                    keepalive_stop = threading.Event()
-                    keepalive_thread = threading.Thread(
-                        target=_cctv_keepalive,
-                        args=(uri, keepalive_stop),
-                        daemon=True,
-                    )
-                    keepalive_thread.start()
-                    try:
-                        view_webpage(uri)
-                    finally:
-                        keepalive_stop.set()
-                        keepalive_thread.join(timeout=5)
-                    return
-                # HLS mode — play single stream directly via ffplay
-                hls_url = _get_cctv_hls_url(uri)
-                if hls_url:
-                    logging.info('Playing CCTV HLS stream: %s', hls_url)
-                    keepalive_stop = threading.Event()
-                    keepalive_thread = threading.Thread(
-                        target=_cctv_keepalive,
-                        args=(uri, keepalive_stop),
-                        daemon=True,
-                    )
-                    keepalive_thread.start()
-                    try:
-                        view_video(hls_url, asset['duration'], scheduler)
-                    finally:
-                        keepalive_stop.set()
-                        keepalive_thread.join(timeout=5)
-                    return
-            view_webpage(uri)
-        elif 'video' or 'streaming' in mime:
-            view_video(uri, asset['duration'], scheduler)
-        else:
-            logging.error('Unknown MimeType %s', mime)
-
-        if 'image' in mime or 'web' in mime:
-            duration = int(asset['duration'])
-            infinite = (duration == 0)
-            if infinite:
-                logging.info('Infinite duration — playing until schedule change')
-            else:
-                logging.info('Sleeping for %s', duration)
-            skip_event = get_skip_event()
-            skip_event.clear()
-            remaining = duration if not infinite else None
-            while True:
-                wait_time = min(SCHEDULE_CHECK_INTERVAL, remaining) if remaining else SCHEDULE_CHECK_INTERVAL
-                if skip_event.wait(timeout=wait_time):
-                    logging.info('Skip detected, moving to next asset immediately')
-                    break
-                if remaining is not None:
-                    remaining -= wait_time
-                    if remaining <= 0:
-                        break  # duration elapsed
-                # Periodic schedule re-check
-                if scheduler.should_refresh():
-                    logging.info('Schedule changed during playback, moving on')
-                    break
+        entry_id = _log_playback(asset)
+        try:
+            _play_asset(asset, scheduler)
+        finally:
+            _end_playback(entry_id)
 
     else:
         logging.info(
@@ -514,6 +551,10 @@ def start_loop():
     cec = CecController(ir_controller=ir)
     logging.debug('Entering infinite loop.')
     while True:
+        if loop_is_stopped and standby_key is not None:
+            wait_in_standby()
+            continue
+
         if loop_is_stopped:
             sleep(0.1)
             continue
@@ -12,3 +12,4 @@ MAX_BALENA_IP_RETRIES = 90
 BALENA_IP_RETRY_DELAY = 1
 SERVER_WAIT_TIMEOUT = 60
 SCHEDULE_CHECK_INTERVAL = 30  # secs — periodic schedule re-check during playback
+STANDBY_POLL_INTERVAL = 1  # secs
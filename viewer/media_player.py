@@ -10,6 +10,7 @@ from lib.device_helper import get_device_type
 from settings import settings
 
 VIDEO_TIMEOUT = 20  # secs
+DRM_CODECS = ['hevc']
 
 
 class MediaPlayer:
@@ -85,7 +86,8 @@ class DRMMediaPlayer(MediaPlayer):
     """Video player for Pi5 using ffplay with KMS/DRM output.
 
     VLC 3.0 on arm64 cannot decode H.264 to framebuffer properly.
-    ffplay with SDL2 kmsdrm backend works well on Pi5.
+    ffplay with SDL2 kmsdrm backend works well on Pi5. Pi4 uses it for
+    HEVC, which it only decodes in hardware through DRM.
     """
 
     def __init__(self):
@@ -96,6 +98,8 @@ class DRMMediaPlayer(MediaPlayer):
     def _get_audio_device(self):
         settings.load()
         if settings['audio_output'] == 'local':
+            if get_device_type() == 'pi4':
+                return 'plughw:CARD=Headphones'
             return 'sysdefault:CARD=vc4hdmi0'
         else:
             return _detect_hdmi_audio_device()
@@ -196,16 +200,28 @@ class VLCMediaPlayer(MediaPlayer):
 
 
 class MediaPlayerProxy:
-    INSTANCE = None
+    INSTANCES = {}
+
+    @staticmethod
+    def get_player_class(device_type, media_info=None):
+        if device_type == 'pi5':
+            return DRMMediaPlayer
+        if device_type == 'pi4' and media_info and (
+            media_info.video_codec in DRM_CODECS
+        ):
+            return DRMMediaPlayer
+        if device_type in ['pi1', 'pi2', 'pi3', 'pi4']:
+            return VLCMediaPlayer
+        return FFMPEGMediaPlayer
 
     @classmethod
-    def get_instance(cls):
-        if cls.INSTANCE is None:
-            if get_device_type() == 'pi5':
-                cls.INSTANCE = DRMMediaPlayer()
-            elif get_device_type() in ['pi1', 'pi2', 'pi3', 'pi4']:
-                cls.INSTANCE = VLCMediaPlayer()
-            else:
-                cls.INSTANCE = FFMPEGMediaPlayer()
-
-        return cls.INSTANCE
+    def get_instance(cls, media_info=None):
+        """
+        Returns the player for the device, and for the media when its
+        probed media info is known.
+        """
+        player_class = cls.get_player_class(get_device_type(), media_info)
+        if player_class not in cls.INSTANCES:
+            cls.INSTANCES[player_class] = player_class()
+
+        return cls.INSTANCES[player_class]
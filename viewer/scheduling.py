@@ -77,6 +77,7 @@ def _generate_legacy_playlist():
 
     enabled_assets = Asset.objects.filter(
         is_enabled=True,
+        is_processing=False,
         start_date__isnull=False,
         end_date__isnull=False,
     ).order_by('play_order')
@@ -159,7 +160,8 @@ def _generate_schedule_playlist(slots, skip_event_id=None):
     playlist = []
     for item in items:
         asset = item.asset
-        if not asset.is_enabled:
+        # Assets still being ingested have no playable file yet.
+        if not asset.is_enabled or asset.is_processing:
             continue
         playlist.append(_asset_to_dict(
             asset, item.duration_override, item.volume, item.mute,
@@ -23,7 +23,7 @@ class WebSocketTranslator(object):
         try:
             while True:
                 msg = socket.recv()
-                topic, message = msg.split()
+                topic, message = msg.split(b' ', 1)
                 ws.send(message)
         except WebSocketError:
             ws.close()